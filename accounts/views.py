@@ -6,7 +6,8 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 
-from music.models import Genre, SongPlay
+from music.genres import genre_registry
+from music.models import SongPlay
 from artists.models import Artist
 from library.models import Playlist
 from .models import UserProfile
@@ -88,7 +89,7 @@ def signup(request):
                 messages.error(request, error)
             
             return render(request, 'accounts/signup.html', {
-                'genres': Genre.objects.all(),
+                'genres': genre_registry.all(),
                 'username': username,
                 'email': email,
                 'first_name': first_name,
@@ -133,12 +134,10 @@ def signup(request):
                     
                     # Add genre if provided and exists
                     if genre_id:
-                        try:
-                            genre = Genre.objects.get(id=genre_id)
+                        genre = genre_registry.get(genre_id)
+                        # Continue without genre if it doesn't exist
+                        if genre is not None:
                             artist_data['genre'] = genre
-                        except Genre.DoesNotExist:
-                            # Continue without genre if it doesn't exist
-                            pass
                     
                     Artist.objects.create(**artist_data)
                     messages.success(request, 'Artist account created successfully! Welcome to Sangabiz!')
@@ -163,7 +162,7 @@ def signup(request):
             
             # Return with preserved data
             return render(request, 'accounts/signup.html', {
-                'genres': Genre.objects.all(),
+                'genres': genre_registry.all(),
                 'username': username,
                 'email': email,
                 'first_name': first_name,
@@ -176,7 +175,7 @@ def signup(request):
     
     # GET request - show empty form with genres
     return render(request, 'accounts/signup.html', {
-        'genres': Genre.objects.all()
+        'genres': genre_registry.all()
     })
 
 def logout_view(request):
@@ -1,10 +1,10 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db.models import Sum
 from django.http import JsonResponse
-from django.utils import timezone
-from datetime import timedelta
 
-from music.models import Song, SongPlay, SongDownload
+from music.models import Song, SongDailyStats
 from artists.models import Artist
 
 @login_required
@@ -17,17 +17,20 @@ def song_analytics(request, song_id):
         messages.error(request, "You don't have permission to view these analytics.")
         return redirect('my_uploads')
     
-    # Get play history (last 30 days)
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_plays = SongPlay.objects.filter(song=song, played_at__gte=thirty_days_ago)
-    
-    # Get download history
-    recent_downloads = SongDownload.objects.filter(song=song, downloaded_at__gte=thirty_days_ago)
+    # Last 30 days, one SongDailyStats row per day
+    daily_stats = list(SongDailyStats.since(30).filter(song=song).order_by('date'))
+    totals = SongDailyStats.since(30).filter(song=song).aggregate(
+        plays=Sum('plays'),
+        downloads=Sum('downloads'),
+        seconds=Sum('seconds_played'),
+    )
     
     context = {
         'song': song,
-        'recent_plays': recent_plays,
-        'recent_downloads': recent_downloads,
+        'daily_stats': daily_stats,
+        'recent_plays': totals['plays'] or 0,
+        'recent_downloads': totals['downloads'] or 0,
+        'recent_seconds_played': totals['seconds'] or 0,
         'total_plays': song.plays,
         'total_downloads': song.downloads,
     }
@@ -52,6 +55,6 @@ def get_song_stats(request, song_id):
     """Get current song statistics"""
     song = get_object_or_404(Song, id=song_id)
     return JsonResponse({
-        'plays': song.plays,
+        'plays': song.live_plays,
         'downloads': song.downloads
     })
\ No newline at end of file
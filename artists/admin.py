@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.db.models import Count, Sum
 from django.utils.html import format_html
-from .models import Artist, Follow
+from .models import Artist, Follow, ArtistStats
 
 @admin.register(Artist)
 class ArtistAdmin(admin.ModelAdmin):
@@ -68,3 +68,14 @@ class FollowAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('artist', 'follower')
+
+@admin.register(ArtistStats)
+class ArtistStatsAdmin(admin.ModelAdmin):
+    list_display = ['artist', 'approved_songs', 'total_plays', 'total_downloads', 'total_likes', 'followers', 'updated_at']
+    search_fields = ['artist__name']
+    readonly_fields = ['artist', 'approved_songs', 'total_plays', 'total_downloads', 'total_likes', 'followers', 'updated_at']
+    ordering = ['-total_plays']
+    list_per_page = 50
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('artist')
@@ -0,0 +1,16 @@
+# artists/management/commands/refresh_artist_stats.py
+from django.core.management.base import BaseCommand
+
+from artists.models import ArtistStats
+
+
+class Command(BaseCommand):
+    help = "Recompute ArtistStats from songs, likes and follows (backfill, or nightly to correct drift)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--artist', type=int, action='append', dest='artist_ids',
+                            help="Only this artist id (repeatable); default: every artist")
+
+    def handle(self, *args, **options):
+        rows = ArtistStats.rebuild(options['artist_ids'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed stats for {len(rows)} artists"))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.26 on 2026-10-17 20:40
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # Only PostgreSQL has pg_trgm; other databases use music.fuzzy.TrigramIndex
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS artists_artist_name_trgm "
+        "ON artists_artist USING gin (name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS artists_artist_name_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0005_artist_user'),
+        # pg_trgm is created there
+        ('music', '0012_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.26 on 2026-10-17 22:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0006_artist_name_trigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtistStats',
+            fields=[
+                ('artist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='artists.artist')),
+                ('approved_songs', models.PositiveIntegerField(default=0)),
+                ('total_plays', models.PositiveBigIntegerField(default=0)),
+                ('total_downloads', models.PositiveBigIntegerField(default=0)),
+                ('total_likes', models.PositiveIntegerField(default=0)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Artist stats',
+            },
+        ),
+    ]
@@ -1,10 +1,15 @@
 # artists/models.py
 from django.db import models
+from django.db.models import Count, F, Sum
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
 from django.urls import reverse
 
+# Earnings rates
+STREAM_RATE = 0.001  # $0.001 per play
+DOWNLOAD_RATE = 0.003  # $0.003 per download
+
 class ArtistManager(models.Manager):
     def verified(self):
         return self.filter(is_verified=True)
@@ -68,3 +73,111 @@ class Follow(models.Model):
         unique_together = ['follower', 'artist']
 
         app_label = 'artists'
+
+
+class ArtistStats(models.Model):
+    """
+    Denormalized totals for an artist's approved songs, so the artist page
+    and dashboard read one row instead of aggregating songs, likes and
+    follows per request. Kept current by the signals in music/signals.py
+    and the play counter rollup; ``manage.py refresh_artist_stats``
+    recomputes them from the source tables.
+    """
+    artist = models.OneToOneField(Artist, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    approved_songs = models.PositiveIntegerField(default=0)
+    total_plays = models.PositiveBigIntegerField(default=0)
+    total_downloads = models.PositiveBigIntegerField(default=0)
+    total_likes = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'Artist stats'
+        app_label = 'artists'
+    
+    def __str__(self):
+        return f"{self.artist_id}: {self.total_plays} plays, {self.followers} followers"
+    
+    @property
+    def stream_earnings(self):
+        return self.total_plays * STREAM_RATE
+    
+    @property
+    def download_earnings(self):
+        return self.total_downloads * DOWNLOAD_RATE
+    
+    @property
+    def earnings(self):
+        return self.stream_earnings + self.download_earnings
+    
+    @classmethod
+    def rebuild(cls, artist_ids=None):
+        """Recompute the rows of ``artist_ids`` (every artist if None) from the source tables."""
+        from music.models import Song
+        from library.models import Like
+        
+        artists = Artist.objects.all()
+        songs = Song.objects.filter(is_approved=True)
+        likes = Like.objects.filter(song__is_approved=True)
+        follows = Follow.objects.all()
+        if artist_ids is not None:
+            artists = artists.filter(id__in=artist_ids)
+            songs = songs.filter(artist_id__in=artist_ids)
+            likes = likes.filter(song__artist_id__in=artist_ids)
+            follows = follows.filter(artist_id__in=artist_ids)
+        
+        song_totals = {
+            row['artist_id']: row
+            for row in songs.values('artist_id').annotate(
+                count=Count('id'), plays=Sum('plays'), downloads=Sum('downloads'),
+            ).order_by()
+        }
+        like_counts = dict(
+            likes.values('song__artist_id').annotate(n=Count('id')).values_list('song__artist_id', 'n').order_by()
+        )
+        follower_counts = dict(
+            follows.values('artist_id').annotate(n=Count('id')).values_list('artist_id', 'n').order_by()
+        )
+        
+        rows = []
+        for artist_id in artists.values_list('id', flat=True).iterator():
+            totals = song_totals.get(artist_id, {})
+            rows.append(cls(
+                artist_id=artist_id,
+                approved_songs=totals.get('count') or 0,
+                total_plays=totals.get('plays') or 0,
+                total_downloads=totals.get('downloads') or 0,
+                total_likes=like_counts.get(artist_id, 0),
+                followers=follower_counts.get(artist_id, 0),
+                updated_at=timezone.now(),
+            ))
+        cls.objects.bulk_create(
+            rows, batch_size=1000, update_conflicts=True, unique_fields=['artist'],
+            update_fields=['approved_songs', 'total_plays', 'total_downloads', 'total_likes', 'followers', 'updated_at'],
+        )
+        return rows
+    
+    @classmethod
+    def refresh(cls, artist_id):
+        """Recompute one artist's row. Returns it (None if the artist is gone)."""
+        rows = cls.rebuild([artist_id])
+        return rows[0] if rows else None
+    
+    @classmethod
+    def increment(cls, artist_id, **amounts):
+        """Add ``amounts`` (total_plays=, total_downloads=, ...) to the artist's row, building it if missing."""
+        amounts = {field: amount for field, amount in amounts.items() if amount}
+        if not amounts or artist_id is None:
+            return
+        updates = {field: F(field) + amount for field, amount in amounts.items()}
+        if not cls.objects.filter(artist_id=artist_id).update(updated_at=timezone.now(), **updates):
+            # The rebuild counts the change already applied to the source tables
+            cls.refresh(artist_id)
+    
+    @classmethod
+    def for_artist(cls, artist):
+        """The artist's row, read through ``artist.stats`` (select_related it) and built on first use."""
+        try:
+            return artist.stats
+        except cls.DoesNotExist:
+            return cls.refresh(artist.id)
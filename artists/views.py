@@ -1,23 +1,24 @@
 # artists/views.py
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.db.models import Q, Count, Sum, Case, When, IntegerField
+from django.db.models import Q, Count, Sum, Case, When, IntegerField, F
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from datetime import timedelta
 import json
 
-from .models import Artist, Follow
-from music.models import Song, Genre, SongPlay, SongDownload
+from .models import Artist, Follow, ArtistStats, STREAM_RATE, DOWNLOAD_RATE
+from music.models import Song, SongPlay, SongDownload, SongPlayCounter, SongDailyStats
 from music.forms import SongUploadForm
+from music.genres import genre_registry
+from music.utils.renditions import choose_rendition
+from music.utils.user_agents import user_agent_ids
 from library.models import Like
-
-# Earnings rates
-STREAM_RATE = 0.001  # $0.001 per play
-DOWNLOAD_RATE = 0.003  # $0.003 per download
+from library.likes import mark_liked
 
 def get_client_ip(request):
     """Get client IP address"""
@@ -39,12 +40,17 @@ def play_song(request, song_id):
         return JsonResponse({
             'error': 'Premium content requires subscription',
             'can_preview': getattr(song, 'preview_duration', 0) > 0,
-            'preview_duration': getattr(song, 'preview_duration', 0)
+            'preview_duration': getattr(song, 'preview_duration', 0),
+            'preview_url': reverse('preview_song', args=[song.id]) if getattr(song, 'preview_duration', 0) > 0 else None
         }, status=403)
     
-    # Increment play count
-    song.plays += 1
-    song.save()
+    # Increment play count on a counter shard
+    SongPlayCounter.increment(song.id)
+    
+    rendition = choose_rendition(request, song)
+    audio_url = reverse('stream_song', args=[song.id])
+    if rendition:
+        audio_url += f'?kbps={rendition.bitrate}'
     
     # Record play in SongPlay model
     play = SongPlay.objects.create(
@@ -52,8 +58,10 @@ def play_song(request, song_id):
         user=request.user,
         ip_address=get_client_ip(request),
         duration_played=0,
-        user_agent=request.META.get('HTTP_USER_AGENT', ''),
-        audio_quality='high' if hasattr(request.user, 'userprofile') and request.user.userprofile.is_premium else 'standard'
+        agent_id=user_agent_ids.id_for(request.META.get('HTTP_USER_AGENT', '')),
+        audio_quality=rendition.audio_quality if rendition else (
+            'high' if hasattr(request.user, 'userprofile') and request.user.userprofile.is_premium else 'standard'
+        )
     )
     
     return JsonResponse({
@@ -63,9 +71,11 @@ def play_song(request, song_id):
         'artist': song.artist.name,
         'artist_id': song.artist.id,
         'cover': song.cover_image.url if song.cover_image else '/static/images/default-cover.jpg',
-        'audio': song.audio_file.url,
+        'audio': audio_url,
+        'bitrate': rendition.bitrate if rendition else None,
+        'hls_url': reverse('hls_master', args=[song.id]) if song.hls_manifest else None,
         'duration': getattr(song, 'duration', '3:45'),
-        'plays': song.plays,
+        'plays': song.live_plays,
         'is_premium': getattr(song, 'is_premium_only', False),
         'play_id': play.id
     })
@@ -103,13 +113,15 @@ def download_song(request, song_id):
             'error': 'Premium content requires subscription'
         }, status=403)
     
-    song.downloads += 1
-    song.save()
+    # Counter update without Song.save(), so cached pages aren't invalidated per download
+    Song.objects.filter(id=song.id).update(downloads=F('downloads') + 1)
+    ArtistStats.increment(song.artist_id, total_downloads=1)
     
     SongDownload.objects.create(
         song=song,
         user=request.user,
         ip_address=get_client_ip(request),
+        agent_id=user_agent_ids.id_for(request.META.get('HTTP_USER_AGENT', '')),
         file_size=song.audio_file.size
     )
     
@@ -200,12 +212,11 @@ def increment_play_count(request, song_id):
     """API endpoint to increment play count"""
     if request.method == 'POST':
         song = get_object_or_404(Song, id=song_id)
-        song.plays += 1
-        song.save()
+        SongPlayCounter.increment(song.id)
         
         return JsonResponse({
             'success': True,
-            'new_play_count': song.plays
+            'new_play_count': song.live_plays
         })
     
     return JsonResponse({'success': False})
@@ -263,36 +274,29 @@ def trending_artists(request):
 
 def artist_detail(request, artist_id):
     """Artist profile page"""
-    artist = get_object_or_404(Artist, id=artist_id)
+    artist = get_object_or_404(Artist.objects.select_related('stats'), id=artist_id)
     
     if request.user.is_authenticated and hasattr(request.user, 'artist_profile') and request.user.artist_profile == artist:
         songs = Song.objects.filter(artist=artist).order_by('-upload_date')
     else:
         songs = Song.objects.filter(artist=artist, is_approved=True).order_by('-upload_date')
-    
-    for song in songs:
-        song.is_liked = False
-        if request.user.is_authenticated:
-            song.is_liked = Like.objects.filter(user=request.user, song=song).exists()
+    # One liked-status query for the whole list instead of one per song
+    songs = mark_liked(request, songs.select_related('artist', 'genre').prefetch_related('featured_artists'))
     
     is_following = False
     if request.user.is_authenticated:
         is_following = Follow.objects.filter(follower=request.user, artist=artist).exists()
     
-    approved_songs = songs.filter(is_approved=True)
-    total_plays = approved_songs.aggregate(total=Sum('plays'))['total'] or 0
-    total_downloads = approved_songs.aggregate(total=Sum('downloads'))['total'] or 0
-    total_likes = Like.objects.filter(song__in=approved_songs).count()
-    
+    stats = ArtistStats.for_artist(artist)
     context = {
         'artist': artist,
         'songs': songs,
         'is_following': is_following,
-        'songs_count': approved_songs.count(),
-        'total_plays': total_plays,
-        'total_downloads': total_downloads,
-        'total_likes': total_likes,
-        'followers_count': artist.followers.count(),
+        'songs_count': stats.approved_songs,
+        'total_plays': stats.total_plays,
+        'total_downloads': stats.total_downloads,
+        'total_likes': stats.total_likes,
+        'followers_count': stats.followers,
     }
     return render(request, 'artists/artist_detail.html', context)
 
@@ -305,23 +309,24 @@ def artist_dashboard(request):
         messages.error(request, "You need to be an artist to access the dashboard.")
         return redirect('home')
 
-    # Get artist stats for approved songs only
+    # Totals come from the denormalized stats row
+    stats = ArtistStats.for_artist(artist)
     approved_songs = artist.songs.filter(is_approved=True)
-    total_plays = approved_songs.aggregate(total=Sum('plays'))['total'] or 0
-    total_downloads = approved_songs.aggregate(total=Sum('downloads'))['total'] or 0
-    total_likes = Like.objects.filter(song__in=approved_songs).count()
-    total_followers = Follow.objects.filter(artist=artist).count()
+    total_plays = stats.total_plays
+    total_downloads = stats.total_downloads
+    total_likes = stats.total_likes
+    total_followers = stats.followers
 
     # Calculate earnings using the defined rates
-    stream_earnings = total_plays * STREAM_RATE
-    download_earnings = total_downloads * DOWNLOAD_RATE
-    total_earnings = stream_earnings + download_earnings
+    stream_earnings = stats.stream_earnings
+    download_earnings = stats.download_earnings
+    total_earnings = stats.earnings
     available_balance = total_earnings
 
     # Get recent activity
     seven_days_ago = timezone.now() - timedelta(days=7)
-    recent_plays = approved_songs.aggregate(
-        recent=Sum('plays', filter=Q(upload_date__gte=seven_days_ago))
+    recent_plays = SongDailyStats.since(7).filter(song__in=approved_songs).aggregate(
+        recent=Sum('plays')
     )['recent'] or 0
     
     recent_followers = Follow.objects.filter(
@@ -354,7 +359,7 @@ def artist_dashboard(request):
         'recent_followers': recent_followers,
         'recent_songs': recent_songs,
         'top_songs': top_songs,
-        'genres': Genre.objects.all(),
+        'genres': genre_registry.all(),
     }
     return render(request, 'artists/artist_dashboard.html', context)
 @login_required
@@ -376,6 +381,9 @@ def upload_music(request):
                 song.plays = 0
                 song.downloads = 0
                 song.is_approved = False
+                # Duration, quality, thumbnails and previews are filled in
+                # by the process_uploads worker after the request returns
+                song.processing_status = 'pending'
                 
                 # Handle featured artist selection
                 artist_selection = request.POST.get('artist_selection', 'default')
@@ -406,7 +414,7 @@ def upload_music(request):
                         messages.error(request, f"Audio file must be less than 20MB (current: {audio_file.size // (1024*1024)}MB)")
                         return render(request, 'artists/upload_music.html', {
                             'form': form,
-                            'genres': Genre.objects.all(),
+                            'genres': genre_registry.all(),
                             'max_file_size': 20,
                             'allowed_formats': ['MP3', 'WAV', 'OGG', 'M4A', 'FLAC']
                         })
@@ -417,7 +425,7 @@ def upload_music(request):
                         messages.error(request, f"File type '{file_extension}' not supported. Allowed: {', '.join(allowed_extensions)}")
                         return render(request, 'artists/upload_music.html', {
                             'form': form,
-                            'genres': Genre.objects.all(),
+                            'genres': genre_registry.all(),
                             'max_file_size': 20,
                             'allowed_formats': ['MP3', 'WAV', 'OGG', 'M4A', 'FLAC']
                         })
@@ -430,7 +438,7 @@ def upload_music(request):
                         messages.error(request, f"Cover image must be less than 10MB (current: {cover_image.size // (1024*1024)}MB)")
                         return render(request, 'artists/upload_music.html', {
                             'form': form,
-                            'genres': Genre.objects.all(),
+                            'genres': genre_registry.all(),
                             'max_file_size': 20,
                             'allowed_formats': ['MP3', 'WAV', 'OGG', 'M4A', 'FLAC']
                         })
@@ -441,7 +449,7 @@ def upload_music(request):
                         messages.error(request, f"Image type '{image_extension}' not supported. Allowed: {', '.join(allowed_image_extensions)}")
                         return render(request, 'artists/upload_music.html', {
                             'form': form,
-                            'genres': Genre.objects.all(),
+                            'genres': genre_registry.all(),
                             'max_file_size': 20,
                             'allowed_formats': ['MP3', 'WAV', 'OGG', 'M4A', 'FLAC']
                         })
@@ -479,7 +487,7 @@ def upload_music(request):
     
     context = {
         'form': form,
-        'genres': Genre.objects.all(),
+        'genres': genre_registry.all(),
         'max_file_size': 20,
         'allowed_formats': ['MP3', 'WAV', 'OGG', 'M4A', 'FLAC'],
         'artist': artist_profile
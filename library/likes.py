@@ -0,0 +1,51 @@
+# library/likes.py
+"""
+Per-request liked-song lookups.
+
+Song lists show a heart per song. Instead of one ``Like...exists()`` per
+song, views call ``mark_liked(request, songs)``: the user's likes among
+those songs are fetched in one query, remembered on the request, and set as
+``song.is_liked``, which templates read. Songs already marked earlier in the
+request aren't fetched again.
+"""
+
+
+class LikedSongs:
+    """The songs a user likes, loaded in batches and memoized for one request."""
+
+    def __init__(self, user):
+        self.user = user
+        self._liked = {}  # song id -> bool
+
+    def load(self, songs):
+        """Fetch the liked state of any of ``songs`` (songs or ids) not known yet, in one query."""
+        song_ids = {getattr(song, 'id', song) for song in songs} - self._liked.keys()
+        song_ids.discard(None)
+        if not song_ids:
+            return
+        from .models import Like
+
+        liked = Like.liked_song_ids(self.user, song_ids)
+        for song_id in song_ids:
+            self._liked[song_id] = song_id in liked
+
+    def mark(self, songs):
+        """Set ``is_liked`` on each song. Returns the songs as a list."""
+        songs = list(songs)
+        self.load(songs)
+        for song in songs:
+            song.is_liked = self._liked.get(song.id, False)
+        return songs
+
+
+def liked_songs_for(request):
+    """The request's LikedSongs, created on first use."""
+    liked = getattr(request, '_liked_songs', None)
+    if liked is None:
+        liked = request._liked_songs = LikedSongs(request.user)
+    return liked
+
+
+def mark_liked(request, songs):
+    """Set ``is_liked`` on ``songs`` for the requesting user (one query at most). Returns them as a list."""
+    return liked_songs_for(request).mark(songs)
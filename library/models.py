@@ -7,6 +7,7 @@ class Playlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     songs = models.ManyToManyField('music.Song', blank=True)  # String reference
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_public = models.BooleanField(default=False)
     description = models.TextField(blank=True, null=True)
     cover_image = models.ImageField(upload_to='playlist_covers/', blank=True, null=True)
@@ -24,4 +25,14 @@ class Like(models.Model):
     
     class Meta:
         unique_together = ['user', 'song']
-        app_label = 'library'
\ No newline at end of file
+        app_label = 'library'
+    
+    @classmethod
+    def liked_song_ids(cls, user, songs):
+        """Set of the ids among ``songs`` (songs or ids) that ``user`` likes, in one query."""
+        if not user.is_authenticated:
+            return set()
+        song_ids = [getattr(song, 'id', song) for song in songs]
+        if not song_ids:
+            return set()
+        return set(cls.objects.filter(user=user, song_id__in=song_ids).values_list('song_id', flat=True))
\ No newline at end of file
@@ -6,6 +6,7 @@ from django.contrib import messages
 from django.views.decorators.csrf import csrf_exempt
 
 from .models import Playlist, Like
+from .likes import mark_liked
 from music.models import Song, SongPlay
 from artists.models import Artist
 
@@ -51,8 +52,11 @@ def playlist_detail(request, playlist_id):
             playlist.songs.add(song)
             messages.success(request, 'Song added to playlist!')
     
+    songs = mark_liked(request, playlist.songs.select_related('artist', 'genre'))
+    
     context = {
         'playlist': playlist,
+        'songs': songs,
     }
     return render(request, 'library/playlist_detail.html', context)
 
@@ -72,20 +76,21 @@ def liked_songs(request):
 def recently_played(request):
     """Display recently played songs for the current user"""
     try:
-        recent_plays = SongPlay.objects.filter(user=request.user).order_by('-played_at')[:50]
+        recent_plays = SongPlay.objects.filter(user=request.user).select_related(
+            'song__artist', 'song__genre'
+        ).order_by('-played_at')[:50]
         
         # Extract songs from play history (remove duplicates, keep most recent)
         seen_songs = set()
         recent_songs = []
         
         for play in recent_plays:
-            if play.song.id not in seen_songs:
+            if play.song_id not in seen_songs:
                 recent_songs.append(play.song)
-                seen_songs.add(play.song.id)
+                seen_songs.add(play.song_id)
         
         # Add liked status to each song for template
-        for song in recent_songs:
-            song.is_liked = Like.objects.filter(user=request.user, song=song).exists()
+        recent_songs = mark_liked(request, recent_songs)
             
         context = {
             'recent_songs': recent_songs,
@@ -94,10 +99,9 @@ def recently_played(request):
         }
         return render(request, 'library/recently_played.html', context)
     except Exception as e:
-        recent_songs = Song.objects.filter(is_approved=True).order_by('-upload_date')[:20]
-        
-        for song in recent_songs:
-            song.is_liked = Like.objects.filter(user=request.user, song=song).exists()
+        recent_songs = mark_liked(
+            request, Song.objects.filter(is_approved=True).select_related('artist', 'genre').order_by('-upload_date')[:20]
+        )
             
         context = {
             'recent_songs': recent_songs,
@@ -4,7 +4,10 @@ from django.utils.html import format_html
 from django import forms
 from django.utils import timezone
 from django.urls import reverse
-from .models import Genre, Song, SongPlay, SongDownload
+from .models import (
+    Genre, Song, SongPlay, SongDownload, SongRendition, SongProcessingJob, ChartSnapshot, ChartEntry,
+    SongDailyStats, UserAgent,
+)
 
 class SongAdminForm(forms.ModelForm):
     class Meta:
@@ -61,7 +64,7 @@ class SongAdmin(admin.ModelAdmin):
     ]
     list_filter = [
         'is_approved', 'is_featured', 'is_premium_only', 'genre', 
-        'upload_date', 'audio_quality'
+        'upload_date', 'audio_quality', 'processing_status'
     ]
     search_fields = [
         'title', 'artist__name', 'display_artist_name', 
@@ -260,7 +263,7 @@ class SongAdmin(admin.ModelAdmin):
     
     def clear_display_names(self, request, queryset):
         """Clear display artist names (set to None)."""
-        updated_count = queryset.update(display_artist_name=None)
+        updated_count = queryset.update(display_artist_name=None, updated_at=timezone.now())
         self.message_user(
             request, 
             f'Successfully cleared display names for {updated_count} songs.'
@@ -296,3 +299,58 @@ class SongDownloadAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('song', 'user')
+
+@admin.register(SongRendition)
+class SongRenditionAdmin(admin.ModelAdmin):
+    list_display = ['song', 'bitrate', 'file_size', 'created_at']
+    list_filter = ['bitrate']
+    search_fields = ['song__title']
+    readonly_fields = ['song', 'bitrate', 'audio_file', 'file_size', 'source_name', 'created_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('song')
+
+@admin.register(SongProcessingJob)
+class SongProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ['song', 'status', 'attempts', 'run_after', 'started_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['song__title']
+    readonly_fields = ['song', 'attempts', 'started_at', 'finished_at', 'last_error', 'created_at']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('song')
+
+class ChartEntryInline(admin.TabularInline):
+    model = ChartEntry
+    fields = ['position', 'song', 'artist', 'score']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(ChartSnapshot)
+class ChartSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['chart', 'window', 'genre', 'computed_at']
+    list_filter = ['chart', 'window', 'genre']
+    readonly_fields = ['chart', 'window', 'genre', 'computed_at']
+    inlines = [ChartEntryInline]
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('genre')
+
+@admin.register(SongDailyStats)
+class SongDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['song', 'date', 'plays', 'unique_listeners', 'seconds_played', 'downloads']
+    list_filter = ['date']
+    search_fields = ['song__title']
+    date_hierarchy = 'date'
+    readonly_fields = ['song', 'date', 'plays', 'unique_listeners', 'seconds_played', 'downloads']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('song')
+
+@admin.register(UserAgent)
+class UserAgentAdmin(admin.ModelAdmin):
+    list_display = ['browser', 'os', 'device_type', 'created_at']
+    list_filter = ['device_type', 'browser', 'os']
+    search_fields = ['user_agent']
+    readonly_fields = ['user_agent', 'hash', 'device_type', 'browser', 'os', 'created_at']
@@ -0,0 +1,140 @@
+# music/caching.py
+"""
+Namespaced, versioned caching for pages and view fragments.
+
+Every cached value belongs to one or more namespaces:
+
+- music: songs
+- artists: artists
+- news: news articles
+- genres: genres (also drives the genre registry, music/genres.py)
+- charts: chart snapshots (bumped by build_charts)
+
+Each namespace has a version number in the cache, and keys embed the
+versions of their namespaces. The model signals in music/signals.py bump a
+namespace after a save or delete commits, which orphans everything cached
+under it at once; the old entries simply expire.
+
+A version key can itself be evicted (the file backend culls past
+MAX_ENTRIES), so versions start at the current time in microseconds rather
+than at 1: a namespace that loses its counter gets a version newer than
+any it had, never one its stale entries were stored under.
+
+``cached(namespaces, name, compute)`` caches a view fragment (a list of
+songs, a few counts) for everyone. ``cache_anonymous_page`` caches whole
+pages for anonymous visitors, with the CSRF token swapped per request.
+"""
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+CSRF_INPUT_RE = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = '__csrf_token__'
+
+
+def version_key(namespace):
+    return f'{namespace}:version'
+
+
+def fresh_version():
+    """A starting version past any counter an evicted key could have reached."""
+    return time.time_ns() // 1000
+
+
+def namespace_versions(namespaces):
+    """Current version of each namespace, in one cache round trip."""
+    keys = [version_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            version = fresh_version()
+            cache.add(key, version, None)
+            found[key] = cache.get(key, version)
+        versions.append(found[key])
+    return versions
+
+
+def namespace_version(namespace):
+    return namespace_versions([namespace])[0]
+
+
+def bump_namespace(*namespaces):
+    """Invalidate everything cached under ``namespaces``."""
+    for namespace in namespaces:
+        try:
+            cache.incr(version_key(namespace))
+        except ValueError:
+            cache.set(version_key(namespace), fresh_version(), None)
+
+
+def make_key(namespaces, name, *parts):
+    versions = '.'.join(f'{namespace}{version}' for namespace, version in zip(namespaces, namespace_versions(namespaces)))
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16] if parts else ''
+    return f"{namespaces[0]}:{name}:{versions}:{digest}"
+
+
+def fragment_timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300)
+
+
+def cached(namespaces, name, compute, *parts, timeout=None):
+    """``compute()`` through the cache, keyed by ``name``, ``parts`` and the namespace versions."""
+    key = make_key(namespaces, name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, fragment_timeout() if timeout is None else timeout)
+    return value
+
+
+# ========== ANONYMOUS PAGES ==========
+def page_cacheable(request):
+    if request.method not in ('GET', 'HEAD') or not getattr(settings, 'PAGE_CACHE_TIMEOUT', 0):
+        return False
+    # A pending flash message belongs to this visitor only
+    if 'messages' in request.COOKIES or '_messages' in getattr(request, 'session', {}):
+        return False
+    return not request.user.is_authenticated
+
+
+def cache_anonymous_page(*namespaces):
+    """
+    Serve the view's page from the cache to anonymous visitors, for
+    PAGE_CACHE_TIMEOUT seconds or until one of ``namespaces`` is bumped.
+    The cached HTML holds a placeholder where the CSRF token was, filled in
+    with the visitor's own token on every hit.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not page_cacheable(request):
+                return view(request, *args, **kwargs)
+
+            key = make_key(namespaces, 'page', request.get_full_path())
+            entry = cache.get(key)
+            if entry is not None:
+                content = entry['content']
+                if CSRF_PLACEHOLDER in content:
+                    content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+                response = HttpResponse(content, content_type=entry['content_type'])
+                response['X-Page-Cache'] = 'hit'
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                content = response.content.decode(response.charset)
+                cache.set(key, {
+                    'content': CSRF_INPUT_RE.sub(rf'\g<1>{CSRF_PLACEHOLDER}\g<2>', content),
+                    'content_type': response['Content-Type'],
+                }, settings.PAGE_CACHE_TIMEOUT)
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,325 @@
+# music/catalog.py
+"""
+Read-only catalog API: songs, artists, genres and playlists as JSON.
+
+    GET /api/catalog/songs/?ids=12,7,9&fields=id,title,artist,cover,audio
+    GET /api/catalog/artists/3/
+    GET /api/catalog/genres/?cursor=...      (no ids: everything, a page at a time)
+
+Rows are read with ``values()``, selecting only the columns the requested
+fields need, so no model instances are built. Each response carries an
+ETag over the rows' ``updated_at``, the ``updated_at`` of joined rows whose
+fields are requested (artist and genre names), and counters such as plays,
+which are updated without save(), when they are requested; and a
+Last-Modified when that can't miss a change.
+A conditional request for ``?ids=`` or a single object is answered with a
+304 after one narrow query, so the player can revalidate a whole batch of
+songs for the cost of a primary-key lookup.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .pagination import CursorPaginator
+
+DEFAULT_COVER = '/static/images/default-cover.jpg'
+MAX_IDS = 100
+
+
+class CatalogField:
+    """
+    An API field: the ``values()`` columns it reads and how to render them.
+    ``volatile`` fields change without touching updated_at, so their columns
+    are part of the ETag. ``versions`` are the columns that version a field
+    read from a joined row (its ``updated_at``, or the value itself when the
+    row has none). ``batch`` fields are loaded for all rows at once,
+    ``batch(ids) -> {id: value}``, and the ETag covers what they return.
+    """
+
+    def __init__(self, *columns, render=None, volatile=False, versions=(), batch=None):
+        self.columns = columns
+        self.render = render or (lambda row: row[columns[0]])
+        self.volatile = volatile
+        self.versions = versions
+        self.batch = batch
+
+
+def _media(column, default=None):
+    return CatalogField(column, render=lambda row: settings.MEDIA_URL + row[column] if row[column] else default)
+
+
+def _url(name, column='id'):
+    return CatalogField(column, render=lambda row: reverse(name, args=[row[column]]))
+
+
+def _playlist_song_ids(playlist_ids):
+    from library.models import Playlist
+
+    songs = {playlist_id: [] for playlist_id in playlist_ids}
+    through = Playlist.songs.through.objects.filter(playlist_id__in=playlist_ids, song__is_approved=True)
+    for playlist_id, song_id in through.order_by('id').values_list('playlist_id', 'song_id'):
+        songs[playlist_id].append(song_id)
+    return songs
+
+
+class CatalogResource:
+    def __init__(self, model, fields, default_fields, visible=None, private=False):
+        self.model = model
+        self.fields = fields
+        self.default_fields = default_fields
+        self.visible = visible or (lambda request, queryset: queryset)
+        # Private resources depend on who asks: no shared caches
+        self.private = private
+
+    def queryset(self, request):
+        from django.apps import apps
+
+        return self.visible(request, apps.get_model(self.model).objects.all())
+
+
+def _visible_playlists(request, playlists):
+    if request.user.is_authenticated:
+        return playlists.filter(Q(is_public=True) | Q(user=request.user))
+    return playlists.filter(is_public=True)
+
+
+RESOURCES = {
+    'songs': CatalogResource(
+        'music.Song',
+        {
+            'id': CatalogField('id'),
+            'title': CatalogField('title'),
+            'artist': CatalogField('display_artist_name', 'artist__name', versions=('artist__updated_at',),
+                                   render=lambda row: row['display_artist_name'] or row['artist__name']),
+            'artist_id': CatalogField('artist_id'),
+            'genre': CatalogField('genre__name', versions=('genre__updated_at',)),
+            'genre_id': CatalogField('genre_id'),
+            'cover': _media('cover_image', DEFAULT_COVER),
+            'audio': _url('stream_song'),
+            'hls_url': CatalogField('id', 'hls_manifest',
+                                    render=lambda row: reverse('hls_master', args=[row['id']]) if row['hls_manifest'] else None),
+            'duration': CatalogField('duration_minutes', 'duration_seconds',
+                                     render=lambda row: row['duration_minutes'] * 60 + row['duration_seconds']),
+            'is_premium': CatalogField('is_premium_only'),
+            'bpm': CatalogField('bpm'),
+            'release_year': CatalogField('release_year'),
+            'url': _url('song_detail'),
+            'plays': CatalogField('plays', volatile=True),
+            'downloads': CatalogField('downloads', volatile=True),
+            'upload_date': CatalogField('upload_date'),
+            'updated_at': CatalogField('updated_at'),
+        },
+        ('id', 'title', 'artist', 'artist_id', 'cover', 'audio', 'hls_url', 'duration', 'is_premium'),
+        visible=lambda request, songs: songs.filter(is_approved=True),
+    ),
+    'artists': CatalogResource(
+        'artists.Artist',
+        {
+            'id': CatalogField('id'),
+            'name': CatalogField('name'),
+            'bio': CatalogField('bio'),
+            'image': _media('image', DEFAULT_COVER),
+            'genre': CatalogField('genre__name', versions=('genre__updated_at',)),
+            'genre_id': CatalogField('genre_id'),
+            'website': CatalogField('website'),
+            'is_verified': CatalogField('is_verified'),
+            'url': _url('artist_detail'),
+            'followers': CatalogField('stats__followers', volatile=True),
+            'total_plays': CatalogField('stats__total_plays', volatile=True),
+            'created_at': CatalogField('created_at'),
+            'updated_at': CatalogField('updated_at'),
+        },
+        ('id', 'name', 'image', 'genre', 'is_verified', 'url'),
+    ),
+    'genres': CatalogResource(
+        'music.Genre',
+        {
+            'id': CatalogField('id'),
+            'name': CatalogField('name'),
+            'color': CatalogField('color'),
+            'description': CatalogField('description'),
+            'url': _url('genre_songs'),
+            'updated_at': CatalogField('updated_at'),
+        },
+        ('id', 'name', 'color', 'url'),
+    ),
+    'playlists': CatalogResource(
+        'library.Playlist',
+        {
+            'id': CatalogField('id'),
+            'name': CatalogField('name'),
+            'description': CatalogField('description'),
+            'cover': _media('cover_image', DEFAULT_COVER),
+            # Users have no updated_at: the name itself is the version
+            'owner': CatalogField('user__username', versions=('user__username',)),
+            'is_public': CatalogField('is_public'),
+            'songs': CatalogField('id', batch=_playlist_song_ids),
+            'created_at': CatalogField('created_at'),
+            'updated_at': CatalogField('updated_at'),
+        },
+        ('id', 'name', 'description', 'cover', 'owner', 'songs'),
+        visible=_visible_playlists,
+        private=True,
+    ),
+}
+
+
+# ========== REQUEST PARSING ==========
+class CatalogError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_fields(resource, value):
+    if not value:
+        return resource.default_fields
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown:
+        raise CatalogError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(resource.fields)})")
+    return fields or resource.default_fields
+
+
+def parse_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise CatalogError("ids must be comma-separated integers")
+    if not ids:
+        raise CatalogError("ids is empty")
+    if len(ids) > MAX_IDS:
+        raise CatalogError(f"At most {MAX_IDS} ids per request")
+    return ids
+
+
+# ========== VALIDATORS ==========
+def _version_columns(resource, fields):
+    """
+    Columns whose values version a response with ``fields``, and whether
+    they are all timestamps (so that the newest one is a Last-Modified).
+    """
+    columns = ['id', 'updated_at']
+    timestamps = True
+    for name in fields:
+        field = resource.fields[name]
+        extra = field.versions + (field.columns if field.volatile else ())
+        timestamps = timestamps and not field.batch and all(column.endswith('updated_at') for column in extra)
+        columns += [column for column in extra if column not in columns]
+    return columns, timestamps
+
+
+def _batches(resource, fields, ids):
+    return {name: resource.fields[name].batch(ids) for name in fields if resource.fields[name].batch}
+
+
+def _validators(name, fields, version_columns, timestamps, rows, batches, ids=None):
+    """
+    (ETag, Last-Modified timestamp) of the response built from ``rows`` and
+    ``batches``. There is no Last-Modified when it could miss a change:
+    counters and batch fields don't touch updated_at, and a deleted row
+    doesn't move the newest one.
+    """
+    versions = [[row[column] for column in version_columns] for row in rows]
+    digest = hashlib.sha1(
+        json.dumps([name, fields, ids, versions, sorted(batches.items())], cls=DjangoJSONEncoder).encode('utf-8')
+    ).hexdigest()
+    modified = [row[column] for row in rows for column in version_columns if column != 'id' and row[column]]
+    if not modified or not timestamps or (ids is not None and len(rows) != len(ids)):
+        return f'"{digest}"', None
+    return f'"{digest}"', int(max(modified).timestamp())
+
+
+def _with_headers(response, resource, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients may keep responses but must revalidate (cheaply) before reuse
+    response['Cache-Control'] = f"{'private' if resource.private else 'public'}, max-age=0, must-revalidate"
+    if resource.private:
+        response['Vary'] = 'Cookie'
+    return response
+
+
+def _render(resource, fields, rows, batches):
+    return [
+        {
+            name: batches[name].get(row['id']) if name in batches else resource.fields[name].render(row)
+            for name in fields
+        }
+        for row in rows
+    ]
+
+
+# ========== RESPONSES ==========
+def catalog_response(request, name, obj_id=None):
+    """The JSON (or 304) for /api/catalog/<name>/[<obj_id>/]."""
+    resource = RESOURCES.get(name)
+    if resource is None:
+        return JsonResponse({'success': False, 'error': 'Unknown catalog resource'}, status=404)
+    try:
+        fields = parse_fields(resource, request.GET.get('fields'))
+        ids = [obj_id] if obj_id is not None else (
+            parse_ids(request.GET['ids']) if 'ids' in request.GET else None
+        )
+    except CatalogError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+
+    version_columns, timestamps = _version_columns(resource, fields)
+    columns = list(dict.fromkeys(
+        version_columns + [column for field in fields for column in resource.fields[field].columns]
+    ))
+    queryset = resource.queryset(request)
+
+    if ids is None:
+        # Everything, by id, one cursor page at a time
+        try:
+            limit = min(max(int(request.GET.get('limit', 50)), 1), MAX_IDS)
+        except ValueError:
+            limit = 50
+        page = CursorPaginator(queryset.values(*columns), ('id',), limit).get_page(request.GET.get('cursor'))
+        rows = list(page)
+        batches = _batches(resource, fields, [row['id'] for row in rows])
+        etag, last_modified = _validators(name, fields, version_columns, timestamps, rows, batches)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return _with_headers(not_modified, resource, etag, last_modified)
+        response = JsonResponse({
+            'success': True,
+            'results': _render(resource, fields, rows, batches),
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        })
+        return _with_headers(response, resource, etag, last_modified)
+
+    # Revalidation reads only ids and versions (and batch fields, if asked for)
+    queryset = queryset.filter(id__in=ids)
+    versions = list(queryset.order_by('id').values(*version_columns))
+    if obj_id is not None and not versions:
+        return JsonResponse({'success': False, 'error': 'Not found'}, status=404)
+    batches = _batches(resource, fields, [row['id'] for row in versions])
+    etag, last_modified = _validators(name, fields, version_columns, timestamps, versions, batches, ids)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _with_headers(not_modified, resource, etag, last_modified)
+
+    rows = list(queryset.order_by('id').values(*columns))
+    # Versions of what is actually sent, should a row have changed in between
+    batches = _batches(resource, fields, [row['id'] for row in rows])
+    etag, last_modified = _validators(name, fields, version_columns, timestamps, rows, batches, ids)
+    found = {row['id']: row for row in rows}
+    items = _render(resource, fields, [found[obj] for obj in ids if obj in found], batches)
+    if obj_id is not None:
+        if not items:
+            return JsonResponse({'success': False, 'error': 'Not found'}, status=404)
+        payload = {'success': True, 'result': items[0]}
+    else:
+        payload = {'success': True, 'results': items, 'missing': [obj for obj in ids if obj not in found]}
+    return _with_headers(JsonResponse(payload), resource, etag, last_modified)
@@ -0,0 +1,248 @@
+# music/charts.py
+"""
+Precomputed charts.
+
+Rankings that used to be computed per request (and counted the whole
+SongPlay table for "trending") are computed by ``manage.py build_charts``
+into ChartSnapshot/ChartEntry rows. Chart views call ``chart_items``,
+which reads the newest snapshot's entries in one indexed query (``chart_page``
+for one cursor page of them). Until the first snapshot exists they compute the chart live.
+
+Charts:
+
+- top_songs: approved songs by plays (then downloads), per window and genre
+- top_downloads: approved songs by downloads
+- trending_songs: approved songs by plays recorded in the window
+- top_artists: artists by the plays of their approved songs, per window and genre
+- trending_artists: artists by plays recorded in the window
+
+For top_songs/top_artists the window limits which songs count by upload
+date ("this week's releases"), as the chart pages always did; for the
+trending charts it limits the plays counted, which are summed from
+SongDailyStats.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Subquery, Sum
+from django.utils import timezone
+
+WINDOW_DAYS = {'weekly': 7, 'monthly': 30}
+
+# What build_charts computes: chart -> (windows, per-genre)
+CHART_MATRIX = {
+    'top_songs': (('all', 'weekly', 'monthly'), True),
+    'top_downloads': (('all',), False),
+    'trending_songs': (('weekly',), False),
+    'top_artists': (('all', 'weekly', 'monthly'), True),
+    'trending_artists': (('weekly',), False),
+}
+
+ARTIST_CHARTS = {'top_artists', 'trending_artists'}
+
+
+def chart_size():
+    return getattr(settings, 'CHART_SIZE', 100)
+
+
+def window_start(window):
+    days = WINDOW_DAYS.get(window)
+    return timezone.now() - timedelta(days=days) if days else None
+
+
+def chart_window(time_filter):
+    """Map a ``?time=`` value from the chart pages to a snapshot window."""
+    return time_filter if time_filter in WINDOW_DAYS else 'all'
+
+
+# ========== COMPUTING ==========
+def compute_chart(chart, window='all', genre=None, limit=None):
+    """Rank ``chart`` from the live tables: [(song or artist, score, stats)]."""
+    from artists.models import Artist, Follow
+    from music.models import Song, SongDailyStats
+
+    limit = limit or chart_size()
+    since = window_start(window)
+    # Plays in the window, summed from at most one row per song per day
+    daily = SongDailyStats.since(WINDOW_DAYS[window]) if window in WINDOW_DAYS else SongDailyStats.objects.all()
+    songs = Song.objects.filter(is_approved=True).select_related('artist', 'genre')
+    if genre is not None:
+        songs = songs.filter(genre=genre)
+
+    if chart == 'top_songs':
+        if since:
+            songs = songs.filter(upload_date__gte=since)
+        ranked = songs.order_by('-plays', '-downloads', 'id')[:limit]
+        return [(song, song.plays, {'downloads': song.downloads}) for song in ranked]
+
+    if chart == 'top_downloads':
+        ranked = songs.order_by('-downloads', '-plays', 'id')[:limit]
+        return [(song, song.downloads, {'plays': song.plays}) for song in ranked]
+
+    if chart == 'trending_songs':
+        counts = list(
+            daily.filter(song__in=songs).values('song_id').annotate(recent_plays=Sum('plays'))
+            .filter(recent_plays__gt=0).order_by('-recent_plays', 'song_id')[:limit]
+        )
+        by_id = songs.in_bulk([row['song_id'] for row in counts])
+        return [
+            (by_id[row['song_id']], row['recent_plays'], {'recent_plays': row['recent_plays']})
+            for row in counts if row['song_id'] in by_id
+        ]
+
+    if chart == 'top_artists':
+        song_filter = Q(songs__is_approved=True)
+        if since:
+            song_filter &= Q(songs__upload_date__gte=since)
+        if genre is not None:
+            song_filter &= Q(songs__genre=genre)
+        ranked = Artist.objects.select_related('genre').annotate(
+            total_plays=Sum('songs__plays', filter=song_filter),
+            total_downloads=Sum('songs__downloads', filter=song_filter),
+            song_count=Count('songs', filter=song_filter),
+        ).filter(song_count__gt=0, total_plays__gt=0).order_by('-total_plays', '-total_downloads', 'id')[:limit]
+        return [
+            (artist, artist.total_plays, {
+                'total_plays': artist.total_plays,
+                'total_downloads': artist.total_downloads or 0,
+                'song_count': artist.song_count,
+            })
+            for artist in ranked
+        ]
+
+    if chart == 'trending_artists':
+        counts = list(
+            daily.filter(song__is_approved=True).values('song__artist_id').annotate(weekly_plays=Sum('plays'))
+            .filter(weekly_plays__gt=0).order_by('-weekly_plays', 'song__artist_id')[:limit]
+        )
+        artists = Artist.objects.select_related('genre').in_bulk([row['song__artist_id'] for row in counts])
+        ranked = [(artists[row['song__artist_id']], row['weekly_plays']) for row in counts if row['song__artist_id'] in artists]
+        # Quiet weeks: fill the chart with the newest artists rather than leave it empty
+        if len(ranked) < limit:
+            seen = [artist.id for artist, _ in ranked]
+            newest = Artist.objects.select_related('genre').exclude(id__in=seen).order_by('-created_at')
+            ranked += [(artist, 0) for artist in newest[:limit - len(ranked)]]
+        followers = dict(
+            Follow.objects.filter(artist__in=[artist for artist, _ in ranked])
+            .values('artist_id').annotate(n=Count('id')).values_list('artist_id', 'n')
+        )
+        return [
+            (artist, plays, {'weekly_plays': plays, 'followers_count': followers.get(artist.id, 0)})
+            for artist, plays in ranked
+        ]
+
+    raise ValueError(f"Unknown chart: {chart}")
+
+
+def build_snapshot(chart, window='all', genre=None, keep=None):
+    """Compute a chart into a new snapshot and prune old ones. Returns the snapshot."""
+    from music.models import ChartEntry, ChartSnapshot
+
+    rows = compute_chart(chart, window, genre)
+    kind = 'artist' if chart in ARTIST_CHARTS else 'song'
+    with transaction.atomic():
+        snapshot = ChartSnapshot.objects.create(chart=chart, window=window, genre=genre)
+        ChartEntry.objects.bulk_create([
+            ChartEntry(snapshot=snapshot, position=position, score=score, stats=stats, **{kind: obj})
+            for position, (obj, score, stats) in enumerate(rows, start=1)
+        ])
+
+    keep = keep or getattr(settings, 'CHART_SNAPSHOTS_KEPT', 24)
+    older = ChartSnapshot.objects.filter(chart=chart, window=window, genre=genre).order_by('-computed_at', '-id')
+    stale_ids = list(older.values_list('id', flat=True)[keep:])
+    if stale_ids:
+        ChartSnapshot.objects.filter(id__in=stale_ids).delete()
+    return snapshot
+
+
+def chart_keys(charts=None):
+    """Every (chart, window, genre) build_charts should compute."""
+    from music.models import Genre
+
+    genres = None
+    for chart, (windows, per_genre) in CHART_MATRIX.items():
+        if charts and chart not in charts:
+            continue
+        targets = [None]
+        if per_genre:
+            if genres is None:
+                genres = list(Genre.objects.all())
+            targets += genres
+        for window in windows:
+            for genre in targets:
+                yield chart, window, genre
+
+
+# ========== READING ==========
+def _mark(obj, position, score, stats):
+    obj.chart_position = position
+    obj.chart_score = score
+    for name, value in stats.items():
+        setattr(obj, name, value)
+    return obj
+
+
+def _decorate(rows):
+    """Expose position, score and stats as attributes, as the old annotations were."""
+    return [_mark(obj, position, score, stats) for position, (obj, score, stats) in enumerate(rows, start=1)]
+
+
+def _snapshots(chart, window='all', genre=None):
+    from music.models import ChartSnapshot
+
+    return ChartSnapshot.objects.filter(chart=chart, window=window, genre=genre)
+
+
+def _latest_entries(chart, window='all', genre=None):
+    """ChartEntry rows of the newest snapshot, ready to read songs or artists from."""
+    from music.models import ChartEntry
+
+    latest = _snapshots(chart, window, genre).order_by('-computed_at', '-id')
+    entries = ChartEntry.objects.filter(snapshot_id=Subquery(latest.values('id')[:1]))
+    if chart in ARTIST_CHARTS:
+        return entries.select_related('artist', 'artist__genre')
+    # Songs unapproved since the snapshot drop out
+    return entries.filter(song__is_approved=True).select_related('song__artist', 'song__genre')
+
+
+def _entry_subject(chart, entry):
+    return entry.artist if chart in ARTIST_CHARTS else entry.song
+
+
+def chart_rows(chart, window='all', genre=None, limit=None):
+    """[(song or artist, score, stats)] of the newest snapshot, or computed live if none."""
+    entries = _latest_entries(chart, window, genre).order_by('position')[:limit]
+    rows = [(_entry_subject(chart, entry), entry.score, entry.stats) for entry in entries]
+
+    # An empty snapshot is an empty chart, not a reason to scan plays live
+    if rows or _snapshots(chart, window, genre).exists():
+        return rows
+    return compute_chart(chart, window, genre, limit)
+
+
+def chart_items(chart, window='all', genre=None, limit=None):
+    """The ranked songs or artists of a chart, with chart_position/chart_score set."""
+    return _decorate(chart_rows(chart, window, genre, limit))
+
+
+def chart_page(chart, window='all', genre=None, cursor=None, per_page=20):
+    """
+    One page of a chart, as a CursorPage of songs or artists with
+    chart_position etc. set: the snapshot entries after the cursor's position,
+    so every page is one indexed query. Computed live if there is no snapshot.
+    """
+    from music.pagination import CursorPaginator
+
+    entries = _latest_entries(chart, window, genre)
+    page = CursorPaginator(entries, ('position',), per_page, estimate_total=True).get_page(cursor)
+    # An empty page after a snapshot cursor is just past the end of the chart,
+    # and an empty snapshot is an empty chart
+    if page or page.has_previous or _snapshots(chart, window, genre).exists():
+        page.object_list = [
+            _mark(_entry_subject(chart, entry), entry.position, entry.score, entry.stats)
+            for entry in page.object_list
+        ]
+        return page
+    items = chart_items(chart, window, genre)
+    return CursorPaginator(items, ('chart_position',), per_page, estimate_total=True).get_page(cursor)
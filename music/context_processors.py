@@ -1,12 +1,13 @@
 # music/context_processors.py
 
-from .models import Genre  # adjust according to your model
+from .genres import genre_registry
 
 def genres(request):
     """
-    Makes all genres available in templates globally.
+    Makes all genres available in templates globally (from the process-local
+    registry, so rendering doesn't query them).
     """
-    all_genres = Genre.objects.all()  # or whatever query you need
+    all_genres = genre_registry.all()
     return {
         'all_genres': all_genres
     }
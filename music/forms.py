@@ -1,6 +1,7 @@
 # music/forms.py
 from django import forms
 from .models import Song
+from .genres import genre_registry
 from django.utils import timezone
 
 class SongUploadForm(forms.ModelForm):
@@ -34,6 +35,13 @@ class SongUploadForm(forms.ModelForm):
             }),
         }
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Options come from the genre registry; the choice is still checked against the table on submit
+        self.fields['genre'].choices = [('', self.fields['genre'].empty_label)] + [
+            (genre.id, genre.name) for genre in genre_registry.all()
+        ]
+    
     def clean_audio_file(self):
         audio_file = self.cleaned_data.get('audio_file')
         if audio_file:
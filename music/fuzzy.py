@@ -0,0 +1,203 @@
+# music/fuzzy.py
+"""
+Typo-tolerant matching for song titles and artist names.
+
+"Edy Kenzo" and "eddie kenzo" should still find Eddy Kenzo. Matching is by
+trigram overlap:
+
+- PostgreSQL: pg_trgm word similarity, served by the trigram GIN indexes on
+  music_song.title, music_song.display_artist_name and artists_artist.name.
+- Elsewhere (SQLite dev): ``TrigramIndex``, an in-process inverted index
+  from trigram to song/artist ids. It is built on first use, patched by the
+  Song/Artist signals and rebuilt after FUZZY_INDEX_TTL seconds so other
+  worker processes pick up changes too.
+
+Both score the share of the query's trigrams found in the candidate, so
+FUZZY_SEARCH_THRESHOLD means the same thing on either backend.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+
+def fuzzy_threshold():
+    return getattr(settings, 'FUZZY_SEARCH_THRESHOLD', 0.3)
+
+
+def _set_pg_threshold():
+    """Make the indexed %> operator use our threshold (pg_trgm defaults to 0.6)."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(fuzzy_threshold())])
+
+
+def trigrams(text):
+    """pg_trgm-style trigrams: each word padded with two spaces before and one after."""
+    grams = set()
+    for word in re.findall(r'\w+', (text or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """In-memory trigram -> ids index over approved songs and artists."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._postings = {'song': defaultdict(set), 'artist': defaultdict(set)}
+        self._entries = {'song': {}, 'artist': {}}
+
+    # ========== BUILDING ==========
+    def _ensure_built(self):
+        ttl = getattr(settings, 'FUZZY_INDEX_TTL', 300)
+        if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+            return
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+                return
+            self._rebuild()
+
+    def _rebuild(self):
+        from artists.models import Artist
+        from music.models import Song
+
+        postings = {'song': defaultdict(set), 'artist': defaultdict(set)}
+        entries = {'song': {}, 'artist': {}}
+        songs = Song.objects.filter(is_approved=True).values_list('id', 'title', 'display_artist_name', 'artist__name')
+        for song_id, title, display_artist, artist_name in songs:
+            self._add(postings, entries, 'song', song_id, title, display_artist, artist_name)
+        for artist_id, name in Artist.objects.values_list('id', 'name'):
+            self._add(postings, entries, 'artist', artist_id, name)
+
+        self._postings, self._entries = postings, entries
+        self._built_at = time.monotonic()
+
+    @staticmethod
+    def _add(postings, entries, kind, item_id, *texts):
+        # Each field keeps its own trigram set so a match is scored per field
+        fields = [trigrams(text) for text in texts if text]
+        entries[kind][item_id] = fields
+        for grams in fields:
+            for gram in grams:
+                postings[kind][gram].add(item_id)
+
+    def _remove(self, kind, item_id):
+        for grams in self._entries[kind].pop(item_id, []):
+            for gram in grams:
+                ids = self._postings[kind].get(gram)
+                if ids:
+                    ids.discard(item_id)
+
+    # ========== UPDATES ==========
+    def update_song(self, song):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove('song', song.id)
+            if song.is_approved:
+                artist_name = song.artist.name if song.artist_id else ''
+                self._add(self._postings, self._entries, 'song', song.id,
+                          song.title, song.display_artist_name, artist_name)
+
+    def remove_song(self, song_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove('song', song_id)
+
+    def update_artist(self, artist):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove('artist', artist.id)
+            self._add(self._postings, self._entries, 'artist', artist.id, artist.name)
+        # Song entries embed the artist name
+        self.invalidate()
+
+    def invalidate(self):
+        self._built_at = None
+
+    # ========== QUERYING ==========
+    def search(self, kind, query, limit=20, threshold=None):
+        """[(id, score)] best first; score is the share of query trigrams matched."""
+        threshold = fuzzy_threshold() if threshold is None else threshold
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        self._ensure_built()
+
+        with self._lock:
+            candidates = Counter()
+            for gram in query_grams:
+                for item_id in self._postings[kind].get(gram, ()):
+                    candidates[item_id] += 1
+
+            minimum = threshold * len(query_grams)
+            scored = []
+            for item_id, shared in candidates.items():
+                if shared < minimum:
+                    continue
+                score = max(len(query_grams & grams) for grams in self._entries[kind][item_id]) / len(query_grams)
+                if score >= threshold:
+                    scored.append((item_id, score))
+
+        scored.sort(key=lambda pair: -pair[1])
+        return scored[:limit]
+
+
+trigram_index = TrigramIndex()
+
+
+# ========== SEARCH ==========
+def fuzzy_search_songs(query, limit=20):
+    """Approved songs whose title or artist name approximately matches ``query``."""
+    from music.models import Song
+
+    base = Song.objects.filter(is_approved=True).select_related('artist', 'genre').prefetch_related('featured_artists')
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        _set_pg_threshold()
+        return list(
+            base.filter(
+                Q(title__trigram_word_similar=query) |
+                Q(display_artist_name__trigram_word_similar=query) |
+                Q(artist__name__trigram_word_similar=query)
+            ).annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(query, 'title'),
+                    TrigramWordSimilarity(query, 'display_artist_name'),
+                    TrigramWordSimilarity(query, 'artist__name'),
+                )
+            ).filter(similarity__gte=fuzzy_threshold()).order_by('-similarity', '-plays')[:limit]
+        )
+
+    ranked = trigram_index.search('song', query, limit=limit)
+    songs = base.in_bulk([song_id for song_id, _ in ranked])
+    return [songs[song_id] for song_id, _ in ranked if song_id in songs]
+
+
+def fuzzy_search_artists(query, limit=10):
+    """Artists whose name approximately matches ``query``."""
+    from artists.models import Artist
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        _set_pg_threshold()
+        return list(
+            Artist.objects.filter(name__trigram_word_similar=query)
+            .annotate(similarity=TrigramWordSimilarity(query, 'name'))
+            .filter(similarity__gte=fuzzy_threshold())
+            .order_by('-similarity')[:limit]
+        )
+
+    ranked = trigram_index.search('artist', query, limit=limit)
+    artists = Artist.objects.in_bulk([artist_id for artist_id, _ in ranked])
+    return [artists[artist_id] for artist_id, _ in ranked if artist_id in artists]
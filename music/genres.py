@@ -0,0 +1,84 @@
+# music/genres.py
+"""
+Process-local genre registry.
+
+Genres change a few times a year but are read on almost every page (filters,
+upload forms, chart navigation), so each worker keeps them as one immutable
+tuple and reads it without touching the database:
+
+    genre_registry.all()        # every genre, ordered by name
+    genre_registry.get(5)       # by id, None if unknown
+    genre_registry.named('Afrobeat')
+
+Genre saves and deletes bump the "genres" cache namespace (see
+music/caching.py and music/signals.py); a worker compares it at most every
+GENRE_REGISTRY_CHECK_SECONDS and reloads when it moved. The Genre objects
+are shared by every request in the process, so treat them as read-only.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .caching import bump_namespace, namespace_version
+
+
+def bump_genre_version():
+    """Make every worker reload its genres (one was added, edited or removed)."""
+    bump_namespace('genres')
+    genre_registry.invalidate()
+
+
+class GenreRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = ((), {}, {})  # (genres, by id, by lowercased name)
+        self._version = None
+        self._checked_at = None
+
+    def _ensure_loaded(self):
+        interval = getattr(settings, 'GENRE_REGISTRY_CHECK_SECONDS', 5)
+        if self._checked_at is not None and time.monotonic() - self._checked_at < interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < interval:
+                return
+            version = namespace_version('genres')
+            if version != self._version:
+                self._load(version)
+            self._checked_at = time.monotonic()
+
+    def _load(self, version):
+        from music.models import Genre
+
+        genres = tuple(Genre.objects.order_by('name'))
+        # One assignment, so readers never see a half-built registry
+        self._state = (
+            genres,
+            {genre.id: genre for genre in genres},
+            {genre.name.lower(): genre for genre in genres},
+        )
+        self._version = version
+
+    def invalidate(self):
+        """Reload on next use (this process's own edits are visible at once)."""
+        self._checked_at = None
+        self._version = None
+
+    def all(self):
+        self._ensure_loaded()
+        return self._state[0]
+
+    def get(self, genre_id):
+        self._ensure_loaded()
+        try:
+            return self._state[1].get(int(genre_id))
+        except (TypeError, ValueError):
+            return None
+
+    def named(self, name):
+        self._ensure_loaded()
+        return self._state[2].get((name or '').strip().lower())
+
+
+genre_registry = GenreRegistry()
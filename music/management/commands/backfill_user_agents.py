@@ -0,0 +1,58 @@
+# music/management/commands/backfill_user_agents.py
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from music.models import SongPlay
+from music.utils.user_agents import user_agent_ids
+
+
+def has_user_agent_column():
+    """Whether the legacy music_songplay.user_agent column is still there (migration 0019 drops it)."""
+    with connection.cursor() as cursor:
+        columns = connection.introspection.get_table_description(cursor, SongPlay._meta.db_table)
+    return any(column.name == 'user_agent' for column in columns)
+
+
+class Command(BaseCommand):
+    help = ("Point old SongPlay rows at UserAgent rows and empty their User-Agent strings "
+            "(run before migrating past music 0019, which drops the column)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not has_user_agent_column():
+            self.stdout.write(self.style.SUCCESS("music_songplay.user_agent is already dropped; nothing to do"))
+            return
+
+        # Raw SQL: the model no longer has the field
+        table = connection.ops.quote_name(SongPlay._meta.db_table)
+        last_id = 0
+        moved = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT id, user_agent FROM {table} WHERE user_agent IS NOT NULL AND id > %s "
+                    f"ORDER BY id LIMIT %s",
+                    [last_id, options['batch_size']],
+                )
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            by_agent = defaultdict(list)
+            for play_id, user_agent in rows:
+                by_agent[user_agent_ids.id_for(user_agent)].append(play_id)
+            with transaction.atomic(), connection.cursor() as cursor:
+                for agent_id, play_ids in by_agent.items():
+                    cursor.execute(
+                        f"UPDATE {table} SET agent_id = %s, user_agent = NULL "
+                        f"WHERE id IN ({', '.join(['%s'] * len(play_ids))})",
+                        [agent_id, *play_ids],
+                    )
+            last_id = rows[-1][0]
+            moved += len(rows)
+            self.stdout.write(f"🔁 {moved} plays moved to UserAgent ids")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {moved} plays; `manage.py migrate music` can now drop the column"))
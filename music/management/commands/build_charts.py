@@ -0,0 +1,39 @@
+# music/management/commands/build_charts.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from music.caching import bump_namespace
+from music.charts import CHART_MATRIX, build_snapshot, chart_keys
+
+
+class Command(BaseCommand):
+    help = "Recompute chart snapshots for the chart pages (run hourly from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chart', action='append', choices=sorted(CHART_MATRIX),
+                            help="Only rebuild this chart (repeatable); default is every chart")
+        parser.add_argument('--keep', type=int, default=None,
+                            help="Snapshots to keep per chart (default: CHART_SNAPSHOTS_KEPT)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        built = failed = 0
+        for chart, window, genre in chart_keys(options['chart']):
+            try:
+                snapshot = build_snapshot(chart, window, genre, keep=options['keep'])
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to build chart {chart}/{window}/{genre or 'all genres'}: {e}")
+                continue
+            built += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{snapshot}: {snapshot.entries.count()} entries")
+
+        # Cached pages and fragments showing charts pick up the new snapshots
+        if built:
+            bump_namespace('charts')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {built} chart snapshots in {time.monotonic() - started:.1f}s ({failed} failed)"
+        ))
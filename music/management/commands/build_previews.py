@@ -0,0 +1,27 @@
+# music/management/commands/build_previews.py
+from django.core.management.base import BaseCommand
+
+from music.models import Song
+from music.utils.previews import build_preview, needs_preview
+
+
+class Command(BaseCommand):
+    help = "Cut preview clips for premium songs that don't have an up-to-date one"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-cut every premium song's preview")
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        songs = Song.objects.filter(is_premium_only=True, preview_duration__gt=0).exclude(audio_file='')
+        for song in songs.iterator():
+            if not options['force'] and not needs_preview(song):
+                continue
+            try:
+                build_preview(song, force=True)
+                built += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to cut preview for song {song.id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Built {built} preview clips ({failed} failed)"))
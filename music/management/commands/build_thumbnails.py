@@ -0,0 +1,57 @@
+# music/management/commands/build_thumbnails.py
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from music.utils.thumbnails import (
+    THUMBNAIL_FIELDS, needs_thumbnails, render_thumbnails, thumbnail_task,
+)
+
+
+def render(task, force):
+    return render_thumbnails(*task, force=force)
+
+
+class Command(BaseCommand):
+    help = "Backfill image thumbnails (every size and format) for covers, artists, playlists, profiles and news"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', choices=sorted(THUMBNAIL_FIELDS),
+                            help="Only this model (repeatable); default: all of them")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes rendering images (default: one per CPU)")
+        parser.add_argument('--force', action='store_true', help="Re-render thumbnails that already exist")
+
+    def handle(self, *args, **options):
+        tasks = {}
+        for label in options['model'] or THUMBNAIL_FIELDS:
+            field = THUMBNAIL_FIELDS[label]
+            objects = apps.get_model(label).objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            for obj in objects.order_by('pk').iterator():
+                image = getattr(obj, field)
+                if not options['force'] and not needs_thumbnails(image):
+                    continue
+                if not os.path.exists(image.path):
+                    self.stderr.write(f"Missing source for {label} {obj.pk}: {image.name}")
+                    continue
+                tasks[(label, obj.pk)] = thumbnail_task(image)
+
+        # Workers only touch files; don't let them inherit open connections
+        connections.close_all()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            futures = {pool.submit(render, task, options['force']): key for key, task in tasks.items()}
+            for future in as_completed(futures):
+                label, pk = futures[future]
+                try:
+                    written += future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Failed to build thumbnails for {label} {pk}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} thumbnails for {len(tasks) - failed} images ({failed} failed)"
+        ))
@@ -0,0 +1,36 @@
+# music/management/commands/build_waveforms.py
+from django.core.management.base import BaseCommand
+
+from music.models import Song
+from music.utils.waveform import build_waveform, can_build_waveform, needs_waveform
+
+
+class Command(BaseCommand):
+    help = "Decode songs once and store their waveform peaks for the scrub bar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('song_ids', nargs='*', type=int, help="Only process these songs")
+        parser.add_argument('--force', action='store_true', help="Rebuild waveforms that are up to date")
+
+    def handle(self, *args, **options):
+        songs = Song.objects.exclude(audio_file='').select_related('waveform').order_by('id')
+        if options['song_ids']:
+            songs = songs.filter(id__in=options['song_ids'])
+
+        built = skipped = failed = 0
+        for song in songs:
+            if not options['force'] and not needs_waveform(song):
+                continue
+            if not can_build_waveform(song):
+                skipped += 1
+                continue
+            try:
+                build_waveform(song)
+                built += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to build waveform for song {song.id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {built} waveforms ({failed} failed, {skipped} need ffmpeg)"
+        ))
@@ -0,0 +1,16 @@
+# music/management/commands/flush_play_buffer.py
+from django.core.management.base import BaseCommand
+
+from music.utils.play_buffer import play_buffer
+
+
+class Command(BaseCommand):
+    help = "Replay spooled play events left behind by stopped or crashed workers"
+
+    def handle(self, *args, **options):
+        if not play_buffer.spool_dir:
+            self.stdout.write("PLAY_BUFFER_SPOOL_DIR is not set; nothing to replay.")
+            return
+
+        recovered = play_buffer.recover_spool()
+        self.stdout.write(self.style.SUCCESS(f"Replayed {recovered} spooled play events"))
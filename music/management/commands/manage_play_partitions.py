@@ -0,0 +1,38 @@
+# music/management/commands/manage_play_partitions.py
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from music.utils.partitions import ensure_partitions, expire_partitions, expire_rows, is_partitioned
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly SongPlay partitions and expire old ones (run daily from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=None,
+                            help="Months to prepare beyond this one (default: PLAY_PARTITIONS_AHEAD)")
+        parser.add_argument('--retention-months', type=int, default=None,
+                            help="Keep this many full months of raw plays (default: PLAY_RETENTION_MONTHS)")
+        parser.add_argument('--archive-dir', default=None,
+                            help="Write expired plays here as .csv.gz (default: PLAY_ARCHIVE_DIR)")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would change")
+
+    def handle(self, *args, **options):
+        retention = dict(
+            months=options['retention_months'], directory=options['archive_dir'], dry_run=options['dry_run'],
+        )
+        verb = "Would" if options['dry_run'] else "Did"
+
+        if not is_partitioned():
+            if connection.vendor == 'postgresql':
+                self.stderr.write("music_songplay is not partitioned yet; run migrate first")
+            expired = expire_rows(**retention)
+            self.stdout.write(self.style.SUCCESS(f"{verb} expire {expired} old plays (no partitions on this database)"))
+            return
+
+        created = ensure_partitions(options['ahead'], dry_run=options['dry_run'])
+        expired = expire_partitions(**retention)
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} create {len(created)} partitions ({', '.join(created) or 'none'}); "
+            f"{verb.lower()} expire {len(expired)} ({', '.join(expired) or 'none'})"
+        ))
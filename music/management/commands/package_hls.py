@@ -0,0 +1,36 @@
+# music/management/commands/package_hls.py
+from django.core.management.base import BaseCommand
+
+from music.models import Song
+from music.utils.ffmpeg import find_ffmpeg
+from music.utils.hls import needs_packaging, package_song
+
+
+class Command(BaseCommand):
+    help = "Segment approved songs into HLS playlists under HLS_ROOT"
+
+    def add_arguments(self, parser):
+        parser.add_argument('song_ids', nargs='*', type=int, help="Only package these songs")
+        parser.add_argument('--force', action='store_true', help="Re-package songs that are up to date")
+
+    def handle(self, *args, **options):
+        if not find_ffmpeg():
+            self.stderr.write("ffmpeg was not found; set FFMPEG_BINARY or install ffmpeg.")
+            return
+
+        songs = Song.objects.filter(is_approved=True).exclude(audio_file='').order_by('id')
+        if options['song_ids']:
+            songs = songs.filter(id__in=options['song_ids'])
+
+        packaged = failed = 0
+        for song in songs.iterator():
+            if not options['force'] and not needs_packaging(song):
+                continue
+            try:
+                package_song(song, force=True)
+                packaged += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to package song {song.id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Packaged {packaged} songs for HLS ({failed} failed)"))
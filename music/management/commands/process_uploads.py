@@ -0,0 +1,33 @@
+# music/management/commands/process_uploads.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from music.utils.processing import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued post-upload processing jobs (probe, thumbnails, branding, previews, renditions)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty")
+        parser.add_argument('--sleep', type=float, default=5, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            if run_job(job):
+                processed += 1
+            else:
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} songs ({failed} failed)"))
@@ -0,0 +1,17 @@
+# music/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from music.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of every song"
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if backend is None:
+            self.stdout.write("This database has no full-text index; search uses LIKE queries.")
+            return
+
+        indexed = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} songs ({backend})"))
@@ -0,0 +1,22 @@
+# music/management/commands/rollup_daily_stats.py
+from django.core.management.base import BaseCommand
+
+from music.utils.daily_stats import prune_listeners, rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Prune finished days' listener rows (run daily); --rebuild recomputes SongDailyStats from raw events"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help="Recompute daily rows from SongPlay/SongDownload (backfill or repair)")
+        parser.add_argument('--days', type=int, default=None,
+                            help="With --rebuild, only recompute the last N days (default: all history)")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            written = rebuild_daily_stats(options['days'])
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily stats rows"))
+
+        pruned = prune_listeners()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} listener rows"))
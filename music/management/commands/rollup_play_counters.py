@@ -0,0 +1,12 @@
+# music/management/commands/rollup_play_counters.py
+from django.core.management.base import BaseCommand
+
+from music.models import SongPlayCounter
+
+
+class Command(BaseCommand):
+    help = "Fold sharded play counters into Song.plays (run periodically, e.g. every minute from cron)"
+
+    def handle(self, *args, **options):
+        updated = SongPlayCounter.rollup()
+        self.stdout.write(self.style.SUCCESS(f"Rolled up play counters for {updated} songs"))
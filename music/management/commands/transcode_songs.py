@@ -0,0 +1,36 @@
+# music/management/commands/transcode_songs.py
+from django.core.management.base import BaseCommand
+
+from music.models import Song
+from music.utils.ffmpeg import find_ffmpeg
+from music.utils.renditions import needs_transcode, transcode_song
+
+
+class Command(BaseCommand):
+    help = "Encode the AUDIO_RENDITION_BITRATES MP3 ladder for songs with missing or stale renditions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('song_ids', nargs='*', type=int, help="Only transcode these songs")
+        parser.add_argument('--force', action='store_true', help="Re-encode renditions that are up to date")
+
+    def handle(self, *args, **options):
+        if not find_ffmpeg():
+            self.stderr.write("ffmpeg was not found; set FFMPEG_BINARY or install ffmpeg.")
+            return
+
+        songs = Song.objects.exclude(audio_file='').prefetch_related('renditions').order_by('id')
+        if options['song_ids']:
+            songs = songs.filter(id__in=options['song_ids'])
+
+        transcoded = failed = 0
+        for song in songs:
+            if not options['force'] and not needs_transcode(song):
+                continue
+            try:
+                if transcode_song(song, force=options['force']):
+                    transcoded += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Failed to transcode song {song.id}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Transcoded {transcoded} songs ({failed} failed)"))
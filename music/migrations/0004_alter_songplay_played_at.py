@@ -0,0 +1,19 @@
+# Generated by Django 4.2.26 on 2026-10-17 09:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0003_songplay_is_anonymous_alter_songplay_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='songplay',
+            name='played_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.26 on 2026-10-17 09:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0004_alter_songplay_played_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongPlayCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='play_counters', to='music.song')),
+            ],
+            options={
+                'unique_together': {('song', 'slot')},
+            },
+        ),
+    ]
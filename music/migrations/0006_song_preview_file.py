@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0005_songplaycounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='preview_file',
+            field=models.FileField(blank=True, editable=False, help_text='Pre-cut preview clip served to free users', null=True, upload_to='previews/'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.26 on 2026-10-17 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0006_song_preview_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bitrate', models.PositiveSmallIntegerField(help_text='Bitrate in kbps')),
+                ('audio_file', models.FileField(upload_to='renditions/')),
+                ('file_size', models.PositiveIntegerField(default=0, help_text='File size in bytes')),
+                ('source_name', models.CharField(help_text='Song.audio_file this rendition was made from', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='music.song')),
+            ],
+            options={
+                'ordering': ['song', 'bitrate'],
+                'unique_together': {('song', 'bitrate')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-17 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0007_songrendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='hls_manifest',
+            field=models.CharField(blank=True, default='', editable=False, help_text='HLS master playlist under HLS_ROOT, built by package_hls', max_length=255),
+        ),
+    ]
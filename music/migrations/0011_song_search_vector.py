@@ -0,0 +1,86 @@
+# Generated by Django 4.2.26 on 2026-10-17 19:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def create_search_index(apps, schema_editor):
+    # GIN index on PostgreSQL, FTS5 table on SQLite; other databases use LIKE search
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS music_song_search_vector_gin "
+            "ON music_song USING gin (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS music_song_fts USING fts5("
+            "title, artist, featured, genre, lyrics, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def fill_search_index(apps, schema_editor):
+    """
+    Index the existing songs, so search doesn't go empty on deploy. Uses the
+    columns this migration can rely on (title, artist, genre, lyrics); later
+    saves and ``manage.py rebuild_search_index`` add display and featured
+    artist names.
+    """
+    from django.conf import settings
+
+    song_table = apps.get_model('music', 'Song')._meta.db_table
+    artist_table = apps.get_model('artists', 'Artist')._meta.db_table
+    genre_table = apps.get_model('music', 'Genre')._meta.db_table
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'postgresql':
+        config = getattr(settings, 'SEARCH_TEXT_CONFIG', 'simple')
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM {song_table}")
+            first_id, last_id = cursor.fetchone()
+            # Batches keep each UPDATE's row locks and WAL burst small
+            for start in range(first_id, last_id + 1, BACKFILL_BATCH_SIZE):
+                cursor.execute(
+                    f"UPDATE {song_table} AS s SET search_vector = "
+                    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(s.title, '')), 'A') || "
+                    f"setweight(to_tsvector(%(config)s::regconfig, COALESCE((SELECT name FROM {artist_table} WHERE id = s.artist_id), '')), 'B') || "
+                    f"setweight(to_tsvector(%(config)s::regconfig, COALESCE((SELECT name FROM {genre_table} WHERE id = s.genre_id), '')), 'D') || "
+                    "setweight(to_tsvector(%(config)s::regconfig, COALESCE(s.lyrics, '')), 'D') "
+                    "WHERE s.id >= %(start)s AND s.id < %(end)s",
+                    {'config': config, 'start': start, 'end': start + BACKFILL_BATCH_SIZE},
+                )
+    elif vendor == 'sqlite':
+        schema_editor.execute("DELETE FROM music_song_fts")
+        schema_editor.execute(
+            "INSERT INTO music_song_fts (rowid, title, artist, featured, genre, lyrics) "
+            "SELECT s.id, COALESCE(s.title, ''), COALESCE(a.name, ''), '', COALESCE(g.name, ''), COALESCE(s.lyrics, '') "
+            f"FROM {song_table} s LEFT JOIN {artist_table} a ON a.id = s.artist_id "
+            f"LEFT JOIN {genre_table} g ON g.id = s.genre_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS music_song_search_vector_gin")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS music_song_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0010_songwaveform'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
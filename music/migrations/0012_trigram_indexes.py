@@ -0,0 +1,37 @@
+# Generated by Django 4.2.26 on 2026-10-17 20:40
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Only PostgreSQL has pg_trgm; other databases use music.fuzzy.TrigramIndex
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS music_song_title_trgm "
+        "ON music_song USING gin (title gin_trgm_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS music_song_display_artist_trgm "
+        "ON music_song USING gin (display_artist_name gin_trgm_ops)"
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS music_song_title_trgm")
+    schema_editor.execute("DROP INDEX IF EXISTS music_song_display_artist_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0011_song_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.26 on 2026-10-17 21:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0006_artist_name_trigram'),
+        ('music', '0012_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chart', models.CharField(choices=[('top_songs', 'Top songs'), ('top_downloads', 'Most downloaded'), ('trending_songs', 'Trending songs'), ('top_artists', 'Top artists'), ('trending_artists', 'Trending artists')], max_length=30)),
+                ('window', models.CharField(choices=[('all', 'All time'), ('weekly', 'This week'), ('monthly', 'This month')], default='all', max_length=20)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('genre', models.ForeignKey(blank=True, help_text='Empty for the all-genres chart', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chart_snapshots', to='music.genre')),
+            ],
+            options={
+                'ordering': ['-computed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChartEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('artist', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chart_entries', to='artists.artist')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='music.chartsnapshot')),
+                ('song', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chart_entries', to='music.song')),
+            ],
+            options={
+                'ordering': ['snapshot', 'position'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='chartsnapshot',
+            index=models.Index(fields=['chart', 'window', 'genre', '-computed_at'], name='music_chart_chart_edf02a_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='chartentry',
+            unique_together={('snapshot', 'position')},
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.26 on 2026-10-17 21:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0013_chart_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SongDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('unique_listeners', models.PositiveIntegerField(default=0)),
+                ('seconds_played', models.PositiveBigIntegerField(default=0)),
+                ('downloads', models.PositiveIntegerField(default=0)),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='music.song')),
+            ],
+            options={
+                'verbose_name_plural': 'Song daily stats',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'song'], name='music_songd_date_b41eed_idx')],
+                'unique_together': {('song', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SongDailyListener',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('listener', models.CharField(help_text='u:<user id> or ip:<address>', max_length=64)),
+                ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='music.song')),
+            ],
+            options={
+                'unique_together': {('song', 'date', 'listener')},
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.26 on 2026-10-17 22:10
+
+import re
+from datetime import date, datetime, time, timezone
+
+from django.db import migrations
+from django.db.migrations.exceptions import IrreversibleError
+
+
+def _month(day, offset):
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month):
+    return datetime.combine(month, time.min, tzinfo=timezone.utc).strftime("'%Y-%m-%d %H:%M:%S+00'")
+
+
+def partition_play_log(apps, schema_editor):
+    """
+    PostgreSQL: make music_songplay range-partitioned by played_at. The
+    existing rows stay where they are, attached as music_songplay_legacy
+    (everything before next month); monthly partitions follow. Other
+    databases keep the plain table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM music_songplay")
+        next_id = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = 'music_songplay' AND indexname <> 'music_songplay_pkey'"
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'music_songplay'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+
+    # Partitions share one id sequence owned by the parent table
+    schema_editor.execute("ALTER TABLE music_songplay ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    schema_editor.execute("ALTER TABLE music_songplay ALTER COLUMN id DROP DEFAULT")
+    schema_editor.execute("DROP SEQUENCE IF EXISTS music_songplay_id_seq")
+    schema_editor.execute("ALTER TABLE music_songplay RENAME TO music_songplay_legacy")
+    schema_editor.execute("ALTER TABLE music_songplay_legacy RENAME CONSTRAINT music_songplay_pkey TO music_songplay_legacy_pkey")
+    for name, _ in indexes:
+        schema_editor.execute(f"ALTER INDEX {name} RENAME TO {name[:48]}_legacy")
+
+    schema_editor.execute(
+        "CREATE TABLE music_songplay (LIKE music_songplay_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (played_at)"
+    )
+    schema_editor.execute(f"CREATE SEQUENCE music_songplay_id_seq START WITH {next_id} OWNED BY music_songplay.id")
+    schema_editor.execute("ALTER TABLE music_songplay ALTER COLUMN id SET DEFAULT nextval('music_songplay_id_seq')")
+    # The partition key has to be part of the primary key
+    schema_editor.execute("ALTER TABLE music_songplay ADD PRIMARY KEY (id, played_at)")
+    for name, definition in indexes:
+        schema_editor.execute(re.sub(r' ON (\w+\.)?music_songplay ', ' ON music_songplay ', definition))
+    for name, definition in foreign_keys:
+        schema_editor.execute(f"ALTER TABLE music_songplay ADD CONSTRAINT {name} {definition}")
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    schema_editor.execute(
+        "ALTER TABLE music_songplay ATTACH PARTITION music_songplay_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ({_bound(_month(this_month, 1))})"
+    )
+    for offset in range(1, 4):
+        month = _month(this_month, offset)
+        schema_editor.execute(
+            f"CREATE TABLE music_songplay_p{month:%Y%m} PARTITION OF music_songplay "
+            f"FOR VALUES FROM ({_bound(month)}) TO ({_bound(_month(month, 1))})"
+        )
+    schema_editor.execute("CREATE TABLE music_songplay_default PARTITION OF music_songplay DEFAULT")
+
+
+def unpartition_play_log(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        raise IrreversibleError("music_songplay partitioning can't be undone by a migration; restore from a backup")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0014_song_daily_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_play_log, unpartition_play_log),
+    ]
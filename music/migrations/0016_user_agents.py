@@ -0,0 +1,46 @@
+# Generated by Django 4.2.26 on 2026-10-17 22:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0015_partition_songplay'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_agent', models.TextField()),
+                ('hash', models.CharField(help_text='SHA-1 of user_agent', max_length=40, unique=True)),
+                ('device_type', models.CharField(choices=[('desktop', 'Desktop'), ('mobile', 'Mobile'), ('tablet', 'Tablet'), ('bot', 'Bot'), ('other', 'Other')], default='other', max_length=20)),
+                ('browser', models.CharField(blank=True, default='', max_length=50)),
+                ('os', models.CharField(blank=True, default='', max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='songdownload',
+            name='song',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='download_history', to='music.song'),
+        ),
+        migrations.AlterField(
+            model_name='songplay',
+            name='song',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='play_history', to='music.song'),
+        ),
+        migrations.AddField(
+            model_name='songdownload',
+            name='agent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='music.useragent'),
+        ),
+        migrations.AddField(
+            model_name='songplay',
+            name='agent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='music.useragent'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-17 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0016_user_agents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['is_approved', '-upload_date', '-id'], name='music_song_is_appr_ea68da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['genre', 'is_approved', '-upload_date', '-id'], name='music_song_genre_i_2e542a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='song',
+            index=models.Index(fields=['is_approved', '-plays', '-id'], name='music_song_is_appr_bfbc29_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-17 23:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing songs were last changed, as far as anyone knows, when uploaded
+    Song = apps.get_model('music', 'Song')
+    Song.objects.update(updated_at=F('upload_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music', '0017_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='genre',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
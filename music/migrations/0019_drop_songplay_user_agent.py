@@ -0,0 +1,40 @@
+# Generated by Django 4.2.26 on 2026-10-18 00:20
+
+from django.db import migrations
+
+
+def check_backfilled(apps, schema_editor):
+    """
+    Refuse to drop the legacy User-Agent strings before they are moved to
+    UserAgent rows: run ``manage.py backfill_user_agents`` first.
+    """
+    SongPlay = apps.get_model('music', 'SongPlay')
+    pending = SongPlay.objects.using(schema_editor.connection.alias).filter(user_agent__isnull=False)
+    if pending.exists():
+        raise RuntimeError(
+            "music_songplay still has User-Agent strings to move; "
+            "run `manage.py backfill_user_agents`, then migrate again"
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Drop music_songplay.user_agent. On PostgreSQL this only marks the column
+    dropped (on the partitioned table and all its partitions); the rows the
+    backfill rewrote left dead versions behind, which a plain VACUUM makes
+    reusable. To give the space back to the OS, run ``VACUUM FULL`` (or
+    pg_repack) on music_songplay_legacy, the partition the backfilled rows
+    live in; newer monthly partitions never stored the strings.
+    """
+
+    dependencies = [
+        ('music', '0018_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_backfilled, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='songplay',
+            name='user_agent',
+        ),
+    ]
@@ -1,6 +1,11 @@
 # music/models.py - COMPLETE FIXED VERSION
-from django.db import models
+import random
+
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Sum
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from datetime import timedelta
@@ -11,6 +16,7 @@ class Genre(models.Model):
     name = models.CharField(max_length=100, unique=True)
     color = models.CharField(max_length=7, default='#6c5ce7')  # Hex color
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['name']
@@ -26,6 +32,13 @@ class Song(models.Model):
         ('ultra', 'Ultra HD (FLAC)'),
     ]
     
+    PROCESSING_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready for review'),
+        ('failed', 'Failed'),
+    ]
+    
     title = models.CharField(max_length=200)
     artist = models.ForeignKey('artists.Artist', on_delete=models.CASCADE, related_name='songs')
     
@@ -63,16 +76,27 @@ class Song(models.Model):
     )
     
     upload_date = models.DateTimeField(auto_now_add=True)
+    # Bumped by saves and by the metadata queryset updates (not by counters); the catalog API's ETags
+    updated_at = models.DateTimeField(auto_now=True)
     plays = models.PositiveIntegerField(default=0)
     downloads = models.PositiveIntegerField(default=0)
     is_approved = models.BooleanField(default=False)
     is_featured = models.BooleanField(default=False)
     is_premium_only = models.BooleanField(default=False, help_text="Only available to premium users")
     preview_duration = models.PositiveIntegerField(default=30, help_text="Preview duration in seconds for free users")
+    preview_file = models.FileField(upload_to='previews/', blank=True, null=True, editable=False,
+                                    help_text="Pre-cut preview clip served to free users")
+    hls_manifest = models.CharField(max_length=255, blank=True, default='', editable=False,
+                                    help_text="HLS master playlist under HLS_ROOT, built by package_hls")
     audio_quality = models.CharField(max_length=20, choices=AUDIO_QUALITY_CHOICES, default='standard')
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS_CHOICES, default='ready',
+                                         help_text="Post-upload processing state (see process_uploads)")
     lyrics = models.TextField(blank=True, null=True)
     bpm = models.PositiveIntegerField(blank=True, null=True, help_text="Beats per minute")
     release_year = models.PositiveIntegerField(blank=True, null=True)
+    
+    # Weighted full-text document, maintained by music/search.py (PostgreSQL)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     
     def get_absolute_url(self):
@@ -87,6 +111,10 @@ class Song(models.Model):
         indexes = [
             models.Index(fields=['-upload_date']),
             models.Index(fields=['is_approved', 'is_featured']),
+            # Keyset pagination (music/pagination.py) of the song listings
+            models.Index(fields=['is_approved', '-upload_date', '-id']),
+            models.Index(fields=['genre', 'is_approved', '-upload_date', '-id']),
+            models.Index(fields=['is_approved', '-plays', '-id']),
         ]
         app_label = 'music'
     
@@ -155,8 +183,13 @@ class Song(models.Model):
         return artists
     
     def increment_plays(self):
-        self.plays += 1
-        self.save()
+        SongPlayCounter.increment(self.id)
+    
+    @property
+    def live_plays(self):
+        """Play count including increments still sitting in counter shards."""
+        pending = self.play_counters.aggregate(total=Sum('count'))['total'] or 0
+        return self.plays + pending
     
     def increment_downloads(self):
         self.downloads += 1
@@ -185,14 +218,23 @@ class Song(models.Model):
         return False
 
 class SongPlay(models.Model):
-    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='play_history')
+    """
+    One play event. On PostgreSQL the table is partitioned by month on
+    played_at and old months are expired by ``manage.py
+    manage_play_partitions`` (see music/utils/partitions.py); long-term
+    numbers live in SongDailyStats.
+    """
+    # No separate song index: the (song, played_at) index covers song lookups
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='play_history', db_index=False)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='song_plays')
-    played_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered plays are written after the fact with their original timestamp
+    played_at = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     duration_played = models.PositiveIntegerField(default=0, help_text="Seconds played")
     
     # Device and session info
-    user_agent = models.TextField(blank=True, null=True)
+    agent = models.ForeignKey('UserAgent', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                              db_index=False)
     session_id = models.CharField(max_length=100, blank=True, null=True)
     
     # Premium analytics
@@ -219,11 +261,73 @@ class SongPlay(models.Model):
         else:
             return f"Anonymous played {self.song.title}"
 
+class SongPlayCounter(models.Model):
+    """
+    Sharded play counter. Increments land on a random one of
+    PLAY_COUNTER_SHARDS rows per song so concurrent plays of a hit song don't
+    all queue on the Song row; rollup_play_counters folds them into Song.plays.
+    """
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='play_counters')
+    slot = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['song', 'slot']
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"{self.song_id}[{self.slot}] = {self.count}"
+    
+    @classmethod
+    def increment(cls, song_id, amount=1):
+        """Add plays to a randomly chosen shard of the song's counter."""
+        slot = random.randrange(getattr(settings, 'PLAY_COUNTER_SHARDS', 8))
+        updated = cls.objects.filter(song_id=song_id, slot=slot).update(count=F('count') + amount)
+        if updated:
+            return
+        
+        try:
+            with transaction.atomic():
+                cls.objects.create(song_id=song_id, slot=slot, count=amount)
+        except IntegrityError:
+            # Another worker created the shard first
+            cls.objects.filter(song_id=song_id, slot=slot).update(count=F('count') + amount)
+    
+    @classmethod
+    def pending_totals(cls, song_ids):
+        """Map of song id -> plays held in shards, for a batch of songs."""
+        rows = cls.objects.filter(song_id__in=song_ids, count__gt=0).values('song_id').annotate(total=Sum('count'))
+        return {row['song_id']: row['total'] for row in rows}
+    
+    @classmethod
+    def rollup(cls):
+        """Fold all shard counts into Song.plays. Returns the number of songs updated."""
+        song_ids = list(
+            cls.objects.filter(count__gt=0).values_list('song_id', flat=True).distinct().order_by('song_id')
+        )
+        from artists.models import ArtistStats
+        
+        # Only approved songs count towards their artist's totals
+        artist_ids = dict(Song.objects.filter(id__in=song_ids, is_approved=True).values_list('id', 'artist_id'))
+        for song_id in song_ids:
+            with transaction.atomic():
+                shards = list(cls.objects.select_for_update().filter(song_id=song_id, count__gt=0))
+                total = sum(shard.count for shard in shards)
+                if not total:
+                    continue
+                Song.objects.filter(id=song_id).update(plays=F('plays') + total)
+                cls.objects.filter(id__in=[shard.id for shard in shards]).update(count=0)
+                ArtistStats.increment(artist_ids.get(song_id), total_plays=total)
+        return len(song_ids)
+
 class SongDownload(models.Model):
-    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='download_history')
+    # No separate song index: the (song, downloaded_at) index covers song lookups
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='download_history', db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='song_downloads')
     downloaded_at = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+    agent = models.ForeignKey('UserAgent', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                              db_index=False)
     
     # Download details
     is_offline_download = models.BooleanField(default=False)
@@ -244,3 +348,220 @@ class SongDownload(models.Model):
     
     def __str__(self):
         return f"{self.song.title} downloaded by {self.user.username if self.user else 'Anonymous'}"
+
+class SongRendition(models.Model):
+    """
+    A transcoded MP3 copy of a song's upload at a fixed bitrate, produced
+    offline by ``manage.py transcode_songs``. Listeners are served the
+    rendition that fits their plan and network instead of the original file.
+    """
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='renditions')
+    bitrate = models.PositiveSmallIntegerField(help_text="Bitrate in kbps")
+    audio_file = models.FileField(upload_to='renditions/')
+    file_size = models.PositiveIntegerField(default=0, help_text="File size in bytes")
+    source_name = models.CharField(max_length=255, help_text="Song.audio_file this rendition was made from")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['song', 'bitrate']
+        unique_together = ['song', 'bitrate']
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"{self.song.title} @ {self.bitrate}kbps"
+    
+    @property
+    def audio_quality(self):
+        """SongPlay.audio_quality label for plays served from this rendition"""
+        return 'high' if self.bitrate >= 256 else 'standard'
+
+class SongProcessingJob(models.Model):
+    """
+    Queued post-upload work for a song (probe, thumbnails, branded tag,
+    preview, renditions). Claimed and run by ``manage.py process_uploads``;
+    the table is the queue, so no broker is needed.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='processing_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"Processing {self.song_id} ({self.status})"
+
+class SongWaveform(models.Model):
+    """Peak envelope of a song's audio, one 0-255 byte per bucket (see utils/waveform.py)"""
+    song = models.OneToOneField(Song, on_delete=models.CASCADE, related_name='waveform')
+    peaks = models.BinaryField()
+    buckets = models.PositiveIntegerField()
+    source_name = models.CharField(max_length=255, help_text="Song.audio_file the peaks were computed from")
+    created_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"Waveform of {self.song_id} ({self.buckets} buckets)"
+    
+    @property
+    def peak_list(self):
+        return list(bytes(self.peaks))
+
+class ChartSnapshot(models.Model):
+    """
+    One computed chart (see music/charts.py), rebuilt by ``manage.py
+    build_charts``. Chart pages read the entries of the newest snapshot for
+    their chart/window/genre instead of ranking songs per request.
+    """
+    CHART_CHOICES = [
+        ('top_songs', 'Top songs'),
+        ('top_downloads', 'Most downloaded'),
+        ('trending_songs', 'Trending songs'),
+        ('top_artists', 'Top artists'),
+        ('trending_artists', 'Trending artists'),
+    ]
+    WINDOW_CHOICES = [
+        ('all', 'All time'),
+        ('weekly', 'This week'),
+        ('monthly', 'This month'),
+    ]
+    
+    chart = models.CharField(max_length=30, choices=CHART_CHOICES)
+    window = models.CharField(max_length=20, choices=WINDOW_CHOICES, default='all')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, null=True, blank=True, related_name='chart_snapshots',
+                              help_text="Empty for the all-genres chart")
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-computed_at']
+        indexes = [
+            models.Index(fields=['chart', 'window', 'genre', '-computed_at']),
+        ]
+        app_label = 'music'
+    
+    def __str__(self):
+        genre = self.genre.name if self.genre_id else 'all genres'
+        return f"{self.get_chart_display()} ({self.window}, {genre}) @ {self.computed_at:%Y-%m-%d %H:%M}"
+
+class ChartEntry(models.Model):
+    """A ranked row of a ChartSnapshot: a song or an artist, its score and display stats"""
+    snapshot = models.ForeignKey(ChartSnapshot, on_delete=models.CASCADE, related_name='entries')
+    position = models.PositiveIntegerField()
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, null=True, blank=True, related_name='chart_entries')
+    artist = models.ForeignKey('artists.Artist', on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='chart_entries')
+    score = models.PositiveIntegerField(default=0)
+    stats = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        ordering = ['snapshot', 'position']
+        unique_together = ['snapshot', 'position']
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"#{self.position} {self.song or self.artist} ({self.score})"
+
+class SongDailyStats(models.Model):
+    """
+    Per-song, per-day totals, kept current as plays and downloads are
+    recorded (see music/utils/daily_stats.py). Windowed analytics sum at
+    most one row per day instead of counting SongPlay/SongDownload rows.
+    """
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    plays = models.PositiveIntegerField(default=0)
+    unique_listeners = models.PositiveIntegerField(default=0)
+    seconds_played = models.PositiveBigIntegerField(default=0)
+    downloads = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['song', 'date']
+        indexes = [
+            models.Index(fields=['date', 'song']),
+        ]
+        verbose_name_plural = 'Song daily stats'
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"{self.song_id} on {self.date}: {self.plays} plays"
+    
+    @classmethod
+    def increment(cls, song_id, date, **amounts):
+        """Add ``amounts`` (plays=, downloads=, ...) to the song's row for ``date``."""
+        amounts = {field: amount for field, amount in amounts.items() if amount}
+        if not amounts:
+            return
+        updates = {field: F(field) + amount for field, amount in amounts.items()}
+        if cls.objects.filter(song_id=song_id, date=date).update(**updates):
+            return
+        
+        try:
+            with transaction.atomic():
+                cls.objects.create(song_id=song_id, date=date, **amounts)
+        except IntegrityError:
+            # Another worker created the row first
+            cls.objects.filter(song_id=song_id, date=date).update(**updates)
+    
+    @classmethod
+    def since(cls, days):
+        """Rows for the last ``days`` days, today included."""
+        return cls.objects.filter(date__gte=timezone.localdate() - timedelta(days=days - 1))
+
+class SongDailyListener(models.Model):
+    """Who has played a song on a day, so SongDailyStats.unique_listeners counts each listener once"""
+    song = models.ForeignKey(Song, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    listener = models.CharField(max_length=64, help_text="u:<user id> or ip:<address>")
+    
+    class Meta:
+        unique_together = ['song', 'date', 'listener']
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"{self.listener} played {self.song_id} on {self.date}"
+
+class UserAgent(models.Model):
+    """
+    One distinct User-Agent string. Play and download rows reference it by id
+    (resolved through an in-process cache, see music/utils/user_agents.py)
+    instead of repeating the string on every row.
+    """
+    DEVICE_CHOICES = [
+        ('desktop', 'Desktop'),
+        ('mobile', 'Mobile'),
+        ('tablet', 'Tablet'),
+        ('bot', 'Bot'),
+        ('other', 'Other'),
+    ]
+    
+    user_agent = models.TextField()
+    hash = models.CharField(max_length=40, unique=True, help_text="SHA-1 of user_agent")
+    device_type = models.CharField(max_length=20, choices=DEVICE_CHOICES, default='other')
+    browser = models.CharField(max_length=50, blank=True, default='')
+    os = models.CharField(max_length=50, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        app_label = 'music'
+    
+    def __str__(self):
+        return f"{self.browser or 'Unknown'} on {self.os or 'unknown OS'} ({self.device_type})"
@@ -0,0 +1,190 @@
+# music/pagination.py
+"""
+Keyset (cursor) pagination.
+
+Paginator counts the whole result and then skips OFFSET rows, so page 500
+does 500 pages of work. CursorPaginator remembers where a page ended (the
+ordering values of its last row) and asks for the rows after that, which an
+index on the ordering columns answers directly; every page costs the same:
+
+    paginator = CursorPaginator(songs, ('-upload_date', '-id'), per_page=20)
+    songs = paginator.get_page(request.GET.get('cursor'))
+    songs.next_cursor, songs.previous_cursor    # opaque, for ?cursor=
+
+The ordering must end in a unique column (usually id) and none of its
+columns may be NULL. Cursors are URL-safe base64 of the boundary values; one
+that doesn't decode, or was made for another ordering, gives the first page.
+Lists already sorted in memory (charts) page the same way, by attribute,
+and so do values() querysets.
+"""
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT is as cheap as the planner's estimate
+EXACT_COUNT_BELOW = 1000
+
+
+def estimate_count(queryset):
+    """
+    Row count of ``queryset``: the planner's estimate on PostgreSQL (no scan),
+    exact when the estimate is small or on other databases.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        rows = int(plan[0]['Plan']['Plan Rows'])
+        if rows >= EXACT_COUNT_BELOW:
+            return rows
+    return queryset.count()
+
+
+def _field_name(term):
+    return term.lstrip('-')
+
+
+def _flip(term):
+    return term[1:] if term.startswith('-') else f'-{term}'
+
+
+def _value(obj, name):
+    # values() querysets page too
+    return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+
+def _json_value(value):
+    # Full precision: DjangoJSONEncoder would cut datetimes to milliseconds
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class CursorPage:
+    """One page of a CursorPaginator; iterates like a Paginator page."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.has_next = has_next
+        self.has_previous = has_previous
+        # Encoded now, so object_list can be swapped for display objects
+        self.next_cursor = paginator.cursor_for(object_list[-1]) if has_next and object_list else None
+        self.previous_cursor = (
+            paginator.cursor_for(object_list[0], backwards=True) if has_previous and object_list else None
+        )
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def estimated_total(self):
+        return self.paginator.estimated_total
+
+
+class CursorPaginator:
+    def __init__(self, object_list, ordering, per_page=20, estimate_total=False):
+        self.object_list = object_list
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.estimate_total = estimate_total
+        self.is_queryset = isinstance(object_list, QuerySet)
+        # Cursors from another ordering (a different ?sort=) are ignored
+        self.signature = hashlib.sha1(','.join(self.ordering).encode('utf-8')).hexdigest()[:8]
+
+    # ========== CURSORS ==========
+    def cursor_for(self, obj, backwards=False):
+        values = [_json_value(_value(obj, _field_name(term))) for term in self.ordering]
+        payload = json.dumps([self.signature, int(backwards), values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """(values, backwards) of a cursor, or None (first page) if it isn't one of ours."""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            signature, backwards, values = json.loads(raw)
+            if signature != self.signature or len(values) != len(self.ordering):
+                return None
+            if self.is_queryset:
+                opts = self.object_list.model._meta
+                values = [
+                    opts.get_field(_field_name(term)).to_python(value)
+                    for term, value in zip(self.ordering, values)
+                ]
+            return values, bool(backwards)
+        except (ValueError, TypeError, ValidationError, FieldDoesNotExist):
+            return None
+
+    # ========== PAGES ==========
+    def _beyond(self, values, backwards):
+        """Q for rows past ``values`` in the ordering (before them when ``backwards``)."""
+        beyond = Q()
+        equal = Q()
+        for term, value in zip(self.ordering, values):
+            descending = term.startswith('-') != backwards
+            beyond |= equal & Q(**{f"{_field_name(term)}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{_field_name(term): value})
+        # The redundant bound on the first column lets the index range scan start there
+        first = self.ordering[0]
+        descending = first.startswith('-') != backwards
+        return Q(**{f"{_field_name(first)}__{'lte' if descending else 'gte'}": values[0]}) & beyond
+
+    def _is_beyond(self, obj, values, backwards):
+        for term, value in zip(self.ordering, values):
+            current = _value(obj, _field_name(term))
+            if current != value:
+                descending = term.startswith('-') != backwards
+                return current < value if descending else current > value
+        return False
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        values, backwards = decoded or (None, False)
+
+        if self.is_queryset:
+            ordering = [_flip(term) for term in self.ordering] if backwards else self.ordering
+            rows = self.object_list.order_by(*ordering)
+            if values is not None:
+                rows = rows.filter(self._beyond(values, backwards))
+            rows = list(rows[:self.per_page + 1])
+        else:
+            rows = [obj for obj in self.object_list if values is None or self._is_beyond(obj, values, backwards)]
+            if backwards:
+                rows.reverse()
+            rows = rows[:self.per_page + 1]
+
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            if not rows:
+                return self.get_page()
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True, has_previous=more)
+        return CursorPage(rows, self, has_next=more, has_previous=values is not None)
+
+    @cached_property
+    def estimated_total(self):
+        if not self.estimate_total:
+            return None
+        return estimate_count(self.object_list) if self.is_queryset else len(self.object_list)
@@ -0,0 +1,318 @@
+# music/search.py
+"""
+Ranked full-text search over songs.
+
+Each song's searchable text is indexed with field weights
+(title > artist > featured artists > genre > lyrics):
+
+- PostgreSQL: ``Song.search_vector`` (tsvector, GIN-indexed), ranked with
+  ``SearchRank``.
+- SQLite (dev): the ``music_song_fts`` FTS5 table, ranked with ``bm25``.
+
+The index is kept current by the signals in music/signals.py and can be
+rebuilt with ``python manage.py rebuild_search_index``. Other databases, or
+SQLite builds without FTS5, fall back to the old ``icontains`` search.
+
+``cached_search`` caches the result ids of the whole search page per
+normalized query (case and spacing folded). Entries carry a catalog version stamp that the Song,
+Artist and Genre signals bump. Stale entries are served while a single
+request (holding a ``cache.add`` lock) recomputes them.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, OperationalError
+from django.db.models import Q, F, Value, TextField
+
+from music.caching import fresh_version
+
+FTS_TABLE = 'music_song_fts'
+
+# Words used to join artist names in queries ("X ft Y", "X by Y"), not content
+QUERY_STOPWORDS = {'by', 'ft', 'feat', 'featuring', 'vs', 'and'}
+
+# Field -> Postgres weight; the SQLite bm25() column weights mirror the order
+SEARCH_FIELDS = [
+    ('title', 'A'),
+    ('artist', 'B'),
+    ('featured', 'C'),
+    ('genre', 'D'),
+    ('lyrics', 'D'),
+]
+FTS_BM25_WEIGHTS = (10.0, 5.0, 3.0, 2.0, 1.0)
+
+
+def search_config():
+    return getattr(settings, 'SEARCH_TEXT_CONFIG', 'simple')
+
+
+def search_backend():
+    """'postgres', 'sqlite' or None (no full-text index on this database)."""
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite':
+        return 'sqlite'
+    return None
+
+
+def query_terms(query):
+    """Lower-cased word terms of a user query, without joiner words, in order."""
+    terms = []
+    for term in re.findall(r'\w+', query.lower()):
+        if len(term) > 1 and term not in QUERY_STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms
+
+
+# ========== INDEXING ==========
+def song_document(song):
+    """The searchable text of a song, split by weighted field."""
+    artist_names = [song.artist.name if song.artist_id else '']
+    if song.display_artist_name and song.display_artist_name not in artist_names:
+        artist_names.append(song.display_artist_name)
+
+    return {
+        'title': song.title or '',
+        'artist': ' '.join(artist_names),
+        'featured': ' '.join(a.name for a in song.featured_artists.all()),
+        'genre': song.genre.name if song.genre_id else '',
+        'lyrics': song.lyrics or '',
+    }
+
+
+def ensure_fts_table():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, artist, featured, genre, lyrics, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def index_songs(song_ids):
+    """(Re)index the given songs."""
+    from music.models import Song
+
+    backend = search_backend()
+    if backend is None or not song_ids:
+        return
+
+    songs = Song.objects.filter(id__in=song_ids).select_related('artist', 'genre').prefetch_related('featured_artists')
+    if backend == 'postgres':
+        from django.contrib.postgres.search import SearchVector
+        config = search_config()
+        for song in songs:
+            document = song_document(song)
+            vector = None
+            for field, weight in SEARCH_FIELDS:
+                part = SearchVector(Value(document[field], output_field=TextField()), weight=weight, config=config)
+                vector = part if vector is None else vector + part
+            Song.objects.filter(id=song.id).update(search_vector=vector)
+        return
+
+    rows = [(song.id, *[song_document(song)[field] for field, _ in SEARCH_FIELDS]) for song in songs]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(song_id,) for song_id in song_ids])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, artist, featured, genre, lyrics) VALUES (%s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def unindex_song(song_id):
+    if search_backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [song_id])
+
+
+def rebuild_index(batch_size=500):
+    """Reindex every song. Returns the number indexed."""
+    from music.models import Song
+
+    backend = search_backend()
+    if backend is None:
+        return 0
+    if backend == 'sqlite':
+        ensure_fts_table()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    song_ids = list(Song.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(song_ids), batch_size):
+        index_songs(song_ids[start:start + batch_size])
+    return len(song_ids)
+
+
+# ========== QUERYING ==========
+def search_songs(query, limit=50):
+    """Approved songs matching ``query``, best match first."""
+    from music.models import Song
+
+    terms = query_terms(query)
+    if not terms:
+        return []
+
+    base = Song.objects.filter(is_approved=True).select_related('artist', 'genre').prefetch_related('featured_artists')
+    backend = search_backend()
+
+    if backend == 'postgres':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        # Any term may match, as a prefix; songs matching more terms rank higher
+        search_query = SearchQuery(' | '.join(f'{term}:*' for term in terms), search_type='raw', config=search_config())
+        return list(
+            base.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F('search_vector'), search_query))
+            .order_by('-rank', '-plays')[:limit]
+        )
+
+    if backend == 'sqlite':
+        match = ' OR '.join(f'"{term}"*' for term in terms)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                    f"ORDER BY bm25({FTS_TABLE}, {', '.join(map(str, FTS_BM25_WEIGHTS))}) LIMIT %s",
+                    [match, limit * 2],
+                )
+                ranked_ids = [row[0] for row in cursor.fetchall()]
+        except OperationalError as e:
+            print(f"⚠️ FTS5 search unavailable, using LIKE search: {e}")
+        else:
+            songs = base.in_bulk(ranked_ids)
+            return [songs[song_id] for song_id in ranked_ids if song_id in songs][:limit]
+
+    return legacy_search(query, terms, limit)
+
+
+def legacy_search(query, terms, limit=50):
+    """The original icontains search, for databases without a full-text index."""
+    from music.models import Song
+
+    q = Q(title__icontains=query) | Q(artist__name__icontains=query) | Q(lyrics__icontains=query)
+    for term in terms:
+        if len(term) > 2:
+            q |= (Q(title__icontains=term) | Q(artist__name__icontains=term) | Q(genre__name__icontains=term) |
+                  Q(lyrics__icontains=term) | Q(featured_artists__name__icontains=term))
+
+    return list(
+        Song.objects.filter(q, is_approved=True)
+        .select_related('artist', 'genre').prefetch_related('featured_artists')
+        .distinct().order_by('-plays')[:limit]
+    )
+
+
+def search_catalog(query, fuzzy=False):
+    """Songs, related artists and related genres for the search page."""
+    from artists.models import Artist
+    from music.fuzzy import fuzzy_search_artists, fuzzy_search_songs
+    from music.models import Genre
+
+    terms = query_terms(query)
+    songs = search_songs(query, limit=50)
+
+    # Misspelled names ("Edy Kenzo") miss the full-text index; top up with
+    # trigram matches, or use them outright in fuzzy mode
+    if fuzzy or len(songs) < 10:
+        seen = {s.id for s in songs}
+        songs += [s for s in fuzzy_search_songs(query, limit=20) if s.id not in seen]
+
+    artist_q = Q()
+    for term in terms:
+        if len(term) > 2:
+            artist_q |= Q(name__icontains=term) | Q(bio__icontains=term)
+
+    artists = fuzzy_search_artists(query, limit=10)
+    seen = {a.id for a in artists}
+    artists += [a for a in Artist.objects.filter(artist_q).distinct()[:10] if a.id not in seen]
+
+    genre_q = Q()
+    for term in terms:
+        if len(term) > 2:
+            genre_q |= Q(name__icontains=term) | Q(description__icontains=term)
+
+    genres = list(Genre.objects.filter(genre_q).distinct()[:8])
+    return songs, artists[:10], genres
+
+
+# ========== RESULT CACHE ==========
+SEARCH_VERSION_KEY = 'search:version'
+
+
+def search_version():
+    version = cache.get(SEARCH_VERSION_KEY)
+    if version is None:
+        # Never back to a number stale entries carry (see music/caching.py)
+        version = fresh_version()
+        cache.add(SEARCH_VERSION_KEY, version, None)
+        version = cache.get(SEARCH_VERSION_KEY, version)
+    return version
+
+
+def bump_search_version():
+    """Mark every cached search result stale (songs approved, edited or removed)."""
+    try:
+        cache.incr(SEARCH_VERSION_KEY)
+    except ValueError:
+        cache.set(SEARCH_VERSION_KEY, fresh_version(), None)
+
+
+def normalize_query(query):
+    """
+    The query as searched: lower-cased, whitespace collapsed. Every matcher
+    ignores case and spacing, so "Eddy  Kenzo" and "eddy kenzo" get the same
+    results; word order and joiner words still count (trigram similarity and
+    the icontains fallback read the whole string).
+    """
+    return ' '.join(query.lower().split())
+
+
+def search_cache_key(query, fuzzy=False):
+    """Cache key of a normalized query (see normalize_query)."""
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    return f"search:results:{'fuzzy' if fuzzy else 'default'}:{digest}"
+
+
+def rehydrate(queryset, ids):
+    """Objects for ``ids`` in order, from one in_bulk query; missing ids are dropped."""
+    objects = queryset.in_bulk(ids)
+    return [objects[i] for i in ids if i in objects]
+
+
+def cached_search(query, fuzzy=False):
+    """``search_catalog`` through the result cache, with stale-while-revalidate."""
+    from artists.models import Artist
+    from music.models import Genre, Song
+
+    # The key and the search read the same string
+    query = normalize_query(query)
+    key = search_cache_key(query, fuzzy)
+    version = search_version()
+    entry = cache.get(key)
+    fresh_for = getattr(settings, 'SEARCH_CACHE_FRESH_SECONDS', 60)
+
+    if entry is not None:
+        is_fresh = entry['version'] == version and time.time() - entry['built_at'] < fresh_for
+        # Stale: one request refreshes it, everyone else keeps getting the old ids
+        if is_fresh or not cache.add(key + ':refresh', 1, 30):
+            songs = rehydrate(
+                Song.objects.filter(is_approved=True).select_related('artist', 'genre').prefetch_related('featured_artists'),
+                entry['songs'],
+            )
+            artists = rehydrate(Artist.objects.all(), entry['artists'])
+            genres = rehydrate(Genre.objects.all(), entry['genres'])
+            return songs, artists, genres
+
+    try:
+        songs, artists, genres = search_catalog(query, fuzzy=fuzzy)
+        cache.set(key, {
+            'version': version,
+            'built_at': time.time(),
+            'songs': [s.id for s in songs],
+            'artists': [a.id for a in artists],
+            'genres': [g.id for g in genres],
+        }, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 3600))
+    finally:
+        cache.delete(key + ':refresh')
+    return songs, artists, genres
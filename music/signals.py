@@ -1,8 +1,22 @@
 # music/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Song
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Song, Genre, SongRendition, SongPlay, SongDownload
+from .search import bump_search_version, index_songs, unindex_song
+from .fuzzy import trigram_index
+from .caching import bump_namespace
+from .genres import bump_genre_version
+from .suggest import suggest_index
+from .utils.branding import purge_branded_downloads, purge_stale_branded_downloads
+from .utils.previews import needs_preview
+from .utils.processing import enqueue_processing
+from .utils.thumbnails import THUMBNAIL_FIELDS, build_image_thumbnails, delete_thumbnails, needs_thumbnails
+from .utils.hls import delete_package
+from .utils.daily_stats import record_download, record_plays, record_seconds
 
 @receiver(post_save, sender=Song)
 def update_artist_profile(sender, instance, created, **kwargs):
@@ -22,4 +36,252 @@ def update_artist_profile(sender, instance, created, **kwargs):
                     genre=instance.genre
                 )
         except Exception as e:
-            print(f"Error in song post_save signal: {e}")
\ No newline at end of file
+            print(f"Error in song post_save signal: {e}")
+
+@receiver(post_save, sender=Song)
+def invalidate_branded_downloads(sender, instance, created, **kwargs):
+    """
+    Remove cached branded downloads built from old title/artist/genre/year/files
+    """
+    if not created:
+        try:
+            purge_stale_branded_downloads(instance)
+        except Exception as e:
+            print(f"⚠️ Error purging branded downloads: {e}")
+
+@receiver(pre_save, sender=Song)
+def remember_saved_song(sender, instance, **kwargs):
+    """The stored upload and artist, so post_save can tell what changed"""
+    saved = sender.objects.filter(pk=instance.pk).values_list('audio_file', 'artist_id').first() if instance.pk else None
+    instance._saved_audio_file, instance._saved_artist_id = saved or (None, None)
+
+@receiver(post_save, sender=Song)
+def queue_song_processing(sender, instance, created, **kwargs):
+    """
+    Queue post-upload processing (probe, thumbnails, branded tag, preview,
+    waveform, renditions, HLS) for new songs and replaced uploads, and again
+    when a premium song's preview is out of date. The work runs in `manage.py
+    process_uploads`. A replaced cover only needs its thumbnails, which are
+    built after commit like any other image's: a cover that can't be decoded
+    mustn't re-run ffmpeg (and reset processing_status) on every save.
+    """
+    audio_replaced = getattr(instance, '_saved_audio_file', instance.audio_file.name) != instance.audio_file.name
+    if created or audio_replaced or needs_preview(instance):
+        song_id = instance.id
+        transaction.on_commit(lambda: enqueue_processing(Song(id=song_id)))
+    elif needs_thumbnails(instance.cover_image):
+        build_thumbnails_on_commit(instance.cover_image)
+
+@receiver(post_delete, sender=Song)
+def delete_branded_downloads(sender, instance, **kwargs):
+    purge_branded_downloads(instance.id)
+
+@receiver(post_delete, sender=Song)
+def delete_preview_clip(sender, instance, **kwargs):
+    if instance.preview_file:
+        instance.preview_file.delete(save=False)
+
+@receiver(post_delete, sender=Song)
+def delete_hls_package(sender, instance, **kwargs):
+    delete_package(instance.id)
+    delete_thumbnails(instance.cover_image)
+
+@receiver(post_delete, sender=SongRendition)
+def delete_rendition_file(sender, instance, **kwargs):
+    if instance.audio_file:
+        instance.audio_file.delete(save=False)
+
+# ========== SEARCH INDEX ==========
+def reindex_songs(song_ids):
+    try:
+        index_songs(list(song_ids))
+    except Exception as e:
+        print(f"⚠️ Error updating search index: {e}")
+    bump_search_version()
+
+@receiver(post_save, sender=Song)
+def index_song_for_search(sender, instance, **kwargs):
+    reindex_songs([instance.id])
+    trigram_index.update_song(instance)
+    suggest_index.update_song(instance)
+
+@receiver(m2m_changed, sender=Song.featured_artists.through)
+def index_song_featured_artists(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        reindex_songs([instance.id])
+    elif pk_set:
+        reindex_songs(pk_set)
+
+@receiver(post_delete, sender=Song)
+def unindex_deleted_song(sender, instance, **kwargs):
+    try:
+        unindex_song(instance.id)
+    except Exception as e:
+        print(f"⚠️ Error updating search index: {e}")
+    trigram_index.remove_song(instance.id)
+    bump_search_version()
+    suggest_index.remove_song(instance.id)
+
+@receiver(pre_save, sender='artists.Artist')
+@receiver(pre_save, sender=Genre)
+def remember_indexed_name(sender, instance, **kwargs):
+    """Song documents embed artist and genre names; note renames for post_save"""
+    instance._indexed_name = (
+        sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first() if instance.pk else None
+    )
+
+@receiver(post_save, sender='artists.Artist')
+def reindex_artist_songs(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_indexed_name', None) != instance.name:
+        trigram_index.update_artist(instance)
+        suggest_index.update_artist(instance)
+    if created or getattr(instance, '_indexed_name', None) == instance.name:
+        return
+    song_ids = Song.objects.filter(
+        Q(artist=instance) | Q(featured_artists=instance)
+    ).values_list('id', flat=True).distinct()
+    reindex_songs(song_ids)
+
+@receiver(post_save, sender=Genre)
+def reindex_genre_songs(sender, instance, created, **kwargs):
+    suggest_index.update_genre(instance)
+    if created or getattr(instance, '_indexed_name', None) == instance.name:
+        return
+    reindex_songs(instance.songs.values_list('id', flat=True))
+
+@receiver(post_delete, sender='artists.Artist')
+def unindex_deleted_artist(sender, instance, **kwargs):
+    suggest_index.remove_artist(instance.id)
+
+@receiver(post_delete, sender=Genre)
+def unindex_deleted_genre(sender, instance, **kwargs):
+    suggest_index.remove_genre(instance.id)
+
+# ========== CACHE NAMESPACES ==========
+# After commit, so other workers can't re-cache the old rows under the new version
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_registry(sender, instance, **kwargs):
+    transaction.on_commit(bump_genre_version)
+
+CACHE_NAMESPACES = {
+    'music.song': 'music',
+    'artists.artist': 'artists',
+    'news.newsarticle': 'news',
+}
+
+def invalidate_cache_namespace(sender, instance, **kwargs):
+    namespace = CACHE_NAMESPACES[sender._meta.label_lower]
+    transaction.on_commit(lambda: bump_namespace(namespace))
+
+for label in CACHE_NAMESPACES:
+    post_save.connect(invalidate_cache_namespace, sender=label, dispatch_uid=f'cache-{label}')
+    post_delete.connect(invalidate_cache_namespace, sender=label, dispatch_uid=f'cache-delete-{label}')
+
+# ========== DAILY STATS ==========
+# Buffered plays are added by the play buffer flush (bulk_create sends no signals)
+@receiver(pre_save, sender=SongPlay)
+def remember_duration_played(sender, instance, **kwargs):
+    instance._recorded_duration = (
+        sender.objects.filter(pk=instance.pk).values_list('duration_played', flat=True).first() if instance.pk else None
+    )
+
+@receiver(post_save, sender=SongPlay)
+def count_play_in_daily_stats(sender, instance, created, **kwargs):
+    try:
+        if created:
+            record_plays([instance])
+        else:
+            record_seconds(instance, instance.duration_played - (getattr(instance, '_recorded_duration', None) or 0))
+    except Exception as e:
+        print(f"⚠️ Error updating daily stats: {e}")
+
+@receiver(post_save, sender=SongDownload)
+def count_download_in_daily_stats(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        record_download(instance)
+    except Exception as e:
+        print(f"⚠️ Error updating daily stats: {e}")
+
+# ========== THUMBNAILS ==========
+# New song covers go through the processing queue; the other images are
+# small enough to render once the upload is committed
+def build_thumbnails_on_commit(image):
+    def build():
+        try:
+            build_image_thumbnails(image)
+        except Exception as e:
+            print(f"⚠️ Error building thumbnails for {image.name}: {e}")
+
+    transaction.on_commit(build)
+
+def build_uploaded_thumbnails(sender, instance, **kwargs):
+    image = getattr(instance, THUMBNAIL_FIELDS[sender._meta.label_lower])
+    if not image:
+        delete_thumbnails(image)
+        return
+    if needs_thumbnails(image):
+        build_thumbnails_on_commit(image)
+
+def delete_image_thumbnails(sender, instance, **kwargs):
+    delete_thumbnails(getattr(instance, THUMBNAIL_FIELDS[sender._meta.label_lower]))
+
+for label in THUMBNAIL_FIELDS:
+    if label == 'music.song':
+        continue
+    post_save.connect(build_uploaded_thumbnails, sender=label, dispatch_uid=f'thumbnails-{label}')
+    post_delete.connect(delete_image_thumbnails, sender=label, dispatch_uid=f'thumbnails-delete-{label}')
+
+# ========== ARTIST STATS ==========
+# Plays and F()-counted downloads are added where they are counted; these
+# cover approval changes, likes and follows. The refresh runs after commit so
+# a cascading delete never recreates the row of an artist being deleted.
+def refresh_artist_stats(artist_id):
+    from artists.models import ArtistStats
+
+    def refresh():
+        try:
+            ArtistStats.refresh(artist_id)
+        except Exception as e:
+            print(f"⚠️ Error refreshing artist stats: {e}")
+
+    if artist_id:
+        transaction.on_commit(refresh)
+
+@receiver(post_save, sender=Song)
+@receiver(post_delete, sender=Song)
+def refresh_song_artist_stats(sender, instance, **kwargs):
+    refresh_artist_stats(instance.artist_id)
+    # A song moved to another artist takes its numbers with it
+    previous_artist_id = getattr(instance, '_saved_artist_id', None)
+    if previous_artist_id and previous_artist_id != instance.artist_id:
+        refresh_artist_stats(previous_artist_id)
+
+@receiver(post_save, sender='library.Like')
+@receiver(post_delete, sender='library.Like')
+def refresh_liked_artist_stats(sender, instance, created=True, **kwargs):
+    if created:
+        refresh_artist_stats(Song.objects.filter(id=instance.song_id).values_list('artist_id', flat=True).first())
+
+@receiver(post_save, sender='artists.Follow')
+@receiver(post_delete, sender='artists.Follow')
+def refresh_followed_artist_stats(sender, instance, created=True, **kwargs):
+    if created:
+        refresh_artist_stats(instance.artist_id)
+
+# ========== CATALOG ==========
+# Adding or removing songs doesn't save the playlist, but it changes the
+# playlist's catalog entry (and so its ETag)
+@receiver(m2m_changed, sender='library.Playlist_songs')
+def touch_playlist(sender, instance, action, reverse, pk_set, **kwargs):
+    from library.models import Playlist
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    playlist_ids = pk_set if reverse else [instance.pk]
+    if playlist_ids:
+        Playlist.objects.filter(id__in=playlist_ids).update(updated_at=timezone.now())
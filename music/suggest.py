@@ -0,0 +1,204 @@
+# music/suggest.py
+"""
+Search-as-you-type suggestions from an in-memory prefix index.
+
+Every word of every approved song title, artist name and genre name is a
+key in one sorted list, so a prefix lookup is a ``bisect`` followed by a
+short scan. Nothing touches the database per keystroke. Matches are ranked
+by plays:
+
+- songs by their own plays
+- artists and genres by the plays of their approved songs
+
+Each worker process builds the index on first use. The Song/Artist/Genre
+signals patch it in place, and it is rebuilt after SUGGEST_INDEX_TTL seconds
+so play counts and other workers' edits catch up.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Sum, Q
+from django.urls import reverse
+
+# Upper bound on keys scanned per lookup, so one-letter prefixes stay cheap
+MAX_SCAN = 2000
+
+
+def normalize(text):
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def index_keys(text):
+    """The normalized text and each of its word suffixes ("eddy kenzo", "kenzo")."""
+    words = normalize(text).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._built_at = None
+        self._keys = []        # sorted (key, kind, id)
+        self._items = {}       # (kind, id) -> suggestion dict (with 'weight')
+        self._item_keys = {}   # (kind, id) -> keys of that item
+
+    # ========== BUILDING ==========
+    def _ensure_built(self):
+        ttl = getattr(settings, 'SUGGEST_INDEX_TTL', 300)
+        if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+            return
+        with self._lock:
+            if self._built_at is not None and time.monotonic() - self._built_at < ttl:
+                return
+            self._rebuild()
+
+    def _rebuild(self):
+        from artists.models import Artist
+        from music.models import Song, Genre
+
+        items = {}
+        songs = Song.objects.filter(is_approved=True).select_related('artist').only(
+            'id', 'title', 'plays', 'display_artist_name', 'artist__name'
+        )
+        for song in songs:
+            items[('song', song.id)] = self._song_item(song)
+
+        artists = Artist.objects.annotate(
+            total_plays=Sum('songs__plays', filter=Q(songs__is_approved=True))
+        ).values_list('id', 'name', 'total_plays')
+        for artist_id, name, plays in artists:
+            items[('artist', artist_id)] = self._artist_item(artist_id, name, plays or 0)
+
+        genres = Genre.objects.annotate(
+            total_plays=Sum('songs__plays', filter=Q(songs__is_approved=True))
+        ).values_list('id', 'name', 'total_plays')
+        for genre_id, name, plays in genres:
+            items[('genre', genre_id)] = self._genre_item(genre_id, name, plays or 0)
+
+        keys = []
+        item_keys = {}
+        for (kind, item_id), item in items.items():
+            item_keys[(kind, item_id)] = index_keys(item['label'])
+            keys.extend((key, kind, item_id) for key in item_keys[(kind, item_id)])
+        keys.sort()
+
+        self._keys, self._items, self._item_keys = keys, items, item_keys
+        self._built_at = time.monotonic()
+
+    @staticmethod
+    def _song_item(song):
+        return {
+            'type': 'song',
+            'id': song.id,
+            'label': song.title,
+            'detail': song.get_display_artist_name(),
+            'url': reverse('song_detail', args=[song.id]),
+            'weight': song.plays,
+        }
+
+    @staticmethod
+    def _artist_item(artist_id, name, plays):
+        return {
+            'type': 'artist',
+            'id': artist_id,
+            'label': name,
+            'detail': 'Artist',
+            'url': reverse('artist_detail', args=[artist_id]),
+            'weight': plays,
+        }
+
+    @staticmethod
+    def _genre_item(genre_id, name, plays):
+        return {
+            'type': 'genre',
+            'id': genre_id,
+            'label': name,
+            'detail': 'Genre',
+            'url': reverse('genre_songs', args=[genre_id]),
+            'weight': plays,
+        }
+
+    # ========== INCREMENTAL UPDATES ==========
+    def _put(self, kind, item_id, item):
+        self._drop(kind, item_id)
+        if item is None:
+            return
+        self._items[(kind, item_id)] = item
+        self._item_keys[(kind, item_id)] = index_keys(item['label'])
+        for key in self._item_keys[(kind, item_id)]:
+            insort(self._keys, (key, kind, item_id))
+
+    def _drop(self, kind, item_id):
+        self._items.pop((kind, item_id), None)
+        for key in self._item_keys.pop((kind, item_id), []):
+            position = bisect_left(self._keys, (key, kind, item_id))
+            if position < len(self._keys) and self._keys[position] == (key, kind, item_id):
+                del self._keys[position]
+
+    def update_song(self, song):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._put('song', song.id, self._song_item(song) if song.is_approved else None)
+
+    def remove_song(self, song_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._drop('song', song_id)
+
+    def update_artist(self, artist):
+        if self._built_at is None:
+            return
+        with self._lock:
+            current = self._items.get(('artist', artist.id))
+            plays = current['weight'] if current else 0
+            self._put('artist', artist.id, self._artist_item(artist.id, artist.name, plays))
+
+    def remove_artist(self, artist_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._drop('artist', artist_id)
+
+    def update_genre(self, genre):
+        if self._built_at is None:
+            return
+        with self._lock:
+            current = self._items.get(('genre', genre.id))
+            plays = current['weight'] if current else 0
+            self._put('genre', genre.id, self._genre_item(genre.id, genre.name, plays))
+
+    def remove_genre(self, genre_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._drop('genre', genre_id)
+
+    # ========== LOOKUP ==========
+    def suggest(self, query, limit=8):
+        """Items with a word starting with ``query``, most played first."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        self._ensure_built()
+
+        with self._lock:
+            matches = {}
+            position = bisect_left(self._keys, (prefix,))
+            end = min(len(self._keys), position + MAX_SCAN)
+            while position < end:
+                key, kind, item_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                matches[(kind, item_id)] = self._items[(kind, item_id)]
+                position += 1
+
+        ranked = sorted(matches.values(), key=lambda item: -item['weight'])[:limit]
+        return [{k: v for k, v in item.items() if k != 'weight'} for item in ranked]
+
+
+suggest_index = SuggestIndex()
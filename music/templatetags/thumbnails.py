@@ -0,0 +1,71 @@
+# music/templatetags/thumbnails.py
+"""
+Responsive images from the thumbnails built by music/utils/thumbnails.py.
+
+    {% load thumbnails %}
+    {% picture song.cover_image alt=song.title sizes="150px" %}
+    <img src="{% thumbnail artist.image 150 %}" srcset="{% srcset artist.image %}" sizes="150px">
+
+Images whose thumbnails aren't built yet fall back to the original file.
+"""
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from music.utils.thumbnails import FORMATS, has_thumbnails, thumbnail_formats, thumbnail_name, thumbnail_sizes
+
+register = template.Library()
+
+
+def _srcset(image, fmt):
+    return ', '.join(
+        f"{settings.MEDIA_URL}{thumbnail_name(image, size, fmt)} {size}w" for size in thumbnail_sizes()
+    )
+
+
+def _nearest_size(size):
+    sizes = thumbnail_sizes()
+    return next((s for s in sizes if s >= int(size)), sizes[-1])
+
+
+@register.simple_tag
+def srcset(image, fmt='jpeg'):
+    """``srcset`` of the image's thumbnails in one format ("" until they are built)."""
+    if not has_thumbnails(image):
+        return ''
+    return _srcset(image, fmt)
+
+
+@register.simple_tag
+def thumbnail(image, size, fmt='jpeg'):
+    """URL of the smallest thumbnail at least ``size`` px wide, or of the original."""
+    if not image:
+        return ''
+    if not has_thumbnails(image):
+        return image.url
+    return settings.MEDIA_URL + thumbnail_name(image, _nearest_size(size), fmt)
+
+
+@register.simple_tag
+def picture(image, alt='', sizes='300px', css_class='', default=''):
+    """
+    ``<picture>`` with AVIF/WebP sources and a JPEG ``<img>``, all with
+    srcset/sizes so the browser fetches the smallest file that fits.
+    ``default`` is used when there is no image at all.
+    """
+    if not image:
+        if not default:
+            return ''
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', default, alt, css_class)
+    if not has_thumbnails(image):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">', image.url, alt, css_class)
+
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][1], _srcset(image, fmt), sizes) for fmt in thumbnail_formats() if fmt != 'jpeg'),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"></picture>',
+        sources, settings.MEDIA_URL + thumbnail_name(image, _nearest_size(300)), _srcset(image, 'jpeg'),
+        sizes, alt, css_class,
+    )
@@ -1,3 +1,441 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from artists.models import Artist, ArtistStats
+from library.models import Playlist
+from music.models import Genre, Song, SongPlay, SongPlayCounter
+from music.pagination import CursorPaginator
+from music.utils.branding import audio_payload_range
+from music.utils.partitions import BOUND_RE, add_months
+from music.utils.play_buffer import PlayEventBuffer
+from music.utils.previews import cut_mp3_preview
+from music.utils.streaming import file_etag, parse_range, ranged_file_response
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, no padding: 417 bytes and 1152 samples per frame
+MP3_HEADER = b'\xff\xfb\x90\x00'
+MP3_FRAME_LENGTH = 417
+MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def mp3_frame(marker=b''):
+    return MP3_HEADER + marker + b'\x00' * (MP3_FRAME_LENGTH - 4 - len(marker))
+
+
+def id3v2_tag(body_size, footer=False):
+    size = bytes([(body_size >> 21) & 0x7F, (body_size >> 14) & 0x7F, (body_size >> 7) & 0x7F, body_size & 0x7F])
+    header = b'ID3\x04\x00' + (b'\x10' if footer else b'\x00') + size
+    return header + b'\x00' * body_size + (b'3DI\x04\x00\x10' + size if footer else b'')
+
+
+class TempFileMixin:
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class CatalogETagTests(TestCase):
+    """Catalog ETags must change when a joined row the response shows changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.genre = Genre.objects.create(name='Afrobeat')
+        cls.artist = Artist.objects.create(name='Eddy Kenzo', genre=cls.genre)
+        cls.song = Song.objects.create(
+            title='Sitya Loss', artist=cls.artist, genre=cls.genre,
+            audio_file='songs/sitya-loss.mp3', is_approved=True,
+        )
+        cls.user = User.objects.create_user('owner', password='pw')
+
+    def revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        return first, first['ETag']
+
+    def test_unchanged_rows_revalidate(self):
+        url = f'/api/catalog/songs/?ids={self.song.id}&fields=id,artist'
+        _, etag = self.revalidate(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_artist_rename_changes_etag(self):
+        url = f'/api/catalog/songs/?ids={self.song.id}&fields=id,artist'
+        _, etag = self.revalidate(url)
+        self.artist.name = 'Eddy Kenzo Official'
+        self.artist.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['artist'], 'Eddy Kenzo Official')
+
+    def test_genre_rename_changes_etag(self):
+        url = f'/api/catalog/artists/{self.artist.id}/?fields=id,genre'
+        _, etag = self.revalidate(url)
+        self.genre.name = 'Afropop'
+        self.genre.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['genre'], 'Afropop')
+
+    def test_playlist_owner_and_songs_change_etag(self):
+        playlist = Playlist.objects.create(user=self.user, name='Mix', is_public=True)
+        playlist.songs.add(self.song)
+        url = f'/api/catalog/playlists/{playlist.id}/?fields=id,owner,songs'
+        _, etag = self.revalidate(url)
+
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['owner'], 'renamed')
+
+        # Unapproving a song doesn't touch the playlist row
+        etag = response['ETag']
+        Song.objects.filter(id=self.song.id).update(is_approved=False)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['result']['songs'], [])
+
+
+@override_settings(AUDIO_STREAM_SENDFILE_HEADER=None)
+class RangedFileResponseTests(TempFileMixin, SimpleTestCase):
+    """Range, If-Range and If-None-Match handling for audio responses."""
+
+    def setUp(self):
+        super().setUp()
+        self.data = bytes(range(256)) * 4
+        self.path = self.write('song.mp3', self.data)
+        self.etag = file_etag(self.path)
+        self.factory = RequestFactory()
+
+    def fetch(self, **headers):
+        response = ranged_file_response(self.factory.get('/stream/', **headers), self.path)
+        self.addCleanup(response.close)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 1024), (0, 99))
+        self.assertEqual(parse_range('bytes=1000-', 1024), (1000, 1023))
+        self.assertEqual(parse_range('bytes=1000-5000', 1024), (1000, 1023))
+        self.assertEqual(parse_range('bytes=-100', 1024), (924, 1023))
+        self.assertEqual(parse_range('bytes=-5000', 1024), (0, 1023))
+        self.assertIs(parse_range('bytes=-0', 1024), False)
+        self.assertIs(parse_range('bytes=1024-', 1024), False)
+        self.assertIs(parse_range('bytes=50-10', 1024), False)
+        for header in (None, '', 'bytes=-', 'bytes=0-1,5-9', 'items=0-1'):
+            self.assertIsNone(parse_range(header, 1024))
+
+    def test_full_response(self):
+        response, body = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.data)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_closed_range(self):
+        response, body = self.fetch(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.data)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_open_and_suffix_ranges(self):
+        response, body = self.fetch(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[1000:])
+        self.assertEqual(response['Content-Range'], f'bytes 1000-1023/{len(self.data)}')
+
+        response, body = self.fetch(HTTP_RANGE='bytes=-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[-24:])
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.fetch(HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_if_range(self):
+        response, body = self.fetch(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[:10])
+
+        # The client's partial copy is stale: send the whole file
+        response, body = self.fetch(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.data)
+
+    def test_if_none_match(self):
+        response, _ = self.fetch(HTTP_IF_NONE_MATCH=f'"other", {self.etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+
+        response, _ = self.fetch(HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_x_accel_redirect(self):
+        with self.settings(AUDIO_STREAM_SENDFILE_HEADER='X-Accel-Redirect', MEDIA_ROOT=self.tmpdir,
+                           AUDIO_STREAM_INTERNAL_URL='/protected-media/'):
+            response, body = self.fetch(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/song.mp3')
+        self.assertEqual(body, b'')
+
+
+class AudioPayloadRangeTests(TempFileMixin, SimpleTestCase):
+    """The audio frames of an MP3 sit between its ID3v2 and ID3v1 tags."""
+
+    def test_untagged_file(self):
+        path = self.write('plain.mp3', b'\xff' * 500)
+        self.assertEqual(audio_payload_range(path), (0, 500))
+
+    def test_id3v2_syncsafe_size(self):
+        # 300 bytes encodes as 0x00 0x00 0x02 0x2C, not 0x01 0x2C
+        tag = id3v2_tag(300)
+        self.assertEqual(tag[6:10], b'\x00\x00\x02\x2c')
+        path = self.write('tagged.mp3', tag + b'\xff' * 500)
+        self.assertEqual(audio_payload_range(path), (310, 810))
+
+    def test_id3v2_footer(self):
+        path = self.write('footer.mp3', id3v2_tag(20, footer=True) + b'\xff' * 500)
+        self.assertEqual(audio_payload_range(path), (40, 540))
+
+    def test_multiple_leading_tags_and_id3v1(self):
+        id3v1 = b'TAG' + b'\x00' * 125
+        path = self.write('both.mp3', id3v2_tag(20) + id3v2_tag(50) + b'\xff' * 500 + id3v1)
+        self.assertEqual(audio_payload_range(path), (90, 590))
+
+    def test_short_file_keeps_trailing_tag_bytes(self):
+        path = self.write('short.mp3', b'TAG' + b'\x00' * 50)
+        self.assertEqual(audio_payload_range(path), (0, 53))
+
+    def test_tag_larger_than_file(self):
+        path = self.write('broken.mp3', id3v2_tag(20)[:10] + b'\x00' * 5)
+        self.assertEqual(audio_payload_range(path), (15, 15))
+
+
+class CutMp3PreviewTests(TempFileMixin, SimpleTestCase):
+    """Previews are whole MP3 frames copied from the start of the audio."""
+
+    def cut(self, data, seconds):
+        source = self.write('source.mp3', data)
+        output = os.path.join(self.tmpdir, 'preview.mp3')
+        duration = cut_mp3_preview(source, output, seconds)
+        with open(output, 'rb') as f:
+            return duration, f.read()
+
+    def test_cuts_on_frame_boundaries(self):
+        duration, clip = self.cut(mp3_frame() * 100, 1)
+        # 38 frames are 0.993s, so the 39th is kept
+        self.assertEqual(len(clip), 39 * MP3_FRAME_LENGTH)
+        self.assertAlmostEqual(duration, 39 * MP3_FRAME_SECONDS)
+        self.assertEqual(clip[:4], MP3_HEADER)
+
+    def test_short_source_is_copied_whole(self):
+        duration, clip = self.cut(mp3_frame() * 10, 30)
+        self.assertEqual(len(clip), 10 * MP3_FRAME_LENGTH)
+        self.assertAlmostEqual(duration, 10 * MP3_FRAME_SECONDS)
+
+    def test_skips_tags_and_vbr_info_frame(self):
+        xing = mp3_frame(b'\x00' * 32 + b'Xing')
+        id3v1 = b'TAG' + b'\x00' * 125
+        duration, clip = self.cut(id3v2_tag(100) + xing + mp3_frame() * 5 + id3v1, 30)
+        self.assertEqual(clip, mp3_frame() * 5)
+        self.assertNotIn(b'Xing', clip)
+
+    def test_resyncs_over_junk(self):
+        duration, clip = self.cut(b'\x00\x01junk\xff\x00' + mp3_frame() * 3, 30)
+        self.assertEqual(clip, mp3_frame() * 3)
+
+    def test_no_frames(self):
+        with self.assertRaises(ValueError):
+            self.cut(b'\x00' * 2000, 30)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'preview.mp3')))
+
+
+class CursorPaginatorTests(TestCase):
+    """Keyset pages must cover every row exactly once, in both directions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Afrobeat')
+        artist = Artist.objects.create(name='Eddy Kenzo', genre=genre)
+        # Repeated titles make the id tie-breaker matter
+        for index in range(7):
+            Song.objects.create(
+                title=f'Song {index % 3}', artist=artist, genre=genre,
+                audio_file=f'songs/{index}.mp3', is_approved=True,
+            )
+        cls.ordering = ('-title', 'id')
+        cls.expected = list(Song.objects.order_by(*cls.ordering).values_list('id', flat=True))
+
+    def walk(self, paginator):
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def ids(self, page):
+        return [row['id'] if isinstance(row, dict) else row.id for row in page]
+
+    def test_pages_cover_every_row_once(self):
+        pages = self.walk(CursorPaginator(Song.objects.all(), self.ordering, per_page=3))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum((self.ids(page) for page in pages), []), self.expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertIsNone(pages[0].previous_cursor)
+        self.assertTrue(pages[-1].has_previous)
+        self.assertIsNone(pages[-1].next_cursor)
+
+    def test_previous_cursor_returns_the_same_page(self):
+        paginator = CursorPaginator(Song.objects.all(), self.ordering, per_page=3)
+        pages = self.walk(paginator)
+        back = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(pages[1]))
+        self.assertTrue(back.has_next)
+        self.assertTrue(back.has_previous)
+
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual(self.ids(first), self.ids(pages[0]))
+        self.assertFalse(first.has_previous)
+
+    def test_values_queryset(self):
+        pages = self.walk(CursorPaginator(Song.objects.values('id', 'title'), self.ordering, per_page=4))
+        self.assertEqual(sum((self.ids(page) for page in pages), []), self.expected)
+
+    def test_in_memory_list(self):
+        songs = [SimpleNamespace(id=song.id, title=song.title) for song in Song.objects.order_by(*self.ordering)]
+        paginator = CursorPaginator(songs, self.ordering, per_page=2)
+        pages = self.walk(paginator)
+        self.assertEqual(sum((self.ids(page) for page in pages), []), self.expected)
+        self.assertEqual(self.ids(paginator.get_page(pages[-1].previous_cursor)), self.ids(pages[-2]))
+
+    def test_bad_cursors_give_the_first_page(self):
+        paginator = CursorPaginator(Song.objects.all(), self.ordering, per_page=3)
+        first = self.ids(paginator.get_page())
+        other = CursorPaginator(Song.objects.all(), ('-id',), per_page=3)
+        foreign = other.get_page().next_cursor
+        wrong_type = base64.urlsafe_b64encode(
+            json.dumps([paginator.signature, 0, ['Song 1', 'not-an-id']]).encode()
+        ).decode().rstrip('=')
+
+        for cursor in ('', 'not base64!', 'e30', foreign, wrong_type):
+            self.assertIsNone(paginator.decode_cursor(cursor))
+            page = paginator.get_page(cursor)
+            self.assertEqual(self.ids(page), first)
+            self.assertFalse(page.has_previous)
+
+
+@override_settings(PLAY_BUFFER_FLUSH_INTERVAL=3600, PLAY_BUFFER_FLUSH_SIZE=1000)
+class PlayBufferTests(TempFileMixin, TestCase):
+    """Buffered plays reach SongPlay rows, counter shards and Song.plays."""
+
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Afrobeat')
+        cls.artist = Artist.objects.create(name='Eddy Kenzo', genre=genre)
+        cls.song = Song.objects.create(
+            title='Sitya Loss', artist=cls.artist, genre=genre,
+            audio_file='songs/sitya-loss.mp3', is_approved=True,
+        )
+        cls.user = User.objects.create_user('listener', password='pw')
+
+    def setUp(self):
+        super().setUp()
+        self.spool_dir = os.path.join(self.tmpdir, 'plays')
+        override = self.settings(PLAY_BUFFER_SPOOL_DIR=self.spool_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.buffer = PlayEventBuffer()
+
+    def test_flush_writes_plays_and_clears_spool(self):
+        for _ in range(3):
+            self.buffer.record(self.song.id, user_id=self.user.id, user_agent='Mozilla/5.0')
+        self.buffer.record(self.song.id + 1000)  # deleted song
+        self.assertEqual(self.buffer.pending_plays(self.song.id), 3)
+        self.assertEqual(SongPlay.objects.count(), 0)
+
+        self.assertEqual(self.buffer.flush(), 4)
+        self.assertEqual(SongPlay.objects.filter(song=self.song, user=self.user).count(), 3)
+        self.assertEqual(SongPlayCounter.pending_totals([self.song.id]), {self.song.id: 3})
+        self.assertEqual(self.buffer.pending_plays(self.song.id), 0)
+        self.assertEqual(os.listdir(self.spool_dir), [f'plays-{os.getpid()}.jsonl'])
+
+    def test_recovers_spool_of_dead_worker(self):
+        dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True, check=True)
+        os.makedirs(self.spool_dir)
+        event = {'song_id': self.song.id, 'user_id': None, 'ip_address': None, 'user_agent': '',
+                 'audio_quality': 'standard', 'played_at': '2026-01-05T10:00:00+00:00'}
+        with open(os.path.join(self.spool_dir, f'plays-{dead.stdout.strip()}.jsonl'), 'w') as spool:
+            spool.write(json.dumps(event) + '\n\n' + json.dumps(event) + '\n')
+
+        self.assertEqual(self.buffer.recover_spool(), 2)
+        self.assertEqual(SongPlay.objects.filter(song=self.song, is_anonymous=True).count(), 2)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+
+    def test_spool_of_live_worker_is_left_alone(self):
+        os.makedirs(self.spool_dir)
+        live = os.path.join(self.spool_dir, f'plays-{os.getppid()}.jsonl')
+        with open(live, 'w') as spool:
+            spool.write('{}\n')
+
+        self.assertEqual(self.buffer.recover_spool(), 0)
+        self.assertTrue(os.path.exists(live))
+
+    def test_rollup_folds_shards_into_song_plays(self):
+        with self.settings(PLAY_COUNTER_SHARDS=4):
+            for _ in range(10):
+                SongPlayCounter.increment(self.song.id, 2)
+        self.assertLessEqual(SongPlayCounter.objects.filter(song=self.song).count(), 4)
+
+        self.assertEqual(SongPlayCounter.rollup(), 1)
+        self.song.refresh_from_db()
+        self.assertEqual(self.song.plays, 20)
+        self.assertEqual(SongPlayCounter.pending_totals([self.song.id]), {})
+        self.assertEqual(ArtistStats.objects.get(artist=self.artist).total_plays, 20)
+
+        # Nothing left to fold
+        self.assertEqual(SongPlayCounter.rollup(), 0)
+        self.song.refresh_from_db()
+        self.assertEqual(self.song.plays, 20)
+
+
+class PartitionBoundTests(SimpleTestCase):
+    """Monthly SongPlay partitions and the bounds PostgreSQL reports for them."""
+
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2026, 11, 1), 1), date(2026, 12, 1))
+        self.assertEqual(add_months(date(2026, 12, 1), 1), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(add_months(date(2026, 3, 1), 25), date(2028, 4, 1))
+
+    def test_bound_re(self):
+        match = BOUND_RE.search("FOR VALUES FROM ('2026-01-01 00:00:00+00') TO ('2026-02-01 00:00:00+00')")
+        self.assertEqual(match.group('start'), '2026-01-01 00:00:00+00')
+        self.assertEqual(match.group('end'), '2026-02-01 00:00:00+00')
+
+        match = BOUND_RE.search("FOR VALUES FROM (MINVALUE) TO ('2026-02-01 00:00:00+00')")
+        self.assertIsNone(match.group('start'))
+        self.assertEqual(match.group('end'), '2026-02-01 00:00:00+00')
+
+        match = BOUND_RE.search("FOR VALUES FROM ('2026-01-01 00:00:00+00') TO (MAXVALUE)")
+        self.assertIsNone(match.group('end'))
+
+        self.assertIsNone(BOUND_RE.search('DEFAULT'))
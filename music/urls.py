@@ -8,12 +8,23 @@ urlpatterns = [
     path('genres/', views.genres, name='genres'),
     path('genre/<int:genre_id>/', views.genre_songs, name='genre_songs'),
     path('song/<int:song_id>/', views.song_detail, name='song_detail'),
+    path('song/<int:song_id>/waveform/', views.song_waveform, name='song_waveform'),
     
     # Player endpoints
     path('play-song/<int:song_id>/', views.play_song, name='play_song'),
     path('download-song/<int:song_id>/', views.download_song, name='download_song'),
+    path('stream/<int:song_id>/', views.stream_song, name='stream_song'),
+    path('preview/<int:song_id>/', views.preview_song, name='preview_song'),
+    path('hls/<int:song_id>/master.m3u8', views.hls_master, name='hls_master'),
+    path('hls/<int:song_id>/<int:bitrate>k.m3u8', views.hls_variant, name='hls_variant'),
+    path('hls/<int:song_id>/<int:bitrate>k/<str:segment>', views.hls_segment, name='hls_segment'),
     
     # API endpoints
+    path('api/suggest/', views.api_suggest, name='api_suggest'),
+    path('api/songs/', views.api_songs, name='api_songs'),
+    path('api/charts/<str:chart>/', views.api_chart, name='api_chart'),
+    path('api/catalog/<str:resource>/', views.api_catalog, name='api_catalog'),
+    path('api/catalog/<str:resource>/<int:obj_id>/', views.api_catalog, name='api_catalog_detail'),
     path('api/track-anonymous-play/<int:song_id>/', views.track_anonymous_play, name='track_anonymous_play'),
     path('api/update-play-duration/<int:song_id>/', views.update_play_duration, name='update_play_duration'),
     path('api/track-partial-play/<int:song_id>/', views.track_partial_play, name='track_partial_play'),
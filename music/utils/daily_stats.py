@@ -0,0 +1,164 @@
+# music/utils/daily_stats.py
+"""
+Daily play/download rollups.
+
+SongDailyStats holds one row per song per day. It is updated as events are
+recorded rather than recomputed:
+
+- buffered plays, when the play buffer flushes (``record_plays``)
+- plays created directly, seconds played and downloads, from the
+  SongPlay/SongDownload signals in music/signals.py
+
+Unique listeners are counted through SongDailyListener, which only has to
+remember the current days; ``manage.py rollup_daily_stats`` prunes it and
+can rebuild the daily rows from the raw event tables.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Listener rows older than this many days are no longer needed
+LISTENER_DAYS_KEPT = 2
+
+
+def stats_date(moment):
+    return timezone.localdate(moment) if moment else timezone.localdate()
+
+
+def listener_key(user_id, ip_address):
+    if user_id:
+        return f'u:{user_id}'
+    if ip_address:
+        return f'ip:{ip_address}'
+    return None
+
+
+# ========== RECORDING ==========
+def record_plays(plays):
+    """Add SongPlay objects to their songs' daily rows."""
+    from music.models import SongDailyListener, SongDailyStats
+
+    counts = Counter()
+    seconds = Counter()
+    listeners = defaultdict(set)
+    for play in plays:
+        key = (play.song_id, stats_date(play.played_at))
+        counts[key] += 1
+        seconds[key] += play.duration_played or 0
+        listener = listener_key(play.user_id, play.ip_address)
+        if listener:
+            listeners[key].add(listener)
+
+    new_listeners = Counter()
+    for (song_id, date), keys in listeners.items():
+        seen = set(
+            SongDailyListener.objects.filter(song_id=song_id, date=date, listener__in=keys)
+            .values_list('listener', flat=True)
+        )
+        fresh = keys - seen
+        SongDailyListener.objects.bulk_create(
+            [SongDailyListener(song_id=song_id, date=date, listener=listener) for listener in fresh],
+            ignore_conflicts=True,
+        )
+        new_listeners[(song_id, date)] = len(fresh)
+
+    # Sorted so concurrent flushes lock rows in the same order
+    for song_id, date in sorted(counts):
+        SongDailyStats.increment(
+            song_id, date,
+            plays=counts[(song_id, date)],
+            unique_listeners=new_listeners[(song_id, date)],
+            seconds_played=seconds[(song_id, date)],
+        )
+
+
+def record_seconds(play, seconds):
+    """A play's duration_played grew by ``seconds`` (corrections downwards are ignored)."""
+    from music.models import SongDailyStats
+
+    if seconds > 0:
+        SongDailyStats.increment(play.song_id, stats_date(play.played_at), seconds_played=seconds)
+
+
+def record_download(download):
+    from music.models import SongDailyStats
+
+    SongDailyStats.increment(download.song_id, stats_date(download.downloaded_at), downloads=1)
+
+
+# ========== REBUILDING ==========
+def rebuild_daily_stats(days=None, start=None, end=None):
+    """
+    Recompute daily rows (and recent listener rows) from SongPlay/SongDownload,
+    for the last ``days`` days, the dates in [start, end), or everything.
+    Returns the number of rows written.
+    """
+    from music.models import SongDailyListener, SongDailyStats, SongDownload, SongPlay
+
+    if days:
+        start = timezone.localdate() - timedelta(days=days - 1)
+    plays = SongPlay.objects.all()
+    downloads = SongDownload.objects.all()
+    existing = SongDailyStats.objects.all()
+    if start:
+        plays = plays.filter(played_at__date__gte=start)
+        downloads = downloads.filter(downloaded_at__date__gte=start)
+        existing = existing.filter(date__gte=start)
+    if end:
+        plays = plays.filter(played_at__date__lt=end)
+        downloads = downloads.filter(downloaded_at__date__lt=end)
+        existing = existing.filter(date__lt=end)
+
+    rows = {}
+    play_totals = plays.annotate(day=TruncDate('played_at')).values('song_id', 'day').annotate(
+        plays=Count('id'),
+        seconds=Sum('duration_played'),
+        users=Count('user', distinct=True),
+        anonymous=Count('ip_address', distinct=True, filter=Q(user__isnull=True)),
+    ).order_by()
+    for row in play_totals:
+        rows[(row['song_id'], row['day'])] = SongDailyStats(
+            song_id=row['song_id'], date=row['day'], plays=row['plays'],
+            unique_listeners=row['users'] + row['anonymous'], seconds_played=row['seconds'] or 0,
+        )
+
+    download_totals = downloads.annotate(day=TruncDate('downloaded_at')).values('song_id', 'day').annotate(
+        downloads=Count('id'),
+    ).order_by()
+    for row in download_totals:
+        stats = rows.setdefault(
+            (row['song_id'], row['day']), SongDailyStats(song_id=row['song_id'], date=row['day'])
+        )
+        stats.downloads = row['downloads']
+
+    recent = timezone.localdate() - timedelta(days=LISTENER_DAYS_KEPT - 1)
+    if start:
+        recent = max(start, recent)
+    listeners = {
+        (song_id, stats_date(played_at), listener_key(user_id, ip_address))
+        for song_id, played_at, user_id, ip_address in plays.filter(played_at__date__gte=recent)
+        .values_list('song_id', 'played_at', 'user_id', 'ip_address').order_by()
+    }
+
+    with transaction.atomic():
+        existing.delete()
+        SongDailyStats.objects.bulk_create(rows.values(), batch_size=1000)
+        SongDailyListener.objects.filter(date__gte=recent, **({'date__lt': end} if end else {})).delete()
+        SongDailyListener.objects.bulk_create(
+            [SongDailyListener(song_id=s, date=d, listener=key) for s, d, key in listeners if key],
+            batch_size=1000, ignore_conflicts=True,
+        )
+    return len(rows)
+
+
+def prune_listeners():
+    """Forget who listened on days that are over. Returns rows deleted."""
+    from music.models import SongDailyListener
+
+    cutoff = timezone.localdate() - timedelta(days=LISTENER_DAYS_KEPT - 1)
+    deleted, _ = SongDailyListener.objects.filter(date__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,40 @@
+# music/utils/ffmpeg.py
+"""Thin wrapper around a local ffmpeg binary for offline audio processing."""
+import os
+import shutil
+import subprocess
+
+from django.conf import settings
+
+
+def find_ffmpeg():
+    """Path of the ffmpeg binary from FFMPEG_BINARY / PATH, or None."""
+    return shutil.which(getattr(settings, 'FFMPEG_BINARY', 'ffmpeg') or 'ffmpeg')
+
+
+def source_is_newer(song, built_at):
+    """
+    Whether the song's upload was written after ``built_at`` (a POSIX
+    timestamp), i.e. it was replaced under the same name since an output of
+    it was built.
+    """
+    try:
+        return os.path.getmtime(song.audio_file.path) > built_at
+    except (OSError, ValueError, NotImplementedError):
+        return False
+
+
+def run_ffmpeg(args, timeout=600, capture_stdout=False):
+    """Run ffmpeg with ``args``; raises RuntimeError if it is missing or fails."""
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg is not installed (set FFMPEG_BINARY)")
+    result = subprocess.run(
+        [ffmpeg, '-nostdin', '-y', '-v', 'error', *args],
+        stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
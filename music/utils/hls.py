@@ -0,0 +1,169 @@
+# music/utils/hls.py
+"""
+HLS packaging for approved songs.
+
+``package_song`` runs the local ffmpeg once per rung of the bitrate ladder
+and writes AAC MPEG-TS segments plus a media playlist for each, and a master
+playlist listing the variants:
+
+    HLS_ROOT/<song id>/<upload stem>/master.m3u8
+    HLS_ROOT/<song id>/<upload stem>/<kbps>k/index.m3u8
+    HLS_ROOT/<song id>/<upload stem>/<kbps>k/seg00000.ts ...
+
+HLS_ROOT is outside MEDIA_ROOT, so nothing here is publicly served.
+Playlists and segments go through ``hls_master`` / ``hls_variant`` /
+``hls_segment`` in music.views, which check ``Song.can_be_accessed_by`` and
+the listener's bitrate cap for every file, and rewrite segment URIs to
+``hls_segment``.
+"""
+import os
+import re
+import shutil
+
+from django.conf import settings
+from django.utils import timezone
+
+from .ffmpeg import run_ffmpeg, source_is_newer
+from .renditions import target_bitrates
+
+HLS_DIR = 'hls'
+MASTER_PLAYLIST = 'master.m3u8'
+VARIANT_PLAYLIST = 'index.m3u8'
+SEGMENT_RE = re.compile(r'^seg\d{5}\.ts$')
+
+
+def hls_root():
+    return str(getattr(settings, 'HLS_ROOT', os.path.join(settings.BASE_DIR, HLS_DIR)))
+
+
+def package_dir(song):
+    """Directory of the song's current package, relative to HLS_ROOT; moves when the upload changes."""
+    stem = os.path.splitext(os.path.basename(song.audio_file.name))[0]
+    return f"{song.id}/{stem}"
+
+
+def manifest_path(song):
+    """Absolute path of the song's master playlist, or None if it isn't packaged."""
+    if not song.hls_manifest:
+        return None
+    return os.path.join(hls_root(), song.hls_manifest)
+
+
+def is_current_package(song):
+    """Whether the song's package was segmented from its current upload."""
+    if not song.audio_file or song.hls_manifest != f"{package_dir(song)}/{MASTER_PLAYLIST}":
+        return False
+    try:
+        built_at = os.path.getmtime(manifest_path(song))
+    except OSError:
+        return False
+    return not source_is_newer(song, built_at)
+
+
+def needs_packaging(song):
+    if not song.is_approved or not song.audio_file:
+        return False
+    return not is_current_package(song)
+
+
+def package_song(song, force=False):
+    """Segment ``song`` for HLS. Returns the master playlist's storage name or None."""
+    from music.models import Song
+
+    if not force and not needs_packaging(song):
+        return song.hls_manifest or None
+    if not song.audio_file:
+        return None
+
+    relative_dir = package_dir(song)
+    output_dir = os.path.join(hls_root(), relative_dir)
+    building_dir = output_dir + '.building'
+    shutil.rmtree(building_dir, ignore_errors=True)
+
+    segment_seconds = getattr(settings, 'HLS_SEGMENT_SECONDS', 6)
+    bitrates = target_bitrates(song)
+    try:
+        for bitrate in bitrates:
+            variant_dir = os.path.join(building_dir, f'{bitrate}k')
+            os.makedirs(variant_dir)
+            run_ffmpeg([
+                '-i', song.audio_file.path, '-map', '0:a:0', '-map_metadata', '-1',
+                '-c:a', 'aac', '-b:a', f'{bitrate}k',
+                '-f', 'hls', '-hls_time', str(segment_seconds),
+                '-hls_playlist_type', 'vod',
+                '-hls_segment_filename', os.path.join(variant_dir, 'seg%05d.ts'),
+                os.path.join(variant_dir, VARIANT_PLAYLIST),
+            ], timeout=1800)
+
+        with open(os.path.join(building_dir, MASTER_PLAYLIST), 'w') as master:
+            master.write('#EXTM3U\n#EXT-X-VERSION:3\n')
+            for bitrate in bitrates:
+                master.write(f'#EXT-X-STREAM-INF:BANDWIDTH={bitrate * 1000},CODECS="mp4a.40.2"\n')
+                master.write(f'{bitrate}k/{VARIANT_PLAYLIST}\n')
+
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.replace(building_dir, output_dir)
+    finally:
+        shutil.rmtree(building_dir, ignore_errors=True)
+
+    manifest = f"{relative_dir}/{MASTER_PLAYLIST}"
+    Song.objects.filter(id=song.id).update(hls_manifest=manifest, updated_at=timezone.now())
+    song.hls_manifest = manifest
+
+    # Packages of replaced uploads
+    song_dir = os.path.join(hls_root(), str(song.id))
+    for entry in os.listdir(song_dir):
+        if os.path.join(song_dir, entry) != output_dir:
+            shutil.rmtree(os.path.join(song_dir, entry), ignore_errors=True)
+
+    print(f"📦 HLS package built for {song.title}: {', '.join(f'{b}k' for b in bitrates)}")
+    return manifest
+
+
+def delete_package(song_id):
+    shutil.rmtree(os.path.join(hls_root(), str(song_id)), ignore_errors=True)
+
+
+# ========== PLAYLISTS ==========
+def package_bitrates(song):
+    """Variant bitrates listed in the song's master playlist."""
+    with open(manifest_path(song)) as master:
+        return [
+            int(line.split('k/', 1)[0])
+            for line in master.read().splitlines()
+            if line and not line.startswith('#')
+        ]
+
+
+def master_playlist(song, variant_url, max_bitrate=None):
+    """Master playlist limited to the variants this listener may receive."""
+    bitrates = package_bitrates(song)
+    allowed = [b for b in bitrates if not max_bitrate or b <= max_bitrate] or bitrates[:1]
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for bitrate in allowed:
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bitrate * 1000},CODECS="mp4a.40.2"')
+        lines.append(variant_url(bitrate))
+    return '\n'.join(lines) + '\n'
+
+
+def variant_dir(song, bitrate):
+    return os.path.join(os.path.dirname(manifest_path(song)), f'{bitrate}k')
+
+
+def variant_playlist(song, bitrate, segment_url):
+    """Media playlist with segment URIs built by ``segment_url(name)``."""
+    lines = []
+    with open(os.path.join(variant_dir(song, bitrate), VARIANT_PLAYLIST)) as playlist:
+        for line in playlist.read().splitlines():
+            if line and not line.startswith('#'):
+                line = segment_url(line)
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def segment_path(song, bitrate, segment):
+    """Absolute path of one segment of the song's package, or None if there is no such segment."""
+    if not SEGMENT_RE.match(segment):
+        return None
+    path = os.path.join(variant_dir(song, bitrate), segment)
+    return path if os.path.exists(path) else None
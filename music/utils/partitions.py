@@ -0,0 +1,215 @@
+# music/utils/partitions.py
+"""
+Monthly partitions and retention for the play log (music_songplay).
+
+On PostgreSQL, migration 0015 turns music_songplay into a table range
+partitioned by played_at: one partition per month (music_songplay_pYYYYMM),
+the rows from before partitioning in music_songplay_legacy, and a default
+partition that only catches plays outside the prepared months.
+``manage.py manage_play_partitions``:
+
+- creates the partitions for this month and the next PLAY_PARTITIONS_AHEAD
+- applies PLAY_RETENTION_MONTHS: partitions entirely older than that are
+  rolled up into SongDailyStats, written to a gzipped CSV in
+  PLAY_ARCHIVE_DIR when that is set, then detached (and dropped once
+  archived; otherwise the detached table is left for the DBA)
+
+Other databases have no partitions; retention there archives and deletes
+the expired rows in batches.
+"""
+import csv
+import gzip
+import os
+import re
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .daily_stats import rebuild_daily_stats
+
+PARENT_TABLE = 'music_songplay'
+DEFAULT_PARTITION = 'music_songplay_default'
+BOUND_RE = re.compile(r"FROM \((?:'(?P<start>[^']+)'|MINVALUE)\) TO \((?:'(?P<end>[^']+)'|MAXVALUE)\)")
+
+
+def partitions_ahead():
+    return getattr(settings, 'PLAY_PARTITIONS_AHEAD', 3)
+
+
+def retention_months():
+    return getattr(settings, 'PLAY_RETENTION_MONTHS', None)
+
+
+def archive_dir():
+    return getattr(settings, 'PLAY_ARCHIVE_DIR', None)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def this_month():
+    return timezone.now().astimezone(dt_timezone.utc).date().replace(day=1)
+
+
+def month_bound(month):
+    """Partitions split at midnight UTC on the first of the month."""
+    return datetime.combine(month, time.min, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{PARENT_TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s AND relkind = 'p'", [PARENT_TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """[(name, start, end)] of the attached partitions; None bounds are open, the default has neither."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s ORDER BY c.relname",
+            [PARENT_TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound)
+        if not match:  # DEFAULT
+            continue
+        start = parse_datetime(match.group('start')) if match.group('start') else None
+        end = parse_datetime(match.group('end')) if match.group('end') else None
+        partitions.append((name, start, end))
+    return partitions
+
+
+# ========== CREATING ==========
+def create_partition(month):
+    """Attach the partition for ``month``, moving in any plays the default partition caught."""
+    name = partition_name(month)
+    start, end = month_bound(month), month_bound(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE played_at >= %s AND played_at < %s RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", [start, end])
+    return name
+
+
+def ensure_partitions(ahead=None, dry_run=False):
+    """Create the missing partitions for this month and the next ``ahead``. Returns their names."""
+    ahead = partitions_ahead() if ahead is None else ahead
+    existing = list_partitions()
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(this_month(), offset)
+        start, end = month_bound(month), month_bound(add_months(month, 1))
+        # The legacy partition covers everything up to the month partitioning started
+        if any((s is None or s < end) and (e is None or start < e) for _, s, e in existing):
+            continue
+        if not dry_run:
+            create_partition(month)
+        created.append(partition_name(month))
+    return created
+
+
+# ========== RETENTION ==========
+def retention_cutoff(months):
+    return month_bound(add_months(this_month(), -months))
+
+
+def archive_partition(name, directory):
+    """COPY a partition to ``<directory>/<name>.csv.gz``. Returns the path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.csv.gz')
+    with gzip.open(path + '.tmp', 'wb') as archive, connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def expire_partitions(months=None, directory=None, dry_run=False):
+    """Roll up, archive and detach partitions older than the retention window. Returns their names."""
+    months = retention_months() if months is None else months
+    if not months:
+        return []
+    directory = directory or archive_dir()
+    cutoff = retention_cutoff(months)
+
+    expired = []
+    for name, start, end in list_partitions():
+        if end is None or end > cutoff:
+            continue
+        expired.append(name)
+        if dry_run:
+            continue
+
+        if start is None:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT MIN(played_at) FROM {name}")
+                start = cursor.fetchone()[0]
+        # Daily stats must hold these days before their raw rows go
+        if start is not None:
+            rebuild_daily_stats(start=timezone.localdate(start), end=timezone.localdate(end))
+
+        if directory:
+            path = archive_partition(name, directory)
+            print(f"📦 Archived {name} to {path}")
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}")
+            if directory:
+                cursor.execute(f"DROP TABLE {name}")
+    return expired
+
+
+def expire_rows(months=None, directory=None, dry_run=False, batch_size=5000):
+    """Retention without partitions: roll up, archive and delete old SongPlay rows. Returns rows expired."""
+    from music.models import SongPlay
+
+    months = retention_months() if months is None else months
+    if not months:
+        return 0
+    directory = directory or archive_dir()
+    cutoff = retention_cutoff(months)
+
+    old = SongPlay.objects.filter(played_at__lt=cutoff)
+    first = old.order_by('played_at').values_list('played_at', flat=True).first()
+    if first is None:
+        return 0
+    if dry_run:
+        return old.count()
+
+    rebuild_daily_stats(start=timezone.localdate(first), end=timezone.localdate(cutoff))
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{PARENT_TABLE}-before-{cutoff:%Y%m}.csv.gz')
+        fields = SongPlay._meta.concrete_fields
+        with gzip.open(path, 'wt', newline='') as archive:
+            writer = csv.writer(archive)
+            writer.writerow([field.column for field in fields])
+            writer.writerows(old.order_by('id').values_list(*[field.attname for field in fields]).iterator())
+        print(f"📦 Archived expired plays to {path}")
+
+    expired = 0
+    while True:
+        ids = list(old.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return expired
+        SongPlay.objects.filter(id__in=ids).delete()
+        expired += len(ids)
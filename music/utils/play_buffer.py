@@ -0,0 +1,280 @@
+# music/utils/play_buffer.py
+"""
+Buffered play-event ingestion.
+
+Play endpoints append events to this buffer instead of locking the Song row and
+inserting a SongPlay in the request. A background thread in each worker process
+flushes the buffer every PLAY_BUFFER_FLUSH_INTERVAL seconds (or as soon as
+PLAY_BUFFER_FLUSH_SIZE events are waiting): the SongPlay rows are bulk-created
+and every song gets one aggregated ``+ N`` increment on a SongPlayCounter shard.
+
+When PLAY_BUFFER_SPOOL_DIR is set, each event is also journaled to a spool file
+owned by the worker process. Spool files left behind by a worker that died
+before flushing are replayed by the next flush in any worker, or by
+``python manage.py flush_play_buffer``.
+"""
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+SPOOL_FILE_RE = re.compile(r'^plays-(?P<pid>\d+)[-.]')
+
+
+def _pid_is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PlayEventBuffer:
+    """Per-process buffer of pending play events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._events = []
+        self._pending = Counter()
+        self._thread = None
+        self._pid = None
+        self._spool_file = None
+        self._spool_seq = 0
+
+    # ========== SETTINGS ==========
+    @property
+    def flush_size(self):
+        return getattr(settings, 'PLAY_BUFFER_FLUSH_SIZE', 200)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'PLAY_BUFFER_FLUSH_INTERVAL', 5)
+
+    @property
+    def spool_dir(self):
+        spool_dir = getattr(settings, 'PLAY_BUFFER_SPOOL_DIR', None)
+        return str(spool_dir) if spool_dir else None
+
+    # ========== RECORDING ==========
+    def record(self, song_id, user_id=None, ip_address=None, user_agent='',
+               audio_quality='standard'):
+        """Queue a play event. Never touches the database."""
+        event = {
+            'song_id': song_id,
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent or '',
+            'audio_quality': audio_quality,
+            'played_at': timezone.now().isoformat(),
+        }
+
+        with self._lock:
+            self._ensure_started()
+            self._events.append(event)
+            self._pending[song_id] += 1
+            if self._spool_file:
+                self._spool_file.write(json.dumps(event) + '\n')
+                self._spool_file.flush()
+            buffered = len(self._events)
+
+        if buffered >= self.flush_size:
+            self._wakeup.set()
+
+    def pending_plays(self, song_id):
+        """Plays recorded by this process that are not in Song.plays yet."""
+        with self._lock:
+            return self._pending.get(song_id, 0)
+
+    # ========== FLUSHING ==========
+    def flush(self):
+        """Write buffered events (and orphaned spool files) to the database."""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+                self._rotate_spool()
+
+            if events:
+                try:
+                    write_play_events(events)
+                except Exception as e:
+                    print(f"❌ Play buffer flush failed, will retry: {e}")
+                    with self._lock:
+                        self._events[:0] = events
+                    return 0
+
+                with self._lock:
+                    self._pending.subtract(Counter(e['song_id'] for e in events))
+                    self._pending = +self._pending
+                self._remove_own_rotated_spools()
+
+            return len(events) + self.recover_spool()
+
+    def recover_spool(self):
+        """Replay spool files left behind by worker processes that died."""
+        if not self.spool_dir:
+            return 0
+
+        recovered = 0
+        for path in glob.glob(os.path.join(self.spool_dir, 'plays-*')):
+            match = SPOOL_FILE_RE.match(os.path.basename(path))
+            if not match:
+                continue
+            pid = int(match.group('pid'))
+            if pid == os.getpid():
+                # Only retry files this process claimed earlier and failed to write
+                if '-claimed-' not in path:
+                    continue
+                claimed_path = path
+            else:
+                if _pid_is_alive(pid):
+                    continue
+                # Claim the file so only one worker replays it
+                claimed_path = os.path.join(
+                    self.spool_dir, f'plays-{os.getpid()}-claimed-{uuid.uuid4().hex}.jsonl'
+                )
+                try:
+                    os.rename(path, claimed_path)
+                except OSError:
+                    continue
+
+            with open(claimed_path) as spool:
+                events = [json.loads(line) for line in spool if line.strip()]
+            if events:
+                write_play_events(events)
+            os.unlink(claimed_path)
+            recovered += len(events)
+            print(f"♻️ Recovered {len(events)} spooled plays from worker {pid}")
+
+        return recovered
+
+    # ========== INTERNALS ==========
+    def _ensure_started(self):
+        """Start the flusher thread once per process (gunicorn forks workers)."""
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._events = []
+        self._pending = Counter()
+        self._spool_file = None
+        self._open_spool()
+
+        self._thread = threading.Thread(
+            target=self._run, name='play-buffer-flusher', daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Play buffer flusher error: {e}")
+            finally:
+                close_old_connections()
+
+    def _spool_path(self):
+        return os.path.join(self.spool_dir, f'plays-{os.getpid()}.jsonl')
+
+    def _open_spool(self):
+        if not self.spool_dir:
+            return
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._spool_file = open(self._spool_path(), 'a')
+
+    def _rotate_spool(self):
+        """Move the live journal aside; it is deleted once its events are written."""
+        if not self._spool_file:
+            return
+        self._spool_file.close()
+        self._spool_seq += 1
+        if os.path.getsize(self._spool_path()):
+            os.rename(
+                self._spool_path(),
+                os.path.join(self.spool_dir, f'plays-{os.getpid()}-{self._spool_seq}.flushing'),
+            )
+        self._spool_file = open(self._spool_path(), 'a')
+
+    def _remove_own_rotated_spools(self):
+        if not self.spool_dir:
+            return
+        for path in glob.glob(os.path.join(self.spool_dir, f'plays-{os.getpid()}-*.flushing')):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def write_play_events(events):
+    """
+    Persist a batch of play events: one bulk insert of SongPlay rows plus one
+    ``+ N`` counter increment and daily-stats update per song, in a single
+    transaction.
+    """
+    from django.contrib.auth.models import User
+    from music.models import Song, SongPlay, SongPlayCounter
+    from music.utils.daily_stats import record_plays
+    from music.utils.user_agents import user_agent_ids
+
+    song_ids = {e['song_id'] for e in events}
+    user_ids = {e['user_id'] for e in events if e.get('user_id')}
+
+    # Songs or users deleted while their plays sat in the buffer are skipped
+    existing_songs = set(Song.objects.filter(id__in=song_ids).values_list('id', flat=True))
+    existing_users = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    # Resolved outside the transaction below, mostly from the in-process cache
+    agent_ids = {ua: user_agent_ids.id_for(ua) for ua in {e.get('user_agent') for e in events} if ua}
+
+    plays = []
+    counts = Counter()
+    for event in events:
+        if event['song_id'] not in existing_songs:
+            continue
+        user_id = event.get('user_id') if event.get('user_id') in existing_users else None
+        plays.append(SongPlay(
+            song_id=event['song_id'],
+            user_id=user_id,
+            played_at=parse_datetime(event['played_at']) or timezone.now(),
+            ip_address=event.get('ip_address'),
+            duration_played=0,
+            agent_id=agent_ids.get(event.get('user_agent')),
+            audio_quality=event.get('audio_quality', 'standard'),
+            is_anonymous=user_id is None,
+        ))
+        counts[event['song_id']] += 1
+
+    with transaction.atomic():
+        SongPlay.objects.bulk_create(plays, batch_size=500)
+        # Sorted so concurrent flushes lock counter rows in the same order
+        for song_id in sorted(counts):
+            SongPlayCounter.increment(song_id, counts[song_id])
+        record_plays(plays)
+
+    return len(plays)
+
+
+play_buffer = PlayEventBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if play_buffer._pid == os.getpid():
+        try:
+            play_buffer.flush()
+        except Exception as e:
+            print(f"❌ Play buffer flush on exit failed: {e}")
@@ -0,0 +1,190 @@
+# music/utils/previews.py
+"""
+Preview clips for premium songs.
+
+Free listeners get ``Song.preview_duration`` seconds of a premium song. The
+clip is cut once (at upload/approval, or by ``manage.py build_previews``) and
+stored under MEDIA_ROOT/previews/, so previews never touch the full file.
+
+MP3s are cut on frame boundaries by walking the MPEG frame headers, without
+re-encoding. Other formats are cut with ffmpeg (stream copy) when it is
+installed.
+"""
+import os
+
+from django.conf import settings
+
+from .branding import audio_payload_range
+from .ffmpeg import run_ffmpeg
+
+PREVIEWS_DIR = 'previews'
+
+# Bitrates in kbps, indexed by the 4-bit bitrate index
+MPEG1_BITRATES = {
+    1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+}
+MPEG2_BITRATES = {
+    1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+# Upper bound on bytes per second of MP3 audio (320 kbps + slack)
+MAX_MP3_BYTES_PER_SECOND = 48000
+
+
+def parse_mp3_frame_header(header):
+    """
+    Decode a 4-byte MPEG audio frame header.
+    Returns (frame_length, samples, sample_rate) or None if it isn't a valid header.
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    bitrates = MPEG1_BITRATES if version == 3 else MPEG2_BITRATES
+    bitrate = bitrates[layer][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version][sample_rate_index]
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or version == 3) else 576
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+
+    return frame_length, samples, sample_rate
+
+
+def iter_mp3_frames(data):
+    """Yield (offset, length, seconds) for each MPEG frame in ``data``, resyncing over junk."""
+    offset = 0
+    size = len(data)
+    while offset + 4 <= size:
+        parsed = parse_mp3_frame_header(data[offset:offset + 4])
+        if not parsed:
+            offset += 1
+            continue
+        frame_length, samples, sample_rate = parsed
+        if offset + frame_length > size:
+            break
+        yield offset, frame_length, samples / sample_rate
+        offset += frame_length
+
+
+def is_vbr_info_frame(frame):
+    """Xing/Info/VBRI frames describe the whole file; a clip must not keep them."""
+    head = frame[:64]
+    return b'Xing' in head or b'Info' in head or b'VBRI' in head
+
+
+def cut_mp3_preview(source_path, output_path, seconds):
+    """Copy whole MP3 frames from the start of the audio until ``seconds`` is reached."""
+    start, end = audio_payload_range(source_path)
+    read_size = min(end - start, int(seconds * MAX_MP3_BYTES_PER_SECOND) + 64 * 1024)
+    with open(source_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(read_size)
+
+    clip = bytearray()
+    duration = 0.0
+    first = True
+    for offset, length, frame_seconds in iter_mp3_frames(data):
+        frame = data[offset:offset + length]
+        if first:
+            first = False
+            if is_vbr_info_frame(frame):
+                continue
+        clip += frame
+        duration += frame_seconds
+        if duration >= seconds:
+            break
+
+    if not clip:
+        raise ValueError(f"No MPEG audio frames found in {source_path}")
+
+    with open(output_path, 'wb') as out:
+        out.write(clip)
+    return duration
+
+
+def cut_ffmpeg_preview(source_path, output_path, seconds):
+    """Stream-copy the first ``seconds`` of a non-MP3 file with ffmpeg."""
+    extension = os.path.splitext(source_path)[1].lstrip('.').lower()
+    run_ffmpeg(
+        ['-i', source_path, '-t', str(seconds), '-map', '0:a', '-c', 'copy',
+         '-f', {'m4a': 'ipod'}.get(extension, extension), output_path],
+        timeout=120,
+    )
+    return float(seconds)
+
+
+def preview_name(song):
+    """Storage name for the song's preview; changes when the audio or duration changes."""
+    stem, extension = os.path.splitext(os.path.basename(song.audio_file.name))
+    return f"{PREVIEWS_DIR}/{song.id}-{song.preview_duration}s-{stem}{extension.lower() or '.mp3'}"
+
+
+def needs_preview(song):
+    return bool(
+        song.is_premium_only
+        and song.preview_duration > 0
+        and song.audio_file
+        and (song.preview_file.name or '') != preview_name(song)
+    )
+
+
+def build_preview(song, force=False):
+    """
+    Cut and store the preview clip for ``song``. Saves with a queryset update
+    so Song post_save handlers don't run again. Returns the storage name or None.
+    """
+    from music.models import Song
+
+    if not force and not needs_preview(song):
+        return song.preview_file.name or None
+    if not song.audio_file or song.preview_duration <= 0:
+        return None
+
+    name = preview_name(song)
+    output_path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = output_path + '.part'
+
+    source_path = song.audio_file.path
+    try:
+        if source_path.lower().endswith('.mp3'):
+            duration = cut_mp3_preview(source_path, temp_path, song.preview_duration)
+        else:
+            duration = cut_ffmpeg_preview(source_path, temp_path, song.preview_duration)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    old_name = song.preview_file.name
+    Song.objects.filter(id=song.id).update(preview_file=name)
+    song.preview_file.name = name
+    if old_name and old_name != name:
+        old_path = os.path.join(settings.MEDIA_ROOT, old_name)
+        if os.path.exists(old_path):
+            os.unlink(old_path)
+
+    print(f"✂️ Preview built for {song.title}: {duration:.1f}s")
+    return name
@@ -0,0 +1,221 @@
+# music/utils/processing.py
+"""
+Post-upload processing queue.
+
+Saving a new song (or changing one in a way that invalidates its derived
+files) enqueues a SongProcessingJob. ``manage.py process_uploads`` claims
+jobs with a conditional UPDATE, so several workers can share the table
+without a broker, and runs PROCESSING_STEPS in order:
+
+- probe: duration, bitrate -> audio_quality, and BPM from the tags (mutagen)
+- thumbnails: cover thumbnails (sizes x AVIF/WebP/JPEG)
+- branded: the branded download tag / artifact
+- preview: the free-listener preview clip of premium songs (non-MP3 uploads
+  are skipped when ffmpeg isn't installed)
+- waveform: scrub bar peaks
+- renditions: the MP3 bitrate ladder (skipped when ffmpeg isn't installed)
+- hls: the HLS package of approved songs (skipped when ffmpeg isn't installed)
+
+Every step is idempotent, so a retried job only redoes missing work. Failed
+jobs are retried with backoff up to PROCESSING_MAX_ATTEMPTS times.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .branding import get_branded_download, get_branded_tag
+from .ffmpeg import find_ffmpeg
+from .hls import needs_packaging, package_song
+from .previews import build_preview, needs_preview
+from .renditions import needs_transcode, transcode_song
+from .thumbnails import build_cover_thumbnails, delete_thumbnails, needs_thumbnails
+from .waveform import build_waveform, can_build_waveform, needs_waveform
+
+LOSSLESS_EXTENSIONS = ('.wav', '.flac')
+BPM_TAGS = ('TBPM', 'tmpo', 'bpm', 'BPM')
+
+
+# ========== STEPS ==========
+def probe_audio(song):
+    """Fill duration, audio_quality and (if empty) bpm from the file itself."""
+    from mutagen import File as MutagenFile
+    from music.models import Song
+
+    audio = MutagenFile(song.audio_file.path)
+    if audio is None or not getattr(audio, 'info', None):
+        raise ValueError(f"Unrecognised audio file: {song.audio_file.name}")
+
+    updates = {}
+    length = int(round(audio.info.length or 0))
+    if length:
+        updates['duration_minutes'], updates['duration_seconds'] = divmod(length, 60)
+
+    bitrate = (getattr(audio.info, 'bitrate', 0) or 0) // 1000
+    if song.audio_file.name.lower().endswith(LOSSLESS_EXTENSIONS):
+        updates['audio_quality'] = 'ultra'
+    elif bitrate >= 256:
+        updates['audio_quality'] = 'high'
+    else:
+        updates['audio_quality'] = 'standard'
+
+    if not song.bpm and audio.tags:
+        for key in BPM_TAGS:
+            if key not in audio.tags:
+                continue
+            value = audio.tags[key]
+            value = getattr(value, 'text', value)
+            if isinstance(value, (list, tuple)):
+                value = value[0] if value else None
+            try:
+                bpm = int(float(str(value)))
+            except (TypeError, ValueError):
+                continue
+            if bpm > 0:
+                updates['bpm'] = bpm
+                break
+
+    # Queryset update so the Song signals don't enqueue another job
+    updates['updated_at'] = timezone.now()
+    Song.objects.filter(id=song.id).update(**updates)
+    for field, value in updates.items():
+        setattr(song, field, value)
+    print(f"🔎 Probed {song.title}: {length}s, {bitrate}kbps -> {updates['audio_quality']}")
+
+
+def build_thumbnails(song):
+    if not song.cover_image:
+        delete_thumbnails(song.cover_image)
+    elif needs_thumbnails(song.cover_image):
+        build_cover_thumbnails(song)
+
+
+def build_branded(song):
+    splice = (
+        getattr(settings, 'BRANDED_DOWNLOAD_MODE', 'splice') == 'splice'
+        and song.audio_file.name.lower().endswith('.mp3')
+    )
+    if splice:
+        get_branded_tag(song)
+    else:
+        get_branded_download(song)
+
+
+def cut_preview(song):
+    # MP3s are cut frame by frame in Python; everything else needs ffmpeg
+    if not song.audio_file.name.lower().endswith('.mp3') and not find_ffmpeg():
+        print(f"⚠️ ffmpeg not installed, skipping preview for {song.title}")
+        return
+    if needs_preview(song):
+        build_preview(song)
+
+
+def build_peaks(song):
+    if not can_build_waveform(song):
+        print(f"⚠️ ffmpeg not installed, skipping waveform for {song.title}")
+        return
+    if needs_waveform(song):
+        build_waveform(song)
+
+
+def build_renditions(song):
+    if not find_ffmpeg():
+        print(f"⚠️ ffmpeg not installed, skipping renditions for {song.title}")
+        return
+    if needs_transcode(song):
+        transcode_song(song)
+
+
+def build_package(song):
+    if not find_ffmpeg():
+        print(f"⚠️ ffmpeg not installed, skipping HLS package for {song.title}")
+        return
+    if needs_packaging(song):
+        package_song(song)
+
+
+PROCESSING_STEPS = [
+    ('probe', probe_audio),
+    ('thumbnails', build_thumbnails),
+    ('branded', build_branded),
+    ('preview', cut_preview),
+    ('waveform', build_peaks),
+    ('renditions', build_renditions),
+    ('hls', build_package),
+]
+
+
+# ========== QUEUE ==========
+def enqueue_processing(song):
+    """Queue processing for ``song`` unless a job is already waiting for it."""
+    from music.models import Song, SongProcessingJob
+
+    if SongProcessingJob.objects.filter(song_id=song.id, status='pending').exists():
+        return None
+    job = SongProcessingJob.objects.create(song_id=song.id)
+    Song.objects.filter(id=song.id).update(processing_status='pending')
+    return job
+
+
+def claim_next_job():
+    """Atomically take the next due job, or return None if the queue is empty."""
+    from music.models import SongProcessingJob
+
+    now = timezone.now()
+
+    # Jobs whose worker died mid-run go back to the queue
+    stale = now - timedelta(seconds=getattr(settings, 'PROCESSING_JOB_TIMEOUT', 1800))
+    SongProcessingJob.objects.filter(status='running', started_at__lt=stale).update(status='pending')
+
+    candidates = SongProcessingJob.objects.filter(status='pending', run_after__lte=now).values_list('id', flat=True)
+    for job_id in candidates[:20]:
+        claimed = SongProcessingJob.objects.filter(id=job_id, status='pending').update(
+            status='running', started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return SongProcessingJob.objects.select_related('song').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run every processing step for the job's song and record the outcome."""
+    from music.models import Song, SongProcessingJob
+
+    song = job.song
+    Song.objects.filter(id=song.id).update(processing_status='processing')
+    print(f"⚙️ Processing {song.title} (job {job.id}, attempt {job.attempts})")
+
+    step = None
+    try:
+        for step, run_step in PROCESSING_STEPS:
+            run_step(song)
+    except Exception as e:
+        max_attempts = getattr(settings, 'PROCESSING_MAX_ATTEMPTS', 3)
+        job.last_error = f"{step}: {e}\n{traceback.format_exc()}"
+        job.finished_at = timezone.now()
+        if job.attempts < max_attempts:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(minutes=2 ** job.attempts)
+            song_status = 'pending'
+        else:
+            job.status = 'failed'
+            song_status = 'failed'
+        job.save(update_fields=['status', 'run_after', 'last_error', 'finished_at'])
+        Song.objects.filter(id=song.id).update(processing_status=song_status)
+        print(f"❌ Processing {song.title} failed at '{step}': {e}")
+        return False
+
+    with transaction.atomic():
+        job.status = 'done'
+        job.last_error = ''
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'last_error', 'finished_at'])
+        # A newer job may be waiting (the song changed while this one ran)
+        waiting = SongProcessingJob.objects.filter(song_id=song.id, status='pending').exists()
+        Song.objects.filter(id=song.id).update(processing_status='pending' if waiting else 'ready')
+
+    print(f"✅ {song.title} processed and ready for review")
+    return True
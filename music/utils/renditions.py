@@ -0,0 +1,188 @@
+# music/utils/renditions.py
+"""
+Multi-bitrate MP3 renditions of uploaded songs.
+
+``transcode_song`` encodes a song's upload with the local ffmpeg (libmp3lame)
+at each bitrate in AUDIO_RENDITION_BITRATES and stores them as SongRendition
+rows under MEDIA_ROOT/renditions/. Bitrates above the source bitrate are
+skipped, except the lowest one so every song has a light rendition.
+
+``choose_rendition`` picks what a listener gets: free users are capped at
+AUDIO_FREE_MAX_BITRATE, premium users get the top rendition, and a slow
+network hint (``?network=``, ``Save-Data`` or ``ECT`` client hints) steps
+both down the ladder.
+"""
+import os
+
+from django.conf import settings
+
+from .ffmpeg import run_ffmpeg, source_is_newer
+
+RENDITIONS_DIR = 'renditions'
+
+# Network hint -> highest bitrate worth sending over it (None = no limit)
+NETWORK_BITRATE_LIMITS = {
+    'slow-2g': 64,
+    '2g': 64,
+    'slow': 64,
+    '3g': 128,
+    '4g': None,
+    'wifi': None,
+    'fast': None,
+}
+
+
+def rendition_bitrates():
+    return sorted(getattr(settings, 'AUDIO_RENDITION_BITRATES', (64, 128, 320)))
+
+
+def source_bitrate(path):
+    """Bitrate of the uploaded file in kbps, or None if mutagen can't tell."""
+    try:
+        from mutagen import File as MutagenFile
+        audio = MutagenFile(path)
+        bitrate = getattr(audio.info, 'bitrate', 0) if audio else 0
+        return bitrate // 1000 if bitrate else None
+    except Exception:
+        return None
+
+
+def rendition_name(song, bitrate):
+    stem = os.path.splitext(os.path.basename(song.audio_file.name))[0]
+    return f"{RENDITIONS_DIR}/{song.id}/{stem}-{bitrate}k.mp3"
+
+
+def target_bitrates(song):
+    """Ladder rungs worth encoding for this song (no upscaling past the source)."""
+    bitrates = rendition_bitrates()
+    source = source_bitrate(song.audio_file.path)
+    if not source:
+        return bitrates
+    # Lossless sources report ~1411 kbps, so they get every rung
+    return [b for b in bitrates if b <= source] or bitrates[:1]
+
+
+def is_current(song, rendition):
+    """Whether ``rendition`` was encoded from the song's current upload (and its file is there)."""
+    if rendition.source_name != song.audio_file.name:
+        return False
+    try:
+        built_at = os.path.getmtime(os.path.join(settings.MEDIA_ROOT, rendition.audio_file.name))
+    except OSError:
+        return False
+    return not source_is_newer(song, built_at)
+
+
+def needs_transcode(song):
+    if not song.audio_file:
+        return False
+    current = {r.bitrate for r in song.renditions.all() if is_current(song, r)}
+    return not set(target_bitrates(song)) <= current
+
+
+def transcode_song(song, force=False):
+    """Encode missing or stale renditions of ``song``. Returns the bitrates encoded."""
+    from music.models import SongRendition
+
+    if not song.audio_file:
+        return []
+
+    source_path = song.audio_file.path
+    existing = {r.bitrate: r for r in song.renditions.all()}
+    wanted = target_bitrates(song)
+    encoded = []
+
+    for bitrate in wanted:
+        rendition = existing.get(bitrate)
+        if rendition and is_current(song, rendition) and not force:
+            continue
+
+        name = rendition_name(song, bitrate)
+        output_path = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        temp_path = output_path + '.part'
+        try:
+            run_ffmpeg([
+                '-i', source_path, '-map', '0:a:0', '-map_metadata', '-1',
+                '-c:a', 'libmp3lame', '-b:a', f'{bitrate}k', '-f', 'mp3', temp_path,
+            ])
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+        old_name = rendition.audio_file.name if rendition else None
+        SongRendition.objects.update_or_create(
+            song=song, bitrate=bitrate,
+            defaults={
+                'audio_file': name,
+                'file_size': os.path.getsize(output_path),
+                'source_name': song.audio_file.name,
+            },
+        )
+        if old_name and old_name != name:
+            old_path = os.path.join(settings.MEDIA_ROOT, old_name)
+            if os.path.exists(old_path):
+                os.unlink(old_path)
+        encoded.append(bitrate)
+
+    # Rungs dropped from the ladder (or above a replaced source's bitrate)
+    for bitrate, rendition in existing.items():
+        if bitrate not in wanted:
+            rendition.delete()
+
+    if encoded:
+        print(f"🎚️ Transcoded {song.title}: {', '.join(f'{b}k' for b in encoded)}")
+    return encoded
+
+
+# ========== RENDITION SELECTION ==========
+def network_hint(request):
+    """Client-declared network class: explicit ?network= first, then client hints."""
+    hint = (request.GET.get('network') or request.POST.get('network') or '').strip().lower()
+    if hint in NETWORK_BITRATE_LIMITS:
+        return hint
+    if request.META.get('HTTP_SAVE_DATA', '').strip().lower() == 'on':
+        return 'slow'
+    ect = request.META.get('HTTP_ECT', '').strip().lower()
+    if ect in NETWORK_BITRATE_LIMITS:
+        return ect
+    return None
+
+
+def is_premium_listener(user):
+    if not user.is_authenticated:
+        return False
+    try:
+        return user.userprofile.is_premium
+    except Exception:
+        return False
+
+
+def max_bitrate_for(request, requested=None, network=True):
+    """Highest bitrate this listener may receive (on this network, unless ``network`` is False)."""
+    limit = None if is_premium_listener(request.user) else getattr(settings, 'AUDIO_FREE_MAX_BITRATE', 128)
+    network_limit = NETWORK_BITRATE_LIMITS.get(network_hint(request)) if network else None
+    for cap in (network_limit, requested):
+        if cap:
+            limit = min(limit, cap) if limit else cap
+    return limit
+
+
+def choose_rendition(request, song, requested=None):
+    """
+    The SongRendition to serve, or None to serve the original upload (songs
+    that haven't been transcoded yet). A ``requested`` bitrate was chosen
+    when the stream URL was built, with the network already taken into
+    account; only the plan caps it, so every Range request of one URL reads
+    the same file.
+    """
+    limit = max_bitrate_for(request, requested, network=requested is None)
+    renditions = [r for r in song.renditions.all() if is_current(song, r)]
+    if not renditions:
+        return None
+
+    fitting = [r for r in renditions if limit is None or r.bitrate <= limit]
+    if fitting:
+        return max(fitting, key=lambda r: r.bitrate)
+    return min(renditions, key=lambda r: r.bitrate)
@@ -0,0 +1,139 @@
+# music/utils/streaming.py
+"""
+Byte-range file responses for audio.
+
+Django's FileResponse always sends the whole file, so seeking in the player
+re-downloads the song from the start. ``ranged_file_response`` answers
+``Range`` requests with 206 partial content, honours ``If-None-Match`` /
+``If-Range`` against a strong ETag, and can hand the transfer to the web
+server through ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache/lighttpd)
+when AUDIO_STREAM_SENDFILE_HEADER is set.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(path, stat=None):
+    stat = stat or os.stat(path)
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header into an inclusive (start, end) pair.
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and ``False`` when the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def iter_file_range(path, start, length, chunk_size=64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def sendfile_response(path, content_type, root=None, internal_url=None):
+    """
+    Let the front-end web server push the bytes (it handles Range itself).
+    For nginx, ``path`` is mapped from ``root`` (MEDIA_ROOT) to the internal
+    location ``internal_url`` (AUDIO_STREAM_INTERNAL_URL).
+    """
+    header = getattr(settings, 'AUDIO_STREAM_SENDFILE_HEADER', None)
+    response = HttpResponse(content_type=content_type)
+    if header == 'X-Accel-Redirect':
+        relative = os.path.relpath(path, root or settings.MEDIA_ROOT).replace(os.sep, '/')
+        internal_url = internal_url or settings.AUDIO_STREAM_INTERNAL_URL
+        response[header] = internal_url.rstrip('/') + '/' + relative
+    else:
+        response[header] = path
+    return response
+
+
+def ranged_file_response(request, path, content_type=None, cache_control='private, max-age=3600',
+                         sendfile_root=None, sendfile_url=None):
+    """
+    Serve ``path`` with Range, conditional request and sendfile support.
+    Files outside MEDIA_ROOT pass their root and nginx location as
+    ``sendfile_root`` / ``sendfile_url``.
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(path, stat)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    def add_headers(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Accept-Ranges'] = 'bytes'
+        if cache_control:
+            response['Cache-Control'] = cache_control
+        return response
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+        return add_headers(HttpResponse(status=304))
+
+    if getattr(settings, 'AUDIO_STREAM_SENDFILE_HEADER', None):
+        return add_headers(sendfile_response(path, content_type, sendfile_root, sendfile_url))
+
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    # A stale If-Range validator means the client's partial copy is outdated
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range is not None and if_range and if_range.strip() != etag:
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return add_headers(response)
+
+    if byte_range is None:
+        return add_headers(FileResponse(open(path, 'rb'), content_type=content_type))
+
+    start, end = byte_range
+    length = end - start + 1
+    if end == size - 1:
+        # Open-ended range: FileResponse keeps wsgi.file_wrapper (sendfile) from the offset
+        f = open(path, 'rb')
+        f.seek(start)
+        response = FileResponse(f, content_type=content_type, status=206)
+    else:
+        response = StreamingHttpResponse(iter_file_range(path, start, length), content_type=content_type, status=206)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return add_headers(response)
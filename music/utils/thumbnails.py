@@ -0,0 +1,191 @@
+# music/utils/thumbnails.py
+"""
+Image thumbnails.
+
+Covers, artist photos, playlist covers, profile pictures and news images are
+shown at a fraction of their upload size, so each upload is rendered once
+into thumbnails THUMBNAIL_SIZES (64-600 px) wide in every format of
+THUMBNAIL_FORMATS: AVIF and WebP for browsers that take them, JPEG for the
+rest. Thumbnails are square crops, except for the images in FIT_WIDTH_FIELDS
+(news banners), which keep their aspect ratio. Names are derived from the
+model, field, object and source file:
+
+    MEDIA_ROOT/thumbnails/<app>.<model>.<field>/<pk>/<stem>-<size>.<ext>
+    MEDIA_ROOT/thumbnails/<app>.<model>.<field>/<pk>/<stem>-<size>w.<ext>   (aspect kept)
+
+so templates can build URLs without a lookup (``{% picture %}`` and
+``{% srcset %}`` in music/templatetags/thumbnails.py). New songs' covers are
+built by the processing queue, replaced covers and the other images after
+the upload is saved (see music/signals.py), and ``manage.py
+build_thumbnails`` backfills everything.
+"""
+import os
+import shutil
+
+from django.conf import settings
+
+THUMBNAILS_DIR = 'thumbnails'
+THUMBNAIL_SIZES = (64, 150, 300, 600)
+THUMBNAIL_FORMATS = ('avif', 'webp', 'jpeg')
+
+# format -> (extension, MIME type, Pillow save options)
+FORMATS = {
+    'avif': ('avif', 'image/avif', {'quality': 60}),
+    'webp': ('webp', 'image/webp', {'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Images that get thumbnails: model label -> image field
+THUMBNAIL_FIELDS = {
+    'music.song': 'cover_image',
+    'artists.artist': 'image',
+    'library.playlist': 'cover_image',
+    'accounts.userprofile': 'profile_picture',
+    'news.newsarticle': 'featured_image',
+}
+
+# Images shown at their own aspect ratio: scaled to each width, not cropped
+FIT_WIDTH_FIELDS = {'news.newsarticle'}
+
+
+def thumbnail_sizes():
+    return tuple(sorted(getattr(settings, 'THUMBNAIL_SIZES', THUMBNAIL_SIZES)))
+
+
+def thumbnail_formats():
+    """Configured formats this Pillow can encode, JPEG last (it is the fallback and written last)."""
+    from PIL import features
+
+    formats = [
+        fmt for fmt in getattr(settings, 'THUMBNAIL_FORMATS', THUMBNAIL_FORMATS)
+        if fmt in FORMATS and fmt != 'jpeg' and features.check(fmt)
+    ]
+    return tuple(formats) + ('jpeg',)
+
+
+def thumbnail_dir(image):
+    opts = image.instance._meta
+    return f"{THUMBNAILS_DIR}/{opts.label_lower}.{image.field.name}/{image.instance.pk}"
+
+
+def is_square(image):
+    return image.instance._meta.label_lower not in FIT_WIDTH_FIELDS
+
+
+def thumbnail_file(stem, size, fmt, square=True):
+    return f"{stem}-{size}{'' if square else 'w'}.{FORMATS[fmt][0]}"
+
+
+def thumbnail_name(image, size, fmt='jpeg'):
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    return f"{thumbnail_dir(image)}/{thumbnail_file(stem, size, fmt, is_square(image))}"
+
+
+def has_thumbnails(image):
+    """Whether the image's thumbnails are built; the largest JPEG is the last file written."""
+    if not image:
+        return False
+    return os.path.exists(os.path.join(settings.MEDIA_ROOT, thumbnail_name(image, thumbnail_sizes()[-1])))
+
+
+def thumbnail_url(image, size, fmt='jpeg'):
+    """URL of a built thumbnail, or None if it doesn't exist."""
+    if not image:
+        return None
+    name = thumbnail_name(image, size, fmt)
+    if not os.path.exists(os.path.join(settings.MEDIA_ROOT, name)):
+        return None
+    return settings.MEDIA_URL + name
+
+
+def needs_thumbnails(image):
+    if not image:
+        return False
+    return any(
+        not os.path.exists(os.path.join(settings.MEDIA_ROOT, thumbnail_name(image, size, fmt)))
+        for fmt in thumbnail_formats()
+        for size in thumbnail_sizes()
+    )
+
+
+# ========== RENDERING ==========
+def _scale_to_width(image, width):
+    from PIL import Image
+
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def render_thumbnails(source_path, output_dir, stem, sizes, formats, square=True, force=False):
+    """
+    Render ``<stem>-<size>.<ext>`` files of ``source_path`` into ``output_dir``
+    (``<stem>-<size>w.<ext>``, aspect kept, when not ``square``) and remove
+    anything else there (thumbnails of a replaced image). Touches no
+    database, so the backfill can run it in worker processes. Returns the
+    number of files written.
+    """
+    from PIL import Image, ImageOps
+
+    wanted = {
+        (size, fmt): os.path.join(output_dir, thumbnail_file(stem, size, fmt, square))
+        for fmt in formats for size in sizes
+    }
+    missing = [key for key, path in wanted.items() if force or not os.path.exists(path)]
+
+    written = 0
+    if missing:
+        os.makedirs(output_dir, exist_ok=True)
+        with Image.open(source_path) as source:
+            # JPEGs decode at a reduced scale when they are far larger than needed
+            source.draft('RGB', (max(sizes) * 2, max(sizes) * 2))
+            source = ImageOps.exif_transpose(source).convert('RGB')
+            # Crop (or not) and shrink once; every size is resized from this
+            if square:
+                base = ImageOps.fit(source, (max(sizes), max(sizes)), Image.Resampling.LANCZOS)
+            else:
+                base = _scale_to_width(source, max(sizes))
+
+        for fmt in formats:
+            for size in sizes:
+                if (size, fmt) not in missing:
+                    continue
+                path = wanted[(size, fmt)]
+                thumb = base if size == base.width else _scale_to_width(base, size)
+                thumb.save(path + '.part', fmt.upper(), **FORMATS[fmt][2])
+                os.replace(path + '.part', path)
+                written += 1
+
+    if os.path.isdir(output_dir):
+        keep = {os.path.basename(path) for path in wanted.values()}
+        for entry in os.listdir(output_dir):
+            if entry not in keep:
+                os.unlink(os.path.join(output_dir, entry))
+    return written
+
+
+def thumbnail_task(image):
+    """render_thumbnails arguments for an image field file."""
+    return (
+        image.path,
+        os.path.join(settings.MEDIA_ROOT, thumbnail_dir(image)),
+        os.path.splitext(os.path.basename(image.name))[0],
+        thumbnail_sizes(),
+        thumbnail_formats(),
+        is_square(image),
+    )
+
+
+def build_image_thumbnails(image, force=False):
+    """Render the missing thumbnails of an image field file. Returns the number of files written."""
+    if not image:
+        return 0
+    return render_thumbnails(*thumbnail_task(image), force=force)
+
+
+def build_cover_thumbnails(song):
+    return build_image_thumbnails(song.cover_image)
+
+
+def delete_thumbnails(image):
+    """Remove every thumbnail of the object's image field (also when the field is empty)."""
+    shutil.rmtree(os.path.join(settings.MEDIA_ROOT, thumbnail_dir(image)), ignore_errors=True)
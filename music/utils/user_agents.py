@@ -0,0 +1,118 @@
+# music/utils/user_agents.py
+"""
+User-Agent dictionary encoding for the play and download logs.
+
+``user_agent_ids.id_for(string)`` returns the UserAgent id for a string. Each
+worker process keeps an LRU of SHA-1 -> id (USER_AGENT_CACHE_SIZE entries),
+so the few hundred strings real traffic uses resolve without a query; only
+a new string costs a lookup (and an insert the first time it is seen).
+
+Device type, browser and OS are parsed once, when the row is created, with
+a few regexes; good enough for analytics breakdowns.
+"""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection, transaction, IntegrityError
+
+BOT_RE = re.compile(r'bot|crawl|spider|slurp|facebookexternalhit|curl|wget|python-requests|okhttp', re.I)
+
+# First match wins, so more specific tokens come first
+BROWSERS = [
+    ('Opera Mini', re.compile(r'Opera Mini')),
+    ('Opera', re.compile(r'OPR/|Opera')),
+    ('Edge', re.compile(r'Edg(e|A|iOS)?/')),
+    ('Samsung Internet', re.compile(r'SamsungBrowser/')),
+    ('UC Browser', re.compile(r'UCBrowser/')),
+    ('Chrome', re.compile(r'Chrome/|CriOS/')),
+    ('Firefox', re.compile(r'Firefox/|FxiOS/')),
+    ('Safari', re.compile(r'Version/.*Safari/')),
+]
+OPERATING_SYSTEMS = [
+    ('Windows', re.compile(r'Windows')),
+    ('iOS', re.compile(r'iPhone|iPad|iPod')),
+    ('macOS', re.compile(r'Mac OS X|Macintosh')),
+    ('Android', re.compile(r'Android')),
+    ('ChromeOS', re.compile(r'CrOS')),
+    ('Linux', re.compile(r'Linux')),
+]
+
+
+def user_agent_hash(user_agent):
+    return hashlib.sha1(user_agent.encode('utf-8', 'replace')).hexdigest()
+
+
+def parse_user_agent(user_agent):
+    """Device type, browser and OS of a User-Agent string."""
+    if BOT_RE.search(user_agent):
+        device_type = 'bot'
+    elif 'iPad' in user_agent or 'Tablet' in user_agent or ('Android' in user_agent and 'Mobile' not in user_agent):
+        device_type = 'tablet'
+    elif 'Mobi' in user_agent or 'iPhone' in user_agent or 'Opera Mini' in user_agent:
+        device_type = 'mobile'
+    elif 'Windows' in user_agent or 'Macintosh' in user_agent or 'X11' in user_agent or 'CrOS' in user_agent:
+        device_type = 'desktop'
+    else:
+        device_type = 'other'
+
+    browser = next((name for name, pattern in BROWSERS if pattern.search(user_agent)), '')
+    os_name = next((name for name, pattern in OPERATING_SYSTEMS if pattern.search(user_agent)), '')
+    return {'device_type': device_type, 'browser': browser, 'os': os_name}
+
+
+class UserAgentCache:
+    """Per-process LRU of User-Agent hash -> UserAgent id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = OrderedDict()
+
+    @property
+    def size(self):
+        return getattr(settings, 'USER_AGENT_CACHE_SIZE', 4096)
+
+    def id_for(self, user_agent):
+        """UserAgent id for the string (None for an empty one), creating the row if needed."""
+        if not user_agent:
+            return None
+        digest = user_agent_hash(user_agent)
+
+        with self._lock:
+            agent_id = self._ids.get(digest)
+            if agent_id is not None:
+                self._ids.move_to_end(digest)
+                return agent_id
+
+        agent_id = self._lookup(digest, user_agent)
+        if connection.in_atomic_block:
+            # A rolled-back insert must not stay cached
+            transaction.on_commit(lambda: self._remember(digest, agent_id))
+        else:
+            self._remember(digest, agent_id)
+        return agent_id
+
+    def _lookup(self, digest, user_agent):
+        from music.models import UserAgent
+
+        agent_id = UserAgent.objects.filter(hash=digest).values_list('id', flat=True).first()
+        if agent_id is not None:
+            return agent_id
+        try:
+            with transaction.atomic():
+                return UserAgent.objects.create(hash=digest, user_agent=user_agent, **parse_user_agent(user_agent)).id
+        except IntegrityError:
+            # Another worker inserted it first
+            return UserAgent.objects.filter(hash=digest).values_list('id', flat=True).get()
+
+    def _remember(self, digest, agent_id):
+        with self._lock:
+            self._ids[digest] = agent_id
+            self._ids.move_to_end(digest)
+            while len(self._ids) > self.size:
+                self._ids.popitem(last=False)
+
+
+user_agent_ids = UserAgentCache()
@@ -0,0 +1,115 @@
+# music/utils/waveform.py
+"""
+Waveform peaks for the song page scrub bar.
+
+Each song is decoded once, offline (``manage.py build_waveforms`` or the
+upload processing pipeline), to mono 16-bit PCM at a low sample rate with
+the local ffmpeg; 16-bit WAV uploads are read with the stdlib ``wave``
+module when ffmpeg isn't installed. The PCM is reduced to WAVEFORM_BUCKETS
+peak values scaled to 0-255, stored as one byte each in SongWaveform.peaks.
+
+NumPy (in requirements.txt) does the reduction; ``array`` and a plain loop
+produce the same bytes, just more slowly, where it can't be installed.
+"""
+import os
+import wave
+from array import array
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+
+from .ffmpeg import find_ffmpeg, run_ffmpeg, source_is_newer
+
+try:
+    import numpy as np
+except ImportError:  # required in production; pure-Python fallback below
+    np = None
+
+# Peaks only need the envelope, so a low decode rate keeps the PCM small
+DECODE_SAMPLE_RATE = 8000
+
+
+def waveform_buckets():
+    return getattr(settings, 'WAVEFORM_BUCKETS', 1000)
+
+
+def decode_pcm(path):
+    """Mono signed 16-bit little-endian PCM of the audio file."""
+    if find_ffmpeg():
+        return run_ffmpeg(
+            ['-i', path, '-map', '0:a:0', '-ac', '1', '-ar', str(DECODE_SAMPLE_RATE), '-f', 's16le', '-'],
+            capture_stdout=True,
+        )
+
+    if path.lower().endswith('.wav'):
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() == 2:
+                channels = wav.getnchannels()
+                samples = array('h')
+                samples.frombytes(wav.readframes(wav.getnframes()))
+                # The first channel is enough for an envelope
+                return samples[::channels].tobytes()
+
+    raise RuntimeError("ffmpeg is required to decode this audio file for waveforms")
+
+
+def compute_peaks(pcm, buckets):
+    """Reduce 16-bit PCM to ``buckets`` absolute peaks scaled to 0-255 bytes."""
+    if np is not None:
+        samples = np.frombuffer(pcm[:len(pcm) - len(pcm) % 2], dtype='<i2').astype(np.int32)
+        if not samples.size:
+            return bytes(buckets)
+        # Pad to a whole number of buckets, then take the peak of each row
+        per_bucket = -(-samples.size // buckets)
+        samples = np.pad(np.abs(samples), (0, per_bucket * buckets - samples.size))
+        peaks = samples.reshape(buckets, per_bucket).max(axis=1)
+        top = peaks.max()
+        if not top:
+            return bytes(buckets)
+        return np.round(peaks * (255.0 / top)).astype(np.uint8).tobytes()
+
+    samples = array('h')
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    if not samples:
+        return bytes(buckets)
+    per_bucket = -(-len(samples) // buckets)
+    peaks = [
+        max((abs(s) for s in samples[i * per_bucket:(i + 1) * per_bucket]), default=0)
+        for i in range(buckets)
+    ]
+    top = max(peaks)
+    if not top:
+        return bytes(buckets)
+    return bytes(round(p * 255.0 / top) for p in peaks)
+
+
+def needs_waveform(song):
+    if not song.audio_file:
+        return False
+    try:
+        waveform = song.waveform
+    except ObjectDoesNotExist:
+        return True
+    return (
+        waveform.source_name != song.audio_file.name
+        or waveform.buckets != waveform_buckets()
+        or source_is_newer(song, waveform.created_at.timestamp())
+    )
+
+
+def build_waveform(song):
+    """Decode ``song`` and store its peaks. Returns the SongWaveform."""
+    from music.models import SongWaveform
+
+    buckets = waveform_buckets()
+    peaks = compute_peaks(decode_pcm(song.audio_file.path), buckets)
+    waveform, _ = SongWaveform.objects.update_or_create(
+        song=song,
+        defaults={'peaks': peaks, 'buckets': buckets, 'source_name': song.audio_file.name},
+    )
+    print(f"〰️ Waveform built for {song.title}: {len(peaks)} bytes")
+    return waveform
+
+
+def can_build_waveform(song):
+    return bool(find_ffmpeg() or os.path.splitext(song.audio_file.name)[1].lower() == '.wav')
@@ -1,22 +1,37 @@
 # music/views.py
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse, HttpResponse, FileResponse
-from django.db.models import Q, Count, Sum, Avg, F
+from django.urls import reverse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse, Http404
+from django.db.models import Q, Count, Sum, F
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_safe
 from django.utils import timezone
-from django.core.paginator import Paginator
 from django.conf import settings
-from django.db import transaction
 from datetime import timedelta
 import json
 import os
-import tempfile
-import shutil
 import re
 
-from .models import Song, Genre, SongPlay, SongDownload
+from .models import Song, Genre, SongPlay, SongDownload, SongPlayCounter, SongWaveform
 from .forms import SongUploadForm
+from .caching import cache_anonymous_page, cached
+from .catalog import catalog_response
+from .charts import CHART_MATRIX, ARTIST_CHARTS, chart_items, chart_page, chart_window
+from .genres import genre_registry
+from .pagination import CursorPaginator
+from .search import cached_search, query_terms
+from .suggest import suggest_index
+from .utils.play_buffer import play_buffer
+from .utils.streaming import ranged_file_response
+from .utils.previews import build_preview, needs_preview
+from .utils.renditions import choose_rendition, max_bitrate_for
+from .utils.user_agents import user_agent_ids
+from .utils.hls import hls_root, is_current_package, master_playlist, package_bitrates, segment_path, variant_playlist
+from .utils.branding import (
+    get_branded_download, get_branded_tag, audio_payload_range, iter_spliced_download,
+)
+from library.likes import mark_liked
 
 # Utility function to get client IP
 def get_client_ip(request):
@@ -27,311 +42,6 @@ def get_client_ip(request):
         ip = request.META.get('REMOTE_ADDR')
     return ip
 
-# ========== COMPLETE HELPER FUNCTIONS ==========
-def create_branded_cover(song, logo_path, output_path):
-    """Create branded cover art with MusicCenterUg logo"""
-    try:
-        from PIL import Image, ImageDraw, ImageFont, ImageFilter
-        import os
-        
-        print(f"🎨 Creating branded cover for: {song.title}")
-        print(f"🏷️ Using logo: {logo_path}")
-        
-        # Create base image (600x600 for good quality)
-        img = Image.new('RGB', (600, 600), color='#121212')
-        draw = ImageDraw.Draw(img)
-        
-        # Add gradient background (dark to slightly lighter)
-        for i in range(600):
-            r = int(18 + (i / 600) * 30)
-            g = int(18 + (i / 600) * 30)
-            b = int(18 + (i / 600) * 30)
-            draw.line([(0, i), (600, i)], fill=(r, g, b))
-        
-        # Load and add logo
-        if logo_path and os.path.exists(logo_path):
-            try:
-                print(f"🏷️ Loading logo: {logo_path}")
-                logo = Image.open(logo_path)
-                
-                # Convert to RGBA if not already
-                if logo.mode != 'RGBA':
-                    logo = logo.convert('RGBA')
-                
-                # Calculate optimal logo size (70% of image width)
-                logo_size = int(600 * 0.7)  # 420x420
-                
-                # Resize logo while maintaining aspect ratio
-                logo_aspect = logo.width / logo.height
-                if logo_aspect > 1:  # Wider than tall
-                    new_width = logo_size
-                    new_height = int(logo_size / logo_aspect)
-                else:  # Taller than wide or square
-                    new_height = logo_size
-                    new_width = int(logo_size * logo_aspect)
-                
-                logo = logo.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Calculate position to center the logo
-                x_position = (600 - new_width) // 2
-                y_position = (600 - new_height) // 2 - 30  # Slightly higher for text space
-                
-                # Create a subtle shadow/glow effect for the logo
-                shadow_size = 5
-                shadow = Image.new('RGBA', (new_width + shadow_size*2, new_height + shadow_size*2), (0, 0, 0, 0))
-                shadow.paste(logo, (shadow_size, shadow_size), logo if logo.mode == 'RGBA' else None)
-                shadow = shadow.filter(ImageFilter.GaussianBlur(10))
-                
-                # Paste shadow first
-                img.paste(shadow, (x_position - shadow_size, y_position - shadow_size), shadow)
-                
-                # Paste the actual logo
-                if logo.mode == 'RGBA':
-                    img.paste(logo, (x_position, y_position), logo)
-                else:
-                    img.paste(logo, (x_position, y_position))
-                
-                print(f"✅ Logo added ({new_width}x{new_height})")
-                
-            except Exception as e:
-                print(f"⚠️ Error loading logo: {e}")
-                # Fallback: Simple text-based logo
-                try:
-                    font_large = ImageFont.truetype("arial.ttf", 120)
-                except:
-                    font_large = ImageFont.load_default()
-                
-                # Draw MusicCenterUg as text
-                text = "MusicCenterUg"
-                draw.text((300, 250), text, fill='#1DB954', font=font_large, anchor="mm")
-        else:
-            print("⚠️ No logo found, creating text-based logo")
-            try:
-                font_large = ImageFont.truetype("arial.ttf", 120)
-            except:
-                font_large = ImageFont.load_default()
-            
-            # Draw MusicCenterUg as text
-            text = "MusicCenterUg"
-            draw.text((300, 250), text, fill='#1DB954', font=font_large, anchor="mm")
-        
-        # Add branding text at the bottom
-        try:
-            font_brand = ImageFont.truetype("arial.ttf", 28)
-        except:
-            font_brand = ImageFont.load_default()
-        
-        # Add "Downloaded from" text
-        draw.text((300, 520), "Downloaded from", 
-                 fill='#FFFFFF', font=font_brand, anchor="mm")
-        
-        # Add "MusicCenterUg" in green
-        draw.text((300, 550), "MusicCenterUg", 
-                 fill='#1DB954', font=font_brand, anchor="mm")
-        
-        # Add song info at the top with better styling
-        try:
-            font_title = ImageFont.truetype("arial.ttf", 26)
-            font_artist = ImageFont.truetype("arial.ttf", 22)
-        except:
-            font_title = ImageFont.load_default()
-            font_artist = ImageFont.load_default()
-        
-        # Song title (truncate if too long)
-        title = song.title
-        if len(title) > 30:
-            title = title[:27] + "..."
-        
-        # Add subtle background for title
-        title_bbox = draw.textbbox((0, 0), title, font=font_title)
-        title_width = title_bbox[2] - title_bbox[0]
-        title_height = title_bbox[3] - title_bbox[1]
-        
-        # Draw title with slight background
-        draw.rectangle([(300 - title_width//2 - 10, 30), 
-                       (300 + title_width//2 + 10, 30 + title_height + 10)], 
-                      fill='rgba(0, 0, 0, 150)')
-        draw.text((300, 40), title, 
-                 fill='white', font=font_title, anchor="mm")
-        
-        # Artist name
-        artist = song.display_artist
-        if len(artist) > 30:
-            artist = artist[:27] + "..."
-        
-        # Draw artist with slight background
-        artist_bbox = draw.textbbox((0, 0), f"by {artist}", font=font_artist)
-        artist_width = artist_bbox[2] - artist_bbox[0]
-        
-        draw.rectangle([(300 - artist_width//2 - 10, 70), 
-                       (300 + artist_width//2 + 10, 70 + title_height + 10)], 
-                      fill='rgba(29, 185, 84, 100)')
-        draw.text((300, 80), f"by {artist}", 
-                 fill='white', font=font_artist, anchor="mm")
-        
-        # Add subtle border
-        draw.rectangle([(5, 5), (595, 595)], outline='#1DB954', width=2)
-        
-        # Save the image
-        img.save(output_path, 'JPEG', quality=95, optimize=True)
-        print(f"✅ Branded cover saved to: {output_path}")
-        print(f"📏 Cover size: {os.path.getsize(output_path)} bytes")
-        print(f"🎯 Cover dimensions: {img.size}")
-        
-    except Exception as e:
-        print(f"❌ Error creating branded cover: {e}")
-        import traceback
-        traceback.print_exc()
-        
-        # Create ultra-simple fallback cover
-        try:
-            from PIL import Image, ImageDraw, ImageFont
-            img = Image.new('RGB', (600, 600), color='#121212')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font = ImageFont.truetype("arial.ttf", 40)
-            except:
-                font = ImageFont.load_default()
-            
-            draw.text((300, 250), "MusicCenterUg", 
-                     fill='#1DB954', font=font, anchor="mm")
-            draw.text((300, 300), song.title[:20], 
-                     fill='white', font=font, anchor="mm")
-            draw.text((300, 550), "Downloaded from MusicCenterUg", 
-                     fill='#1DB954', font=font, anchor="mm")
-            
-            img.save(output_path, 'JPEG', quality=90)
-            print(f"⚠️ Created fallback cover: {output_path}")
-        except:
-            print("❌ Failed to create fallback cover")
-
-def add_metadata_to_audio(audio_path, song, cover_path, logo_path):
-    """Add metadata and branding to audio file"""
-    try:
-        print(f"🎵 Adding metadata to audio: {audio_path}")
-        
-        # Ensure the audio file exists
-        if not os.path.exists(audio_path):
-            print(f"❌ Audio file not found: {audio_path}")
-            return False
-        
-        # Try using mutagen (for MP3 files)
-        try:
-            import mutagen
-            from mutagen.id3 import ID3, APIC, TIT2, TPE1, TALB, TCON, TDRC, COMM, TPE2
-            from mutagen.mp3 import MP3
-            
-            # Load audio file
-            audio = MP3(audio_path, ID3=ID3)
-            
-            # Remove existing ID3 tags to start fresh
-            try:
-                audio.delete()
-            except:
-                pass
-            
-            # Create new ID3 tags if they don't exist
-            if audio.tags is None:
-                audio.add_tags()
-            
-            # Add basic metadata
-            audio['TIT2'] = TIT2(encoding=3, text=[song.title])  # Title
-            audio['TPE1'] = TPE1(encoding=3, text=[song.artist.name])  # Artist
-            
-            # Album/Artist (use artist name if no album)
-            if hasattr(song, 'album') and song.album:
-                audio['TALB'] = TALB(encoding=3, text=[song.album.name])
-                audio['TPE2'] = TPE2(encoding=3, text=[song.artist.name])  # Album artist
-            else:
-                audio['TALB'] = TALB(encoding=3, text=[f"{song.artist.name} - Singles"])
-                audio['TPE2'] = TPE2(encoding=3, text=[song.artist.name])
-            
-            # Genre
-            audio['TCON'] = TCON(encoding=3, text=[song.genre.name])
-            
-            # Year/Date
-            if song.upload_date:
-                year = song.upload_date.strftime("%Y")
-                audio['TDRC'] = TDRC(encoding=3, text=[year])
-            
-            # Add cover art if available
-            if cover_path and os.path.exists(cover_path):
-                try:
-                    with open(cover_path, 'rb') as cover_file:
-                        cover_data = cover_file.read()
-                    
-                    audio.tags.add(
-                        APIC(
-                            encoding=3,  # UTF-8
-                            mime='image/jpeg',
-                            type=3,  # Cover (front)
-                            desc='Cover',
-                            data=cover_data
-                        )
-                    )
-                    print(f"✅ Added cover art: {cover_path}")
-                except Exception as e:
-                    print(f"⚠️ Error adding cover art: {e}")
-            else:
-                print("ℹ️ No cover art to add")
-            
-            # Add branding comment
-            comment_text = f"Downloaded from MusicCenterUgUg - Uganda's Music Hub\n{song.artist.name} - {song.title}"
-            audio['COMM'] = COMM(encoding=3, lang='eng', desc='', text=[comment_text])
-            
-            # Save metadata
-            audio.save(v2_version=3)  # Use ID3v2.3 for better compatibility
-            print(f"✅ Metadata added successfully using mutagen")
-            
-            return True
-            
-        except ImportError:
-            print("⚠️ mutagen not installed, trying eyed3")
-            # Fallback to eyed3 if mutagen fails
-            try:
-                import eyed3
-                
-                audiofile = eyed3.load(audio_path)
-                if audiofile.tag is None:
-                    audiofile.initTag()
-                
-                # Set basic metadata
-                audiofile.tag.title = song.title
-                audiofile.tag.artist = song.artist.name
-                audiofile.tag.album = f"{song.artist.name} - Singles"
-                audiofile.tag.album_artist = song.artist.name
-                audiofile.tag.genre = song.genre.name
-                
-                if song.upload_date:
-                    audiofile.tag.year = song.upload_date.year
-                
-                # Add cover art
-                if cover_path and os.path.exists(cover_path):
-                    with open(cover_path, 'rb') as img_file:
-                        audiofile.tag.images.set(3, img_file.read(), 'image/jpeg')
-                
-                # Add comment
-                audiofile.tag.comments.set("Downloaded from MusicCityUg - Uganda's Music Hub\n")
-                
-                audiofile.tag.save()
-                print(f"✅ Metadata added using eyed3")
-                return True
-                
-            except ImportError:
-                print("⚠️ eyed3 not installed, using simple metadata")
-                # If both libraries fail, at least we tried
-                return False
-            except Exception as e:
-                print(f"⚠️ Error with eyed3: {e}")
-                return False
-        
-    except Exception as e:
-        print(f"❌ Error adding metadata: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-
 # ========== CHECK PREMIUM STATUS ==========
 def check_premium_access(request, song_id):
     """Check if user can download a song"""
@@ -358,84 +68,86 @@ def check_premium_access(request, song_id):
     
     return JsonResponse({'success': False, 'error': 'Invalid method'})
 
-def home(request):
-    """Home page with featured content and news"""
-    print("🔄 Home view called")
-    
-    try:
-        # Get featured songs (most played + recently uploaded)
-        featured_songs = Song.objects.filter(
-            is_approved=True
-        ).select_related('artist', 'genre').order_by('-plays', '-upload_date')[:12]
-        print(f"🎵 Found {len(featured_songs)} featured songs")
+def _home_sections():
+    """Home page content shared by every visitor"""
+    # Get featured songs (most played + recently uploaded)
+    featured_songs = list(Song.objects.filter(
+        is_approved=True
+    ).select_related('artist', 'genre').order_by('-plays', '-upload_date')[:12])
+    print(f"🎵 Found {len(featured_songs)} featured songs")
 
-        # Most played songs (for top charts)
-        most_played = Song.objects.filter(is_approved=True).select_related('artist', 'genre').order_by('-plays')[:10]
-        print(f"🔥 Found {len(most_played)} most played songs")
+    # Most played songs (for top charts)
+    most_played = chart_items('top_songs', limit=10)
+    print(f"🔥 Found {len(most_played)} most played songs")
 
-        # Most downloaded songs (for top charts)
-        most_downloaded = Song.objects.filter(is_approved=True).select_related('artist', 'genre').order_by('-downloads')[:10]
-        print(f"📥 Found {len(most_downloaded)} most downloaded songs")
+    # Most downloaded songs (for top charts)
+    most_downloaded = chart_items('top_downloads', limit=10)
+    print(f"📥 Found {len(most_downloaded)} most downloaded songs")
 
-        # New artists
-        from artists.models import Artist
-        new_artists = Artist.objects.annotate(
-            total_songs=Count('songs', filter=Q(songs__is_approved=True)),
-            total_plays=Sum('songs__plays')
-        ).order_by('-created_at')[:8]
-        print(f"👤 Found {len(new_artists)} new artists")
+    # New artists
+    from artists.models import Artist
+    new_artists = list(Artist.objects.annotate(
+        total_songs=Count('songs', filter=Q(songs__is_approved=True)),
+        total_plays=Sum('songs__plays')
+    ).order_by('-created_at')[:8])
+    print(f"👤 Found {len(new_artists)} new artists")
 
-        # Trending artists (based on recent plays)
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        trending_artists = Artist.objects.annotate(
-            weekly_plays=Count('songs__play_history', filter=Q(songs__play_history__played_at__gte=seven_days_ago)),
-            followers_count=Count('followers')
-        ).order_by('-weekly_plays')[:8]
-        print(f"📈 Found {len(trending_artists)} trending artists")
+    # Trending artists (based on recent plays, from the chart snapshot)
+    trending_artists = chart_items('trending_artists', 'weekly', limit=8)
+    print(f"📈 Found {len(trending_artists)} trending artists")
 
-        # Get stats for the homepage
-        total_songs = Song.objects.filter(is_approved=True).count()
-        total_plays = SongPlay.objects.count()
-        total_downloads = SongDownload.objects.count()
-        total_artists = Artist.objects.count()
-        print(f"📊 Stats - Songs: {total_songs}, Plays: {total_plays}, Downloads: {total_downloads}, Artists: {total_artists}")
+    # Get stats for the homepage
+    total_songs = Song.objects.filter(is_approved=True).count()
+    total_plays = SongPlay.objects.count()
+    total_downloads = SongDownload.objects.count()
+    total_artists = Artist.objects.count()
+    print(f"📊 Stats - Songs: {total_songs}, Plays: {total_plays}, Downloads: {total_downloads}, Artists: {total_artists}")
 
-        # News data - handle cases where news app might not be available
-        featured_news = []
-        trending_news = []
+    # News data - handle cases where news app might not be available
+    featured_news = []
+    trending_news = []
+    
+    try:
+        from news.models import NewsArticle
+        featured_news = list(NewsArticle.objects.filter(
+            is_featured=True, 
+            is_published=True
+        ).order_by('-published_date')[:2])
         
-        try:
-            from news.models import NewsArticle
-            featured_news = NewsArticle.objects.filter(
-                is_featured=True, 
-                is_published=True
-            ).order_by('-published_date')[:2]
-            
-            trending_news = NewsArticle.objects.filter(
-                is_published=True
-            ).order_by('-views', '-published_date')[:6]
-            
-            print(f"📰 Found {len(featured_news)} featured news and {len(trending_news)} trending news")
-            
-        except ImportError:
-            print("ℹ️ News app not available")
-        except Exception as news_error:
-            print(f"⚠️ News data error: {news_error}")
+        trending_news = list(NewsArticle.objects.filter(
+            is_published=True
+        ).order_by('-views', '-published_date')[:6])
+        
+        print(f"📰 Found {len(featured_news)} featured news and {len(trending_news)} trending news")
+        
+    except ImportError:
+        print("ℹ️ News app not available")
+    except Exception as news_error:
+        print(f"⚠️ News data error: {news_error}")
 
-        context = {
-            'featured_songs': featured_songs,
-            'most_played': most_played,
-            'most_downloaded': most_downloaded,
-            'new_artists': new_artists,
-            'trending_artists': trending_artists,
-            'total_songs': total_songs,
-            'total_plays': total_plays,
-            'total_downloads': total_downloads,
-            'total_artists': total_artists,
-            'featured_news': featured_news,
-            'trending_news': trending_news,
-            'current_date': timezone.now(),
-        }
+    return {
+        'featured_songs': featured_songs,
+        'most_played': most_played,
+        'most_downloaded': most_downloaded,
+        'new_artists': new_artists,
+        'trending_artists': trending_artists,
+        'total_songs': total_songs,
+        'total_plays': total_plays,
+        'total_downloads': total_downloads,
+        'total_artists': total_artists,
+        'featured_news': featured_news,
+        'trending_news': trending_news,
+    }
+
+@cache_anonymous_page('music', 'artists', 'news', 'genres', 'charts')
+def home(request):
+    """Home page with featured content and news"""
+    print("🔄 Home view called")
+    
+    try:
+        # Computed once per cache lifetime, not per visitor
+        context = dict(cached(('music', 'artists', 'news', 'charts'), 'home', _home_sections))
+        context['current_date'] = timezone.now()
         
         print("✅ Home view context prepared successfully")
         return render(request, 'music/home.html', context)
@@ -461,10 +173,13 @@ def home(request):
         }
         return render(request, 'music/home.html', context)
 
+@cache_anonymous_page('music', 'artists', 'genres')
 def discover(request):
     """Discover page with all songs"""
-    songs_list = Song.objects.filter(is_approved=True).select_related('artist', 'genre').order_by('-upload_date')
-    genres = Genre.objects.all()
+    songs_list = Song.objects.filter(is_approved=True).select_related('artist', 'genre').prefetch_related(
+        'featured_artists'
+    )
+    genres = genre_registry.all()
     
     # Filtering
     genre_filter = request.GET.get('genre')
@@ -479,10 +194,9 @@ def discover(request):
             Q(genre__name__icontains=search_query)
         )
     
-    # Pagination
-    paginator = Paginator(songs_list, 20)
-    page_number = request.GET.get('page')
-    songs = paginator.get_page(page_number)
+    # Pagination (keyset: later pages cost the same as the first)
+    paginator = CursorPaginator(songs_list, ('-upload_date', '-id'), 20, estimate_total=True)
+    songs = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'songs': songs,
@@ -509,10 +223,13 @@ def song_detail(request, song_id):
         is_approved=True
     ).exclude(id=song.id).select_related('artist', 'genre').order_by('-plays')[:6]
     
-    # Get play statistics
-    play_stats = SongPlay.objects.filter(song=song).aggregate(
-        total_plays=Count('id'),
-        avg_duration=Avg('duration_played')
+    # Get play statistics (one daily stats row per day, not one row per play)
+    play_stats = song.daily_stats.aggregate(
+        total_plays=Sum('plays'),
+        seconds_played=Sum('seconds_played')
+    )
+    play_stats['avg_duration'] = (
+        play_stats['seconds_played'] / play_stats['total_plays'] if play_stats['total_plays'] else None
     )
     
     context = {
@@ -522,6 +239,31 @@ def song_detail(request, song_id):
         'play_stats': play_stats,
     }
     return render(request, 'music/song_detail.html', context)
+
+def song_waveform(request, song_id):
+    """Precomputed waveform peaks for the scrub bar (JSON, or raw bytes with ?format=bin)"""
+    waveform = SongWaveform.objects.filter(
+        song_id=song_id, song__is_approved=True
+    ).only('peaks', 'buckets', 'created_at').first()
+    if waveform is None:
+        return JsonResponse({'error': 'Waveform not ready', 'success': False}, status=404)
+    
+    etag = f'"{waveform.buckets:x}-{int(waveform.created_at.timestamp()):x}"'
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponse(status=304)
+    elif request.GET.get('format') == 'bin':
+        response = HttpResponse(bytes(waveform.peaks), content_type='application/octet-stream')
+    else:
+        response = JsonResponse({
+            'success': True,
+            'song_id': song_id,
+            'buckets': waveform.buckets,
+            'peaks': waveform.peak_list,
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
+
 def search(request):
     """Smart search that handles phrases and individual words"""
     query = request.GET.get('q', '').strip()
@@ -529,72 +271,13 @@ def search(request):
     if not query:
         return redirect('discover')
     
-    # Check if query contains common separators
-    common_separators = [' by ', ' ft ', ' featuring ', ' feat ', ' vs ', ' and ']
-    
-    # Try to split by common separators first
-    phrase_parts = [query]
-    for separator in common_separators:
-        if separator in query.lower():
-            phrase_parts = query.lower().split(separator)
-            break
-    
-    # Also split by spaces for individual words
-    all_search_terms = []
-    for part in phrase_parts:
-        all_search_terms.extend(part.strip().split())
-    
-    # Remove duplicates but preserve order
-    from collections import OrderedDict
-    search_terms = list(OrderedDict.fromkeys(all_search_terms))
-    
+    search_terms = query_terms(query)
     print(f"🔍 Search terms: {search_terms}")
     print(f"🔍 Original query: '{query}'")
     
-    # Build Q objects
-    from django.db.models import Q
-    
-    # First try exact phrase match
-    exact_phrase_q = Q(title__icontains=query) | \
-                     Q(artist__name__icontains=query) | \
-                     Q(lyrics__icontains=query)
-    
-    # Then try individual terms
-    individual_terms_q = Q()
-    for term in search_terms:
-        if len(term) > 2:  # Only search for terms longer than 2 characters
-            individual_terms_q |= Q(title__icontains=term) | \
-                                 Q(artist__name__icontains=term) | \
-                                 Q(genre__name__icontains=term) | \
-                                 Q(lyrics__icontains=term) | \
-                                 Q(featured_artists__name__icontains=term)
-    
-    # Combine both (exact phrase gets priority)
-    final_q = exact_phrase_q | individual_terms_q
-    
-    # Apply filter
-    songs = Song.objects.filter(
-        final_q,
-        is_approved=True
-    ).select_related('artist', 'genre').prefetch_related('featured_artists').distinct().order_by('-plays')[:50]
-    
-    # Get related artists
-    from artists.models import Artist
-    
-    artist_q = Q()
-    for term in search_terms:
-        if len(term) > 2:
-            artist_q |= Q(name__icontains=term) | Q(bio__icontains=term)
-    
-    related_artists = Artist.objects.filter(artist_q).distinct()[:10]
-    
-    # Get related genres
-    genre_q = Q()
-    for term in search_terms:
-        if len(term) > 2:
-            genre_q |= Q(name__icontains=term) | Q(description__icontains=term)
-    
-    related_genres = Genre.objects.filter(genre_q).distinct()[:8]
+    # Ranked full-text + fuzzy matches, served from the result cache when warm
+    songs, related_artists, related_genres = cached_search(query, fuzzy=request.GET.get('mode') == 'fuzzy')
+    songs = mark_liked(request, songs)
     
     context = {
         'songs': songs,
@@ -606,13 +289,125 @@ def search(request):
     }
     
     return render(request, 'music/search.html', context)
+
+def api_suggest(request):
+    """Search-as-you-type suggestions (songs, artists, genres) from the in-memory prefix index"""
+    query = request.GET.get('q', '').strip()[:100]
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    
+    response = JsonResponse({
+        'success': True,
+        'query': query,
+        'suggestions': suggest_index.suggest(query, limit=limit) if query else [],
+    })
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+# ========== LIST APIS ==========
+# Song listings for apps and infinite scroll, a keyset page at a time:
+# ?cursor= takes the next_cursor/previous_cursor of the previous response
+SONG_LIST_ORDERINGS = {
+    'latest': ('-upload_date', '-id'),
+    'popular': ('-plays', '-id'),
+}
+
+def _song_json(song):
+    return {
+        'id': song.id,
+        'title': song.title,
+        'artist': song.artist.name,
+        'artist_id': song.artist_id,
+        'genre': song.genre.name if song.genre else None,
+        'cover': song.cover_image.url if song.cover_image else '/static/images/default-cover.jpg',
+        'plays': song.plays,
+        'downloads': song.downloads,
+        'upload_date': song.upload_date.isoformat(),
+        'url': song.get_absolute_url(),
+    }
+
+def _list_limit(request, default=20):
+    try:
+        return min(max(int(request.GET.get('limit', default)), 1), 100)
+    except ValueError:
+        return default
+
+def _page_response(page, items):
+    response = JsonResponse({
+        'success': True,
+        'results': items,
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+        'estimated_total': page.estimated_total,
+    })
+    response['Cache-Control'] = 'public, max-age=60'
+    return response
+
+def api_songs(request):
+    """Approved songs, newest (?sort=latest) or most played (?sort=popular) first, optionally of one ?genre="""
+    ordering = SONG_LIST_ORDERINGS.get(request.GET.get('sort', 'latest'))
+    if ordering is None:
+        return JsonResponse({'success': False, 'error': 'Unknown sort'}, status=400)
+    
+    songs = Song.objects.filter(is_approved=True).select_related('artist', 'genre')
+    if request.GET.get('genre'):
+        genre = genre_registry.get(request.GET['genre'])
+        if genre is None:
+            return JsonResponse({'success': False, 'error': 'Genre not found'}, status=404)
+        songs = songs.filter(genre=genre)
+    
+    # ?total=1 adds an estimated count (a planner estimate on PostgreSQL)
+    paginator = CursorPaginator(songs, ordering, _list_limit(request), estimate_total=request.GET.get('total') == '1')
+    page = paginator.get_page(request.GET.get('cursor'))
+    return _page_response(page, [_song_json(song) for song in page])
+
+def api_chart(request, chart):
+    """A chart from its newest snapshot (?time=weekly|monthly, ?genre= for per-genre charts)"""
+    if chart not in CHART_MATRIX:
+        return JsonResponse({'success': False, 'error': 'Unknown chart'}, status=404)
+    windows, per_genre = CHART_MATRIX[chart]
+    window = chart_window(request.GET.get('time', windows[0]))
+    if window not in windows:
+        return JsonResponse({'success': False, 'error': 'Unknown time window'}, status=400)
+    
+    genre = None
+    if request.GET.get('genre'):
+        if not per_genre:
+            return JsonResponse({'success': False, 'error': 'Chart has no genre breakdown'}, status=400)
+        genre = genre_registry.get(request.GET['genre'])
+        if genre is None:
+            return JsonResponse({'success': False, 'error': 'Genre not found'}, status=404)
+    
+    page = chart_page(chart, window, genre, cursor=request.GET.get('cursor'), per_page=_list_limit(request))
+    if chart in ARTIST_CHARTS:
+        items = [{
+            'id': artist.id,
+            'name': artist.name,
+            'url': reverse('artist_detail', args=[artist.id]),
+        } for artist in page]
+    else:
+        items = [_song_json(song) for song in page]
+    for item, obj in zip(items, page):
+        item['position'] = obj.chart_position
+        item['score'] = obj.chart_score
+    return _page_response(page, items)
+
+# ========== CATALOG API ==========
+@require_safe
+def api_catalog(request, resource, obj_id=None):
+    """Read-only songs/artists/genres/playlists with ?fields=, ?ids= and ETags (music/catalog.py)"""
+    return catalog_response(request, resource, obj_id)
+
+@cache_anonymous_page('music', 'genres')
 def genres(request):
     """All genres page"""
-    genres = Genre.objects.annotate(
+    genres = cached(('music', 'genres'), 'genre_totals', lambda: list(Genre.objects.annotate(
         song_count=Count('songs', filter=Q(songs__is_approved=True)),
         total_plays=Sum('songs__plays'),
         total_downloads=Sum('songs__downloads')
-    ).filter(song_count__gt=0).order_by('name')
+    ).filter(song_count__gt=0).order_by('name')))
     
     context = {
         'genres': genres,
@@ -621,22 +416,28 @@ def genres(request):
 
 def genre_songs(request, genre_id):
     """Songs by specific genre"""
-    genre = get_object_or_404(Genre, id=genre_id)
+    genre = genre_registry.get(genre_id)
+    if genre is None:
+        raise Http404("Genre not found")
     songs = Song.objects.filter(
         genre=genre, 
         is_approved=True
-    ).select_related('artist', 'genre').order_by('-upload_date')
+    ).select_related('artist', 'genre').prefetch_related('featured_artists')
     
-    # Get genre statistics
-    genre_stats = songs.aggregate(
+    # Get genre statistics (shared by every page of the genre)
+    genre_stats = cached(('music',), 'genre_stats', lambda: songs.aggregate(
         total_songs=Count('id'),
         total_plays=Sum('plays'),
         total_downloads=Sum('downloads')
-    )
+    ), genre.id)
+    
+    # One page at a time, keyset on upload date
+    page = CursorPaginator(songs, ('-upload_date', '-id'), 20).get_page(request.GET.get('cursor'))
+    mark_liked(request, page)
     
     context = {
         'genre': genre,
-        'songs': songs,
+        'songs': page,
         'genre_stats': genre_stats,
     }
     return render(request, 'music/genre_songs.html', context)
@@ -657,59 +458,47 @@ def play_song(request, song_id):
                 'error': 'Premium content requires subscription',
                 'can_preview': song.preview_duration > 0,
                 'preview_duration': song.preview_duration,
+                'preview_url': reverse('preview_song', args=[song.id]) if song.preview_duration > 0 else None,
                 'success': False
             }, status=403)
         
-        # Use atomic update to prevent race conditions
-        with transaction.atomic():
-            # Increment play count atomically
-            song = Song.objects.filter(id=song_id).select_for_update().first()
-            if not song:
-                return JsonResponse({'error': 'Song not found', 'success': False}, status=404)
-            
-            current_plays = song.plays
-            song.plays = F('plays') + 1
-            song.save()
-            
-            # Refresh to get updated count
-            song.refresh_from_db()
-            
-            print(f"📈 Plays incremented atomically: {current_plays} → {song.plays}")
-            
-        # Record play in SongPlay model
-        try:
-            # For authenticated users, store user info
-            if request.user.is_authenticated:
-                audio_quality = 'high' if hasattr(request.user, 'userprofile') and request.user.userprofile.is_premium else 'standard'
-                user = request.user
-            else:
-                # For anonymous users
-                audio_quality = 'standard'
-                user = None
-            
-            SongPlay.objects.create(
-                song=song,
-                user=user,
-                ip_address=get_client_ip(request),
-                duration_played=0,
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                audio_quality=audio_quality,
-            )
-            print("📝 SongPlay record created successfully")
-        except Exception as e:
-            print(f"⚠️ Error creating SongPlay record: {e}")
-            # Don't fail the entire request if recording fails
+        # Pick the rendition for the listener's plan and declared network
+        rendition = choose_rendition(request, song)
+        if rendition:
+            audio_quality = rendition.audio_quality
+        elif request.user.is_authenticated:
+            audio_quality = 'high' if hasattr(request.user, 'userprofile') and request.user.userprofile.is_premium else 'standard'
+        else:
+            audio_quality = 'standard'
+        user_id = request.user.id if request.user.is_authenticated else None
         
-        print(f"🎯 Final confirmed plays count: {song.plays}")
+        audio_url = reverse('stream_song', args=[song.id])
+        if rendition:
+            audio_url += f'?kbps={rendition.bitrate}'
+        
+        # Queue the play; the buffer flusher writes the SongPlay row and
+        # the aggregated plays increment outside the request
+        play_buffer.record(
+            song.id,
+            user_id=user_id,
+            ip_address=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+            audio_quality=audio_quality,
+        )
+        plays = song.live_plays + play_buffer.pending_plays(song.id)
+        
+        print(f"🎯 Play queued, plays count: {plays}")
         
         return JsonResponse({
             'id': song.id,
             'title': song.title,
             'artist': song.artist.name,
             'cover': song.cover_image.url if song.cover_image else '/static/images/default-cover.jpg',
-            'audio': song.audio_file.url,
+            'audio': audio_url,
+            'bitrate': rendition.bitrate if rendition else None,
+            'hls_url': reverse('hls_master', args=[song.id]) if song.hls_manifest else None,
             'duration': song.duration,
-            'plays': song.plays,
+            'plays': plays,
             'is_premium': song.is_premium_only,
             'success': True,
             'message': 'Play counted successfully'
@@ -724,6 +513,154 @@ def play_song(request, song_id):
             'success': False
         }, status=500)
 
+# ========== AUDIO STREAMING ==========
+def stream_song(request, song_id):
+    """Stream a song's audio with HTTP Range (seek) and conditional request support"""
+    song = get_object_or_404(Song, id=song_id)
+    
+    # Unapproved uploads are only streamable by their artist and staff
+    if not song.is_approved and not request.user.is_staff and not (
+        request.user.is_authenticated and song.artist.user_id == request.user.id
+    ):
+        return JsonResponse({'error': 'Song not found', 'success': False}, status=404)
+    
+    if not song.can_be_accessed_by(request.user):
+        return JsonResponse({
+            'error': 'Premium content requires subscription',
+            'can_preview': song.preview_duration > 0,
+            'preview_duration': song.preview_duration,
+            'preview_url': reverse('preview_song', args=[song.id]) if song.preview_duration > 0 else None,
+            'success': False
+        }, status=403)
+    
+    # ?kbps= (set by play_song from plan and network) picks the rendition; only
+    # the plan caps it here, so a changing network hint can't switch files
+    # between the Range requests of one playback
+    try:
+        requested = int(request.GET.get('kbps', '')) or None
+    except ValueError:
+        requested = None
+    rendition = choose_rendition(request, song, requested)
+    
+    try:
+        audio_path = rendition.audio_file.path if rendition else song.audio_file.path
+    except (ValueError, NotImplementedError):
+        return JsonResponse({'error': 'Audio file not found', 'success': False}, status=404)
+    if not os.path.exists(audio_path):
+        return JsonResponse({'error': 'Audio file not found', 'success': False}, status=404)
+    
+    # Premium and unreleased audio must not be stored by shared caches
+    if not song.is_approved or song.is_premium_only:
+        cache_control = 'private, max-age=3600'
+    else:
+        cache_control = 'public, max-age=86400'
+    response = ranged_file_response(request, audio_path, cache_control=cache_control)
+    response['Vary'] = 'Cookie' if requested else 'Cookie, Save-Data, ECT'
+    return response
+
+def preview_song(request, song_id):
+    """Serve the pre-cut preview clip of a premium song (open to everyone)"""
+    song = get_object_or_404(Song, id=song_id, is_approved=True)
+    
+    if not song.is_premium_only or song.preview_duration <= 0:
+        return JsonResponse({'error': 'No preview available', 'success': False}, status=404)
+    
+    # Clips are normally cut at upload/approval; cut it now if that step was missed
+    if needs_preview(song):
+        try:
+            build_preview(song)
+        except Exception as e:
+            print(f"❌ Error building preview for {song.title}: {e}")
+    
+    preview_path = os.path.join(settings.MEDIA_ROOT, song.preview_file.name) if song.preview_file else None
+    if not preview_path or not os.path.exists(preview_path):
+        return JsonResponse({'error': 'Preview not available', 'success': False}, status=404)
+    
+    # The clip is the same for every listener, so shared caches may keep it
+    return ranged_file_response(request, preview_path, cache_control='public, max-age=604800')
+
+# ========== HLS PLAYLISTS ==========
+def _hls_song_or_error(request, song_id):
+    """The song if its HLS package may be served to this user, else an error response"""
+    song = get_object_or_404(Song, id=song_id, is_approved=True)
+    # A package of a replaced upload would play the old audio
+    if not is_current_package(song):
+        return None, JsonResponse({'error': 'Stream not packaged', 'success': False}, status=404)
+    if not song.can_be_accessed_by(request.user):
+        return None, JsonResponse({
+            'error': 'Premium content requires subscription',
+            'can_preview': song.preview_duration > 0,
+            'preview_duration': song.preview_duration,
+            'preview_url': reverse('preview_song', args=[song.id]) if song.preview_duration > 0 else None,
+            'success': False
+        }, status=403)
+    return song, None
+
+def _playlist_response(body):
+    response = HttpResponse(body, content_type='application/vnd.apple.mpegurl')
+    # Playlists carry the access decision, so only the listener's browser may keep them
+    response['Cache-Control'] = 'private, max-age=300'
+    response['Vary'] = 'Cookie, Save-Data, ECT'
+    return response
+
+def hls_master(request, song_id):
+    """HLS master playlist limited to the variants the listener's plan and network allow"""
+    song, error = _hls_song_or_error(request, song_id)
+    if error:
+        return error
+    
+    body = master_playlist(
+        song,
+        lambda bitrate: reverse('hls_variant', args=[song.id, bitrate]),
+        max_bitrate=max_bitrate_for(request),
+    )
+    return _playlist_response(body)
+
+def _hls_variant_or_error(request, song_id, bitrate):
+    """The song if this variant of it may be served to this user, else an error response"""
+    song, error = _hls_song_or_error(request, song_id)
+    if error:
+        return None, error
+    
+    max_bitrate = max_bitrate_for(request)
+    bitrates = package_bitrates(song)
+    if bitrate not in bitrates or (max_bitrate and bitrate > max_bitrate and bitrate != min(bitrates)):
+        return None, JsonResponse({'error': 'Variant not available', 'success': False}, status=404)
+    return song, None
+
+def hls_variant(request, song_id, bitrate):
+    """HLS media playlist for one bitrate; segments go through hls_segment"""
+    song, error = _hls_variant_or_error(request, song_id, bitrate)
+    if error:
+        return error
+    
+    body = variant_playlist(song, bitrate, lambda segment: reverse('hls_segment', args=[song.id, bitrate, segment]))
+    return _playlist_response(body)
+
+def hls_segment(request, song_id, bitrate, segment):
+    """One HLS segment, with the same access and bitrate checks as its playlist"""
+    song, error = _hls_variant_or_error(request, song_id, bitrate)
+    if error:
+        return error
+    
+    path = segment_path(song, bitrate, segment)
+    if not path:
+        return JsonResponse({'error': 'Segment not found', 'success': False}, status=404)
+    
+    # Shared caches may only keep what every listener may fetch
+    free_max = getattr(settings, 'AUDIO_FREE_MAX_BITRATE', 128)
+    if song.is_premium_only or bitrate > free_max:
+        cache_control = 'private, max-age=86400'
+    else:
+        cache_control = 'public, max-age=86400'
+    response = ranged_file_response(
+        request, path, content_type='video/mp2t', cache_control=cache_control,
+        sendfile_root=hls_root(), sendfile_url=getattr(settings, 'HLS_INTERNAL_URL', None),
+    )
+    if cache_control.startswith('private'):
+        response['Vary'] = 'Cookie'
+    return response
+
 # ========== DIRECT PLAYS ENDPOINT ==========
 def increment_plays_direct(request, song_id):
     """Direct endpoint to increment plays (useful for testing)"""
@@ -732,20 +669,17 @@ def increment_plays_direct(request, song_id):
             song = get_object_or_404(Song, id=song_id)
             
             # Get current plays
-            current_plays = song.plays
+            current_plays = song.live_plays + play_buffer.pending_plays(song.id)
             
-            # Increment using atomic transaction
-            with transaction.atomic():
-                song.plays = F('plays') + 1
-                song.save()
-                song.refresh_from_db()
+            # Increment on a counter shard instead of the Song row
+            SongPlayCounter.increment(song.id)
             
             return JsonResponse({
                 'success': True,
                 'song_id': song_id,
                 'title': song.title,
                 'previous_plays': current_plays,
-                'new_plays': song.plays,
+                'new_plays': current_plays + 1,
                 'incremented_by': 1
             })
         except Exception as e:
@@ -774,36 +708,23 @@ def track_play(request, song_id):
                 }, status=403)
             
             # Get current plays before increment
-            current_plays = song.plays
+            current_plays = song.live_plays + play_buffer.pending_plays(song.id)
             
-            # Use atomic update
-            with transaction.atomic():
-                # Use F() expression for atomic increment
-                Song.objects.filter(id=song_id).update(plays=F('plays') + 1)
-                song.refresh_from_db()
-                print(f"✅ Database update successful: {current_plays} → {song.plays}")
-            
-            # Record play in SongPlay model (optional)
-            try:
-                SongPlay.objects.create(
-                    song=song,
-                    user=request.user if request.user.is_authenticated else None,
-                    ip_address=get_client_ip(request),
-                    duration_played=0,
-                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                    audio_quality='standard',
-                )
-                print("📝 SongPlay record created")
-            except Exception as e:
-                print(f"⚠️ Error creating SongPlay record: {e}")
-                # Don't fail the entire request
+            # Queue the play for the buffer flusher
+            play_buffer.record(
+                song.id,
+                user_id=request.user.id if request.user.is_authenticated else None,
+                ip_address=get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                audio_quality='standard',
+            )
             
             return JsonResponse({
                 'success': True,
                 'song_id': song_id,
                 'title': song.title,
                 'previous_plays': current_plays,
-                'new_plays': song.plays,
+                'new_plays': current_plays + 1,
                 'message': 'Play tracked successfully'
             })
             
@@ -832,80 +753,28 @@ def download_song(request, song_id):
         return redirect('song_detail', song_id=song_id)
     
     try:
-        # Create temporary file for the branded audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
-            temp_audio_path = temp_audio.name
-        
-        # Copy original audio to temp location
-        print(f"📁 Copying audio from: {song.audio_file.path}")
-        shutil.copy2(song.audio_file.path, temp_audio_path)
-        print(f"✅ Copied audio to temp file: {temp_audio_path}")
-        
-        # Prepare branding
-        cover_path = None
-        logo_path = None
-        
-        # Try to find Sangabiz logo (check multiple locations)
-        possible_logo_paths = [
-            # First priority: logo.jpeg in various locations
-            os.path.join(settings.STATIC_ROOT, 'images', 'logo.jpeg'),
-            os.path.join(settings.MEDIA_ROOT, 'logos', 'logo.jpeg'),
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'logo.jpeg'),
-            # Fallback: other image formats
-            os.path.join(settings.STATIC_ROOT, 'images', 'logo.png'),
-            os.path.join(settings.STATIC_ROOT, 'images', 'logo.jpg'),
-            os.path.join(settings.MEDIA_ROOT, 'logos', 'logo.png'),
-            os.path.join(settings.MEDIA_ROOT, 'logos', 'logo.jpg'),
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'logo.png'),
-            os.path.join(settings.BASE_DIR, 'static', 'images', 'logo.jpg'),
-        ]
-        
-        for possible_path in possible_logo_paths:
-            if os.path.exists(possible_path):
-                logo_path = possible_path
-                print(f"✅ Found logo: {logo_path}")
-                break
-        
-        if not logo_path:
-            print("ℹ️ No logo found, will create text-only branding")
-        
-        # Create branded cover (logo replaces song cover)
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_cover:
-                cover_path = temp_cover.name
-            
-            create_branded_cover(song, logo_path, cover_path)
-            
-            if os.path.exists(cover_path) and os.path.getsize(cover_path) > 0:
-                print(f"✅ Created logo-only cover: {cover_path} ({os.path.getsize(cover_path)} bytes)")
-            else:
-                print("⚠️ Cover creation failed or empty file")
-                cover_path = None
-        except Exception as e:
-            print(f"⚠️ Error creating branded cover: {e}")
-            cover_path = None
-        
-        # Add metadata to audio
-        metadata_success = False
-        try:
-            if cover_path and os.path.exists(cover_path):
-                metadata_success = add_metadata_to_audio(temp_audio_path, song, cover_path, logo_path)
-            else:
-                print("ℹ️ No cover, trying metadata without cover")
-                metadata_success = add_metadata_to_audio(temp_audio_path, song, None, logo_path)
-        except Exception as e:
-            print(f"⚠️ Error adding metadata: {e}")
+        audio_path = song.audio_file.path
+        splice = (
+            getattr(settings, 'BRANDED_DOWNLOAD_MODE', 'splice') == 'splice'
+            and audio_path.lower().endswith('.mp3')
+        )
         
-        if not metadata_success:
-            print("ℹ️ Metadata addition failed, but audio will still download")
+        if splice:
+            # Prebuilt branded tag + the original audio frames, no file copy
+            tag_bytes = get_branded_tag(song)
+            audio_start, audio_end = audio_payload_range(audio_path)
+            file_size = len(tag_bytes) + (audio_end - audio_start)
+        else:
+            # Branded copy is built once per song version and reused
+            artifact_path = get_branded_download(song)
+            file_size = os.path.getsize(artifact_path)
         
         # Update download count
-        with transaction.atomic():
-            song.refresh_from_db()
-            song.downloads = F('downloads') + 1
-            song.save()
-            song.refresh_from_db()
-            print(f"📈 Downloads incremented to: {song.downloads}")
+        Song.objects.filter(id=song.id).update(downloads=F('downloads') + 1)
+        if song.is_approved:
+            from artists.models import ArtistStats
+            ArtistStats.increment(song.artist_id, total_downloads=1)
+        print(f"📈 Downloads incremented for: {song.title}")
         
         # Record download
         try:
@@ -913,7 +782,8 @@ def download_song(request, song_id):
                 song=song,
                 user=request.user if request.user.is_authenticated else None,
                 ip_address=get_client_ip(request),
-                file_size=os.path.getsize(temp_audio_path),
+                agent_id=user_agent_ids.id_for(request.META.get('HTTP_USER_AGENT', '')),
+                file_size=file_size,
                 audio_quality=song.audio_quality,
             )
             print("📝 SongDownload record created")
@@ -931,25 +801,20 @@ def download_song(request, song_id):
         
         filename = f"{safe_title} - {safe_artist} - MusicCenterUg.mp3"
         
-        # Serve the file
-        response = FileResponse(
-            open(temp_audio_path, 'rb'),
-            content_type='audio/mpeg'
-        )
+        if splice:
+            response = StreamingHttpResponse(
+                iter_spliced_download(tag_bytes, audio_path, audio_start, audio_end),
+                content_type='audio/mpeg'
+            )
+            response['Content-Length'] = file_size
+        else:
+            # Serve the cached file directly
+            response = FileResponse(
+                open(artifact_path, 'rb'),
+                content_type='audio/mpeg'
+            )
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         
-        # Cleanup function
-        def cleanup():
-            try:
-                if os.path.exists(temp_audio_path):
-                    os.unlink(temp_audio_path)
-                if cover_path and os.path.exists(cover_path):
-                    os.unlink(cover_path)
-            except Exception as cleanup_error:
-                print(f"Cleanup error: {cleanup_error}")
-        
-        response.closed = cleanup
-        
         print(f"✅ Download successful for: {song.title}")
         return response
         
@@ -966,20 +831,12 @@ def download_song(request, song_id):
 
 def top_songs(request):
     """Top songs page with various rankings"""
-    # Most played songs
-    most_played = Song.objects.filter(is_approved=True).select_related('artist', 'genre').order_by('-plays')[:20]
-    
-    # Most downloaded songs
-    most_downloaded = Song.objects.filter(is_approved=True).select_related('artist', 'genre').order_by('-downloads')[:20]
+    # Rankings come from the chart snapshots (manage.py build_charts)
+    most_played = chart_items('top_songs', limit=20)
+    most_downloaded = chart_items('top_downloads', limit=20)
     
     # Trending songs (last 7 days)
-    seven_days_ago = timezone.now() - timedelta(days=7)
-    trending = Song.objects.filter(
-        is_approved=True,
-        play_history__played_at__gte=seven_days_ago
-    ).annotate(
-        recent_plays=Count('play_history')
-    ).select_related('artist', 'genre').order_by('-recent_plays')[:20]
+    trending = chart_items('trending_songs', 'weekly', limit=20)
     
     context = {
         'most_played': most_played,
@@ -1001,25 +858,18 @@ def track_anonymous_play(request, song_id):
                     'error': 'Premium content requires subscription'
                 }, status=403)
             
-            # Increment play count using atomic update
-            with transaction.atomic():
-                song.plays = F('plays') + 1
-                song.save()
-                song.refresh_from_db()
-            
-            # Record anonymous play
-            SongPlay.objects.create(
-                song=song,
-                user=None,
+            # Queue the anonymous play for the buffer flusher
+            play_buffer.record(
+                song.id,
+                user_id=None,
                 ip_address=get_client_ip(request),
-                duration_played=0,
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 audio_quality='standard',
             )
             
             return JsonResponse({
                 'success': True,
-                'plays': song.plays,
+                'plays': song.live_plays + play_buffer.pending_plays(song.id),
                 'message': 'Play counted'
             })
             
@@ -1040,7 +890,7 @@ def get_song_plays(request, song_id):
             return JsonResponse({
                 'success': True,
                 'song_id': song_id,
-                'plays': song.plays,
+                'plays': song.live_plays + play_buffer.pending_plays(song.id),
                 'title': song.title
             })
         except Exception as e:
@@ -1061,9 +911,10 @@ def bulk_update_plays(request):
             songs = Song.objects.all()
             for song in songs:
                 actual_plays = SongPlay.objects.filter(song=song).count()
-                if song.plays != actual_plays:
+                if song.live_plays != actual_plays:
                     song.plays = actual_plays
                     song.save()
+                    song.play_counters.update(count=0)
                     updated_songs.append({
                         'id': song.id,
                         'title': song.title,
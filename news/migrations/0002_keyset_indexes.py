@@ -0,0 +1,21 @@
+# Generated by Django 4.2.26 on 2026-10-17 23:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='newsarticle',
+            index=models.Index(fields=['is_published', '-published_date', '-id'], name='news_newsar_is_publ_b9f775_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsarticle',
+            index=models.Index(fields=['is_published', '-views', '-id'], name='news_newsar_is_publ_c5c663_idx'),
+        ),
+    ]
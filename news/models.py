@@ -32,6 +32,11 @@ class NewsArticle(models.Model):
     
     class Meta:
         ordering = ['-published_date']
+        indexes = [
+            # Keyset pagination of the news page, latest and popular
+            models.Index(fields=['is_published', '-published_date', '-id']),
+            models.Index(fields=['is_published', '-views', '-id']),
+        ]
     
     def __str__(self):
         return self.title
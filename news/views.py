@@ -1,12 +1,16 @@
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.http import Http404
 from django.utils import timezone
+from django.db.models import F
 from datetime import timedelta
 from .models import NewsArticle
-from music.models import Song, Genre
-from artists.models import Artist
+from music.caching import cache_anonymous_page, cached
+from music.charts import chart_items, chart_page, chart_window
+from music.genres import genre_registry
+from music.models import Song
+from music.pagination import CursorPaginator
 
+@cache_anonymous_page('news')
 def news_view(request):
     """Main news page"""
     # Get filter parameters
@@ -21,35 +25,35 @@ def news_view(request):
     
     # Sort articles
     if sort_by == 'popular':
-        articles = articles.order_by('-views')
+        ordering = ('-views', '-id')
     else:  # latest
-        articles = articles.order_by('-published_date')
+        ordering = ('-published_date', '-id')
     
-    # Pagination
-    paginator = Paginator(articles, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (keyset: later pages cost the same as the first)
+    page_obj = CursorPaginator(articles, ordering, 12).get_page(request.GET.get('cursor'))
     
     # Get categories for filter
-    categories = NewsArticle.objects.values_list('category', flat=True).distinct()
+    categories = cached(('news',), 'categories', lambda: list(
+        NewsArticle.objects.values_list('category', flat=True).distinct()
+    ))
     
     context = {
         'articles': page_obj,
         'categories': categories,
         'current_category': category,
         'current_sort': sort_by,
-        'featured_articles': NewsArticle.objects.filter(is_featured=True, is_published=True)[:3]
+        'featured_articles': cached(('news',), 'featured_articles', lambda: list(
+            NewsArticle.objects.filter(is_featured=True, is_published=True)[:3]
+        ))
     }
     return render(request, 'news/news.html', context)
 
 def news_category_view(request, category):
     """News by category"""
-    articles = NewsArticle.objects.filter(category=category, is_published=True).order_by('-published_date')
+    articles = NewsArticle.objects.filter(category=category, is_published=True)
     categories = NewsArticle.objects.values_list('category', flat=True).distinct()
     
-    paginator = Paginator(articles, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = CursorPaginator(articles, ('-published_date', '-id'), 12).get_page(request.GET.get('cursor'))
     
     context = {
         'articles': page_obj,
@@ -64,9 +68,9 @@ def news_detail_view(request, news_id):
     """News article detail"""
     article = get_object_or_404(NewsArticle, id=news_id, is_published=True)
     
-    # Increment view count
+    # Increment view count (a counter update, so cached news pages aren't invalidated per view)
+    NewsArticle.objects.filter(id=article.id).update(views=F('views') + 1)
     article.views += 1
-    article.save()
     
     # Get related articles
     related_articles = NewsArticle.objects.filter(
@@ -80,6 +84,7 @@ def news_detail_view(request, news_id):
     }
     return render(request, 'news/news_detail.html', context)
 
+@cache_anonymous_page('charts', 'music', 'artists', 'news', 'genres')
 def charts(request):
     """Main charts page showing various music charts"""
     
@@ -87,43 +92,30 @@ def charts(request):
     time_filter = request.GET.get('time', 'weekly')
     genre_filter = request.GET.get('genre', 'all')
     
-    # Base queryset for trending songs
-    trending_songs = Song.objects.filter(is_approved=True)
+    # Get genres for filter
+    genres = genre_registry.all()
     
-    # Apply time filter
-    if time_filter == 'weekly':
-        start_date = timezone.now() - timedelta(days=7)
-        trending_songs = trending_songs.filter(upload_date__gte=start_date)
-    elif time_filter == 'monthly':
-        start_date = timezone.now() - timedelta(days=30)
-        trending_songs = trending_songs.filter(upload_date__gte=start_date)
+    # Top songs and artists come from the chart snapshots (manage.py build_charts)
+    window = chart_window(time_filter)
+    if genre_filter == 'all':
+        genre = None
+    else:
+        genre = next((g for g in genres if g.name == genre_filter), None)
     
-    # Apply genre filter
-    if genre_filter != 'all':
-        trending_songs = trending_songs.filter(genre__name=genre_filter)
-    
-    # Get top songs by plays
-    top_songs = trending_songs.order_by('-plays')[:20]
-    
-    # Get top artists - SAFE VERSION
-    top_artists = Artist.objects.filter(
-        songs__in=trending_songs
-    ).annotate(
-        total_plays=Count('songs__plays'),
-        song_count=Count('songs')
-    ).filter(
-        id__isnull=False,
-        song_count__gt=0
-    ).distinct().order_by('-total_plays')[:10]
+    def chart_lists():
+        if genre_filter != 'all' and genre is None:
+            return [], []
+        return chart_items('top_songs', window, genre, limit=20), chart_items('top_artists', window, genre, limit=10)
+    
+    top_songs, top_artists = cached(
+        ('charts', 'music', 'artists'), 'chart_lists', chart_lists, window, genre.id if genre else 'all'
+    )
     
     # Get trending news related to charts
-    chart_news = NewsArticle.objects.filter(
+    chart_news = cached(('news',), 'chart_news', lambda: list(NewsArticle.objects.filter(
         category='charts',
         is_published=True
-    ).order_by('-published_date')[:5]
-    
-    # Get genres for filter
-    genres = Genre.objects.all()
+    ).order_by('-published_date')[:5]))
     
     context = {
         'top_songs': top_songs,
@@ -142,29 +134,17 @@ def top_songs(request):
     """Detailed top songs chart"""
     time_filter = request.GET.get('time', 'weekly')
     genre_filter = request.GET.get('genre', 'all')
-    page = request.GET.get('page', 1)
-    
-    songs = Song.objects.filter(is_approved=True)
-    
-    # Apply filters
-    if time_filter == 'weekly':
-        start_date = timezone.now() - timedelta(days=7)
-        songs = songs.filter(upload_date__gte=start_date)
-    elif time_filter == 'monthly':
-        start_date = timezone.now() - timedelta(days=30)
-        songs = songs.filter(upload_date__gte=start_date)
-    
-    if genre_filter != 'all':
-        songs = songs.filter(genre__name=genre_filter)
-    
-    # Order by popularity metrics
-    songs = songs.order_by('-plays', '-downloads')
+    cursor = request.GET.get('cursor')
     
-    # Pagination
-    paginator = Paginator(songs, 20)
-    songs_page = paginator.get_page(page)
+    genres = genre_registry.all()
     
-    genres = Genre.objects.all()
+    # Ranked by plays, then downloads, in the chart snapshot; one page of it
+    window = chart_window(time_filter)
+    if genre_filter == 'all':
+        songs_page = chart_page('top_songs', window, cursor=cursor)
+    else:
+        genre = next((g for g in genres if g.name == genre_filter), None)
+        songs_page = chart_page('top_songs', window, genre, cursor=cursor) if genre else []
     
     context = {
         'songs': songs_page,
@@ -180,33 +160,10 @@ def top_songs(request):
 def top_artists(request):
     """Detailed top artists chart"""
     time_filter = request.GET.get('time', 'weekly')
-    page = request.GET.get('page', 1)
-    
-    # Get artists with their song statistics - FIXED: Ensure valid data
-    artists = Artist.objects.filter(
-        id__isnull=False  # Ensure artist has an ID
-    ).annotate(
-        total_plays=Count('songs__plays'),
-        total_downloads=Count('songs__downloads'),
-        song_count=Count('songs')
-    ).filter(
-        song_count__gt=0,  # Only artists with songs
-        total_plays__gt=0  # Only artists with plays
-    )
-    
-    # Apply time filter to songs
-    if time_filter == 'weekly':
-        start_date = timezone.now() - timedelta(days=7)
-        artists = artists.filter(songs__upload_date__gte=start_date)
-    elif time_filter == 'monthly':
-        start_date = timezone.now() - timedelta(days=30)
-        artists = artists.filter(songs__upload_date__gte=start_date)
-    
-    artists = artists.order_by('-total_plays', '-total_downloads')[:50]
     
-    # Pagination
-    paginator = Paginator(artists, 20)
-    artists_page = paginator.get_page(page)
+    # Artists with plays on songs released in the window, with total_plays,
+    # total_downloads and song_count, from the chart snapshot
+    artists_page = chart_page('top_artists', chart_window(time_filter), cursor=request.GET.get('cursor'))
     
     context = {
         'artists': artists_page,
@@ -220,7 +177,6 @@ def new_releases(request):
     """New releases chart"""
     time_filter = request.GET.get('time', 'weekly')  # weekly, monthly
     genre_filter = request.GET.get('genre', 'all')
-    page = request.GET.get('page', 1)
     
     # Determine date range
     if time_filter == 'weekly':
@@ -236,13 +192,12 @@ def new_releases(request):
     if genre_filter != 'all':
         new_songs = new_songs.filter(genre__name=genre_filter)
     
-    new_songs = new_songs.order_by('-upload_date', '-plays')
+    new_songs = new_songs.select_related('artist', 'genre')
     
-    # Pagination
-    paginator = Paginator(new_songs, 20)
-    songs_page = paginator.get_page(page)
+    # Pagination (keyset on upload date; id breaks ties)
+    songs_page = CursorPaginator(new_songs, ('-upload_date', '-id'), 20).get_page(request.GET.get('cursor'))
     
-    genres = Genre.objects.all()
+    genres = genre_registry.all()
     
     context = {
         'songs': songs_page,
@@ -258,31 +213,17 @@ def new_releases(request):
 # FIXED VERSION: Using genre_id instead of slug
 def genre_charts(request, genre_id):
     """Genre-specific charts - FIXED to use genre_id instead of slug"""
-    genre = get_object_or_404(Genre, id=genre_id)
+    genre = genre_registry.get(genre_id)
+    if genre is None:
+        raise Http404("Genre not found")
     time_filter = request.GET.get('time', 'weekly')
-    page = request.GET.get('page', 1)
     
-    songs = Song.objects.filter(
-        genre=genre,
-        is_approved=True
+    songs_page = chart_page(
+        'top_songs', chart_window(time_filter), genre, cursor=request.GET.get('cursor'), per_page=20
     )
     
-    # Apply time filter
-    if time_filter == 'weekly':
-        start_date = timezone.now() - timedelta(days=7)
-        songs = songs.filter(upload_date__gte=start_date)
-    elif time_filter == 'monthly':
-        start_date = timezone.now() - timedelta(days=30)
-        songs = songs.filter(upload_date__gte=start_date)
-    
-    songs = songs.order_by('-plays', '-downloads')[:50]
-    
-    # Pagination
-    paginator = Paginator(songs, 20)
-    songs_page = paginator.get_page(page)
-    
     # Get other genres for navigation
-    genres = Genre.objects.all()
+    genres = genre_registry.all()
     
     context = {
         'genre': genre,
@@ -297,31 +238,17 @@ def genre_charts(request, genre_id):
 # ADDITIONAL VIEW: If you want to access by genre name instead of ID
 def genre_charts_by_name(request, genre_name):
     """Genre-specific charts accessed by genre name"""
-    genre = get_object_or_404(Genre, name=genre_name)
+    genre = genre_registry.named(genre_name)
+    if genre is None:
+        raise Http404("Genre not found")
     time_filter = request.GET.get('time', 'weekly')
-    page = request.GET.get('page', 1)
     
-    songs = Song.objects.filter(
-        genre=genre,
-        is_approved=True
+    songs_page = chart_page(
+        'top_songs', chart_window(time_filter), genre, cursor=request.GET.get('cursor'), per_page=20
     )
     
-    # Apply time filter
-    if time_filter == 'weekly':
-        start_date = timezone.now() - timedelta(days=7)
-        songs = songs.filter(upload_date__gte=start_date)
-    elif time_filter == 'monthly':
-        start_date = timezone.now() - timedelta(days=30)
-        songs = songs.filter(upload_date__gte=start_date)
-    
-    songs = songs.order_by('-plays', '-downloads')[:50]
-    
-    # Pagination
-    paginator = Paginator(songs, 20)
-    songs_page = paginator.get_page(page)
-    
     # Get other genres for navigation
-    genres = Genre.objects.all()
+    genres = genre_registry.all()
     
     context = {
         'genre': genre,
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     "django.contrib.sitemaps",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     
     "crispy_forms",
     "crispy_bootstrap5",
@@ -162,6 +163,158 @@ os.makedirs(MEDIA_ROOT, exist_ok=True)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 524288000  # 500MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 524288000  # 500MB
 
+# Square thumbnails built for every uploaded image (`manage.py build_thumbnails`
+# backfills); formats this Pillow can't encode are skipped, JPEG is always built
+THUMBNAIL_SIZES = (64, 150, 300, 600)
+THUMBNAIL_FORMATS = tuple(os.getenv("THUMBNAIL_FORMATS", "avif,webp,jpeg").split(","))
+
+
+# --------------------------------------------------
+# Play Counting
+# --------------------------------------------------
+# Plays are queued per worker and written in batches by a background flusher
+PLAY_BUFFER_FLUSH_SIZE = int(os.getenv("PLAY_BUFFER_FLUSH_SIZE", 200))
+PLAY_BUFFER_FLUSH_INTERVAL = float(os.getenv("PLAY_BUFFER_FLUSH_INTERVAL", 5))  # seconds
+PLAY_BUFFER_SPOOL_DIR = os.getenv("PLAY_BUFFER_SPOOL_DIR", BASE_DIR / "spool" / "plays")
+
+# Shard rows per song for play counts; folded into Song.plays by rollup_play_counters
+PLAY_COUNTER_SHARDS = int(os.getenv("PLAY_COUNTER_SHARDS", 8))
+
+
+# --------------------------------------------------
+# Branded Downloads
+# --------------------------------------------------
+# "splice" streams a cached branded ID3 tag + the original MP3 frames;
+# "cache" serves a fully branded copy built once per song version
+BRANDED_DOWNLOAD_MODE = os.getenv("BRANDED_DOWNLOAD_MODE", "splice")
+
+
+# --------------------------------------------------
+# Audio Streaming
+# --------------------------------------------------
+# Set to "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache) to let the web
+# server push audio bytes; nginx needs an internal location aliasing MEDIA_ROOT:
+#   location /protected-media/ { internal; alias /path/to/media/; }
+AUDIO_STREAM_SENDFILE_HEADER = os.getenv("AUDIO_STREAM_SENDFILE_HEADER") or None
+AUDIO_STREAM_INTERNAL_URL = os.getenv("AUDIO_STREAM_INTERNAL_URL", "/protected-media/")
+
+
+# --------------------------------------------------
+# Audio Processing
+# --------------------------------------------------
+# Local ffmpeg used for previews of non-MP3 uploads and offline processing
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+# MP3 bitrate ladder (kbps) built by `manage.py transcode_songs`
+AUDIO_RENDITION_BITRATES = (64, 128, 320)
+
+# Highest rendition served to free listeners
+AUDIO_FREE_MAX_BITRATE = int(os.getenv("AUDIO_FREE_MAX_BITRATE", "128"))
+
+# Target segment length for `manage.py package_hls`
+HLS_SEGMENT_SECONDS = 6
+
+# HLS packages live outside MEDIA_ROOT: every playlist and segment goes
+# through the access-checked views. With X-Accel-Redirect, nginx needs:
+#   location /protected-hls/ { internal; alias /path/to/hls/; }
+HLS_ROOT = os.getenv("HLS_ROOT", BASE_DIR / "hls")
+HLS_INTERNAL_URL = os.getenv("HLS_INTERNAL_URL", "/protected-hls/")
+
+# `manage.py process_uploads`: retries per job, and seconds before a running
+# job whose worker died is handed to another worker
+PROCESSING_MAX_ATTEMPTS = 3
+PROCESSING_JOB_TIMEOUT = 1800
+
+# Peaks per song for the waveform scrub bar (one byte each)
+WAVEFORM_BUCKETS = 1000
+
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+# Shared by every worker: "redis" (CACHE_URL) in production, "file" on a
+# single host, "locmem" for tests
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "file")
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL", "redis://127.0.0.1:6379/1"),
+            "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "sangabiz"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", str(BASE_DIR / "cache")),
+            "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "sangabiz"),
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "sangabiz"),
+        }
+    }
+
+# Anonymous visitors get whole cached pages (home, discover, genres, charts,
+# news) for PAGE_CACHE_TIMEOUT seconds; 0 turns it off. Fragments shared with
+# signed-in users (chart lists, counts) live FRAGMENT_CACHE_TIMEOUT seconds.
+# Saves of songs, artists, news and genres invalidate both (music/caching.py).
+PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", 120))
+FRAGMENT_CACHE_TIMEOUT = 300
+
+
+# --------------------------------------------------
+# Search
+# --------------------------------------------------
+# PostgreSQL text search configuration for song documents. "simple" keeps
+# artist names and Luganda words unstemmed.
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "simple")
+
+# Typo-tolerant matching: minimum share of query trigrams a name must contain,
+# and how long the in-process trigram index (non-PostgreSQL) is reused
+FUZZY_SEARCH_THRESHOLD = 0.3
+FUZZY_INDEX_TTL = 300
+
+# Seconds before a worker rebuilds its /api/suggest/ prefix index
+SUGGEST_INDEX_TTL = 300
+
+# Search page result cache: entries younger than FRESH are served as is;
+# older or invalidated ones are served stale while one request refreshes them
+SEARCH_CACHE_FRESH_SECONDS = 60
+SEARCH_CACHE_TIMEOUT = 3600
+
+# Genres are held per worker (music/genres.py); seconds between checks of the
+# cached version that Genre saves bump
+GENRE_REGISTRY_CHECK_SECONDS = 5
+
+
+# --------------------------------------------------
+# Charts
+# --------------------------------------------------
+# Chart pages read snapshots built by `python manage.py build_charts` (hourly cron)
+CHART_SIZE = int(os.getenv("CHART_SIZE", 100))
+CHART_SNAPSHOTS_KEPT = 24
+
+
+# --------------------------------------------------
+# Play Log Retention
+# --------------------------------------------------
+# SongPlay is partitioned by month on PostgreSQL; `python manage.py
+# manage_play_partitions` (daily cron) prepares upcoming months and expires
+# months older than the retention window after rolling them into the daily stats.
+PLAY_PARTITIONS_AHEAD = 3
+PLAY_RETENTION_MONTHS = int(os.getenv("PLAY_RETENTION_MONTHS", 13)) or None
+# Expired months are written here as .csv.gz and dropped; unset keeps them as detached tables
+PLAY_ARCHIVE_DIR = os.getenv("PLAY_ARCHIVE_DIR") or None
+
+# Per-process User-Agent hash -> UserAgent id cache for play/download logging
+USER_AGENT_CACHE_SIZE = 4096
+
 
 # --------------------------------------------------
 # Authentication Redirects
@@ -93,8 +93,7 @@ function playSong(songData, playlist = [], index = 0) {
     }
     
     // Set audio source and play
-    audioPlayer.src = songData.audio;
-    audioPlayer.load();
+    setAudioSource(songData);
     
     // Update duration when metadata is loaded
     audioPlayer.addEventListener('loadedmetadata', function() {
@@ -118,6 +117,30 @@ function playSong(songData, playlist = [], index = 0) {
     playAudio();
 }
 
+// HLS when the song is packaged and the browser can play it (natively or
+// through hls.js if the page loaded it), progressive stream otherwise
+let hlsPlayer = null;
+
+function setAudioSource(songData) {
+    if (hlsPlayer) {
+        hlsPlayer.destroy();
+        hlsPlayer = null;
+    }
+    
+    const hlsUrl = songData.hls_url || songData.hls;
+    if (hlsUrl && audioPlayer.canPlayType('application/vnd.apple.mpegurl')) {
+        audioPlayer.src = hlsUrl;
+    } else if (hlsUrl && window.Hls && window.Hls.isSupported()) {
+        hlsPlayer = new window.Hls();
+        hlsPlayer.loadSource(hlsUrl);
+        hlsPlayer.attachMedia(audioPlayer);
+        return;
+    } else {
+        audioPlayer.src = songData.audio;
+    }
+    audioPlayer.load();
+}
+
 function playAudio() {
     if (!audioPlayer) return;
     
@@ -358,7 +381,27 @@ function playThisSong(songId) {
         // Create a playlist with just this song for auto-play continuity
         const playlist = [songData];
         playSong(songData, playlist, 0);
+        return;
     }
+    
+    // Not on this page: ask the catalog API
+    fetchSongData([songId]).then(songs => {
+        if (songs.length) {
+            playSong(songs[0], songs, 0);
+        }
+    });
+}
+
+// Song metadata for any number of ids in one request. Responses carry ETags,
+// so the browser cache revalidates repeat lookups with a cheap 304
+function fetchSongData(songIds) {
+    return fetch(`/api/catalog/songs/?ids=${songIds.join(',')}`)
+        .then(response => response.ok ? response.json() : { results: [] })
+        .then(data => data.results || [])
+        .catch(error => {
+            console.error('Error fetching song data:', error);
+            return [];
+        });
 }
 
 // Example function to get song data (implement based on your data structure)
@@ -372,6 +415,7 @@ function getSongDataById(songId) {
             title: songElement.querySelector('.song-title')?.textContent || 'Unknown Title',
             artist: songElement.querySelector('.song-artist')?.textContent || 'Unknown Artist',
             audio: songElement.dataset.audioUrl || '#',
+            hls: songElement.dataset.hlsUrl || null,
             cover: songElement.dataset.coverUrl || '/static/images/default-cover.jpg'
         };
     }